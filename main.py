@@ -6,11 +6,16 @@ Entry point with automatic virtual environment and dependency management.
 
 import os
 import sys
+import hashlib
 import subprocess
 import platform
 from pathlib import Path
 
 
+# Records which requirements/interpreter combination the venv was built for
+DEPS_STAMP = Path("venv") / ".siteseeing-deps"
+
+
 def get_venv_python():
     """Get the path to the Python executable in the virtual environment."""
     if platform.system() == "Windows":
@@ -26,8 +31,22 @@ def create_venv():
         print("Virtual environment created.")
 
 
+def dependency_fingerprint(requirements_file):
+    """Hash the requirements together with the interpreter version and architecture."""
+    digest = hashlib.sha256()
+    digest.update(requirements_file.read_bytes())
+    digest.update(sys.version.encode())
+    digest.update(f"{platform.system()}-{platform.machine()}".encode())
+    return digest.hexdigest()
+
+
 def install_dependencies():
-    """Install required dependencies in the virtual environment."""
+    """
+    Install required dependencies in the virtual environment.
+    
+    pip only runs when the requirements or the interpreter changed since the
+    last successful install, so regular launches need no network access.
+    """
     venv_python = get_venv_python()
     requirements_file = Path("requirements.txt")
     
@@ -37,12 +56,20 @@ def install_dependencies():
             "selenium>=4.0.0",
             "Pillow>=9.0.0",
             "webdriver-manager>=3.8.0",
+            "numpy>=1.20.0",
+            "aiohttp>=3.8.0",
+            "psutil>=5.8.0",
         ]
         requirements_file.write_text("\n".join(requirements))
     
+    fingerprint = dependency_fingerprint(requirements_file)
+    if DEPS_STAMP.exists() and DEPS_STAMP.read_text().strip() == fingerprint:
+        return
+    
     print("Installing dependencies...")
     subprocess.run([str(venv_python), "-m", "pip", "install", "--upgrade", "pip"], check=True)
     subprocess.run([str(venv_python), "-m", "pip", "install", "-r", "requirements.txt"], check=True)
+    DEPS_STAMP.write_text(fingerprint)
     print("Dependencies installed.")
 
 
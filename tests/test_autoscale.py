@@ -0,0 +1,80 @@
+"""
+Unit tests for worker autoscaling.
+"""
+
+import unittest
+from webshot.autoscale import AutoScaler, Sample
+
+
+class FakeQueueManager:
+    """Minimal stand-in recording resize calls."""
+    
+    def __init__(self, workers):
+        self.worker_count = workers
+        
+    def add_worker(self):
+        self.worker_count += 1
+        
+    def retire_worker(self):
+        self.worker_count -= 1
+
+
+def make_sample(workers=4, pending=100, throughput=1.0, p95=5.0, failure_rate=0.0,
+                cpu=50.0, available_mb=8000.0):
+    """Build a sample with healthy defaults."""
+    return Sample(workers=workers, pending=pending, throughput=throughput, p95_latency=p95,
+                  failure_rate=failure_rate, cpu_percent=cpu, available_mb=available_mb)
+
+
+class TestAutoScaler(unittest.TestCase):
+    """Test cases for the AIMD decision rules."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.scaler = AutoScaler(FakeQueueManager(4), min_workers=1, max_workers=6)
+        
+    def test_additive_increase_with_headroom(self):
+        """Test that a healthy host gains one worker at a time."""
+        self.assertEqual(self.scaler.decide(make_sample())[0], 5)
+        
+    def test_respects_max_workers(self):
+        """Test the upper bound."""
+        self.assertEqual(self.scaler.decide(make_sample(workers=6))[0], 6)
+        
+    def test_no_increase_without_queued_work(self):
+        """Test that an almost empty queue does not add workers."""
+        self.assertEqual(self.scaler.decide(make_sample(pending=2))[0], 4)
+        
+    def test_memory_pressure_halves(self):
+        """Test multiplicative decrease on low memory."""
+        target, reason = self.scaler.decide(make_sample(available_mb=500))
+        self.assertEqual(target, 2)
+        self.assertEqual(reason, "memory pressure")
+        
+    def test_rising_failures_halve(self):
+        """Test sharp back-off when failures spike."""
+        self.scaler.decide(make_sample(failure_rate=0.1))
+        self.assertEqual(self.scaler.decide(make_sample(failure_rate=0.6))[0], 2)
+        
+    def test_cpu_saturation_removes_one(self):
+        """Test gentle decrease on CPU saturation."""
+        self.assertEqual(self.scaler.decide(make_sample(cpu=97))[0], 3)
+        
+    def test_latency_rise_without_gain(self):
+        """Test that rising latency without more throughput sheds a worker."""
+        self.scaler.decide(make_sample(p95=4.0, throughput=1.0))
+        self.assertEqual(self.scaler.decide(make_sample(p95=9.0, throughput=1.0))[0], 3)
+        
+    def test_warming_up_holds(self):
+        """Test that no finished tasks means no latency-based decision."""
+        self.assertEqual(self.scaler.decide(make_sample(p95=None))[0], 4)
+        
+    def test_step_applies_target(self):
+        """Test that step resizes the queue manager."""
+        self.scaler.sample = lambda: make_sample(workers=self.scaler.queue_manager.worker_count)
+        self.scaler.step()
+        self.assertEqual(self.scaler.queue_manager.worker_count, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Unit tests for the batch job runner.
+"""
+
+import unittest
+import tempfile
+import threading
+from unittest import mock
+from webshot.batch import BatchRunner
+
+
+class TestCancel(unittest.TestCase):
+    """Test cases for cancelling a batch job."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = {'output_dir': self.temp_dir.name, 'capture_index': False}
+        
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+        
+    def test_cancel_before_run(self):
+        """Test that a job cancelled before it started captures nothing."""
+        runner = BatchRunner(self.options)
+        runner.cancel()
+        with mock.patch.object(BatchRunner, '_capture_all') as capture_all:
+            runner.run(["https://example.com"])
+        capture_all.assert_not_called()
+        
+    def test_cancel_event_set_before_runner_exists(self):
+        """Test that a cancel event set before the runner was created is respected."""
+        cancel_event = threading.Event()
+        cancel_event.set()
+        runner = BatchRunner(self.options, cancel_event=cancel_event)
+        with mock.patch.object(BatchRunner, '_capture_all') as capture_all:
+            runner.run(["https://example.com"])
+        capture_all.assert_not_called()
+        self.assertFalse(runner.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
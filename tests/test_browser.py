@@ -0,0 +1,323 @@
+"""
+Unit tests for element and region capture with a stand-in driver.
+"""
+
+import unittest
+import tempfile
+import base64
+import io
+from unittest import mock
+from pathlib import Path
+from PIL import Image
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+from webshot.browser import BrowserCrashError, BrowserEngine, device_metrics, is_session_dead
+
+
+class FakeDriver:
+    """Answers the element script and Page.captureScreenshot like Chrome at DPR 2."""
+    
+    RECTS = {'#pricing': {'x': 10, 'y': 3000, 'width': 200, 'height': 100},
+             '.hero': {'x': 0, 'y': 0, 'width': 800, 'height': 300}}
+    
+    def __init__(self):
+        self.cdp_calls = []
+        self.emulated = []
+        self.loaded = []
+        
+    def get(self, url):
+        """Pretend to load a page."""
+        self.loaded.append((url, len(self.emulated)))
+        
+    def execute_script(self, script, *args):
+        """Resolve selectors to document rectangles."""
+        if args:
+            return [self.RECTS.get(selector) for selector in args[0]]
+        return None
+        
+    def execute_cdp_cmd(self, command, params):
+        """Render the clip as a solid image of its device-pixel size."""
+        if command == 'Emulation.setDeviceMetricsOverride':
+            self.emulated.append(params)
+            return {}
+        self.cdp_calls.append((command, params))
+        clip = params['clip']
+        image = Image.new('RGB', (int(clip['width'] * 2), int(clip['height'] * 2)), 'red')
+        output = io.BytesIO()
+        image.save(output, params['format'].upper())
+        return {'data': base64.b64encode(output.getvalue()).decode()}
+
+
+class TestRegionCapture(unittest.TestCase):
+    """Test cases for element and region captures."""
+    
+    def setUp(self):
+        """Set up an engine with the fake driver and no page-load wait."""
+        self.options = {'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                        'zoom': 1.0, 'format': 'png', 'quality': None}
+        patcher = mock.patch('webshot.browser.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def _engine(self, **options):
+        """Create an engine whose driver is the fake."""
+        engine = BrowserEngine(dict(self.options, **options))
+        engine.driver = FakeDriver()
+        return engine
+        
+    def test_one_output_per_selector(self):
+        """Test that each matching selector produces its own output."""
+        engine = self._engine(type='element', selectors=['#pricing', '#missing', '.hero'])
+        result = engine.capture_screenshot("https://example.com")
+        
+        self.assertEqual([part.selector for part in result.parts], ['#pricing', '.hero'])
+        self.assertEqual((result.parts[0].width, result.parts[0].height), (400, 200))
+        self.assertEqual(result.location, result.parts[0].location)
+        self.assertNotEqual(result.parts[0].location, result.parts[1].location)
+        
+        command, params = engine.driver.cdp_calls[0]
+        self.assertEqual(command, 'Page.captureScreenshot')
+        self.assertTrue(params['captureBeyondViewport'])
+        self.assertEqual(params['clip']['y'], 3000)
+        
+    def test_no_matching_selector_fails(self):
+        """Test that a page without any matching element is an error."""
+        engine = self._engine(type='element', selectors=['#missing'])
+        with self.assertRaises(RuntimeError):
+            engine.capture_screenshot("https://example.com")
+            
+    def test_jpeg_elements_are_encoded_by_chrome(self):
+        """Test that element outputs use the format requested from Chrome."""
+        engine = self._engine(type='element', selectors=['.hero'], format='jpeg', quality=70)
+        result = engine.capture_screenshot("https://example.com")
+        self.assertEqual(engine.driver.cdp_calls[0][1]['quality'], 70)
+        self.assertTrue(result.location.endswith('.jpeg'))
+        
+    def test_region_clip_is_capped(self):
+        """Test that a region capture honours the maximum height."""
+        engine = self._engine(type='region', clip=[0, 50, 300, 5000], max_height=1000)
+        result = engine.capture_screenshot("https://example.com")
+        self.assertEqual(engine.driver.cdp_calls[0][1]['clip']['height'], 1000)
+        self.assertEqual((result.width, result.height), (600, 2000))
+
+
+class TestDeviceEmulation(unittest.TestCase):
+    """Test cases for device metrics emulation."""
+    
+    def test_zoom_keeps_output_size(self):
+        """Test that zoom shrinks the CSS viewport and raises the scale factor."""
+        metrics = device_metrics({'width': 1920, 'height': 1080, 'zoom': 1.5})
+        self.assertEqual((metrics['width'], metrics['height']), (1280, 720))
+        self.assertEqual(metrics['deviceScaleFactor'], 1.5)
+        self.assertFalse(metrics['mobile'])
+        
+    def test_device_scale_factor(self):
+        """Test that the scale factor keeps the viewport and multiplies the output."""
+        metrics = device_metrics({'width': 390, 'height': 844, 'zoom': 1.0,
+                                  'device_scale_factor': 3, 'mobile': True})
+        self.assertEqual((metrics['width'], metrics['height']), (390, 844))
+        self.assertEqual(metrics['deviceScaleFactor'], 3)
+        self.assertTrue(metrics['mobile'])
+        
+    def test_emulation_before_navigation(self):
+        """Test that metrics are applied before the page loads and only when they change."""
+        engine = BrowserEngine({'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                                'zoom': 2.0, 'format': 'png', 'quality': None, 'type': 'region',
+                                'clip': [0, 0, 100, 100]})
+        engine.driver = FakeDriver()
+        with mock.patch('webshot.browser.time.sleep'):
+            engine.capture_screenshot("https://example.com")
+            engine.capture_screenshot("https://example.org")
+            self.assertEqual(len(engine.driver.emulated), 1)
+            self.assertEqual(engine.driver.loaded[0], ("https://example.com", 1))
+            
+            engine.configure(dict(engine.options, width=1000, zoom=1.0))
+        self.assertEqual(len(engine.driver.emulated), 2)
+        self.assertEqual(engine.driver.emulated[-1]['width'], 1000)
+
+
+class VirtualClockDriver(FakeDriver):
+    """Keeps a page clock that runs until the virtual time budget is used up."""
+    
+    def __init__(self):
+        super().__init__()
+        self.clock = 0.0
+        self.limit = None
+        self.policies = []
+        self.scripts = []
+        
+    def execute_cdp_cmd(self, command, params):
+        """Track virtual time policies and injected scripts."""
+        if command == 'Emulation.setVirtualTimePolicy':
+            self.policies.append(params)
+            self.limit = self.clock + params['budget'] if 'budget' in params else None
+            if params['policy'] == 'pause':
+                self.limit = self.clock
+            return {}
+        if command == 'Page.addScriptToEvaluateOnNewDocument':
+            self.scripts.append(params['source'])
+            return {'identifier': str(len(self.scripts))}
+        if command == 'Page.removeScriptToEvaluateOnNewDocument':
+            self.scripts[int(params['identifier']) - 1] = None
+            return {}
+        return super().execute_cdp_cmd(command, params)
+        
+    def execute_script(self, script, *args):
+        """Answer performance.now() from the virtual clock, advancing it on each read."""
+        if script == "return performance.now()":
+            value = self.clock
+            self.clock = min(self.clock + 400, self.limit) if self.limit is not None else self.clock + 400
+            return value
+        return super().execute_script(script, *args)
+
+
+class TestRenderMode(unittest.TestCase):
+    """Test cases for animation freezing and virtual time."""
+    
+    def setUp(self):
+        """Set up an engine with a virtual clock and no real waits."""
+        patcher = mock.patch('webshot.browser.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = BrowserEngine({'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                                     'zoom': 1.0, 'format': 'png', 'quality': None, 'type': 'region',
+                                     'clip': [0, 0, 100, 100], 'freeze_animations': True,
+                                     'virtual_time_budget': 3000})
+        self.engine.driver = VirtualClockDriver()
+        
+    def test_virtual_time_replaces_real_wait(self):
+        """Test that the page is fast-forwarded by the budget instead of sleeping."""
+        self.engine.capture_screenshot("https://example.com")
+        driver = self.engine.driver
+        
+        self.assertEqual(driver.policies[0], {'policy': 'pauseIfNetworkFetchesPending', 'budget': 3000})
+        self.assertEqual(driver.policies[1], {'policy': 'pause'})
+        self.assertEqual(driver.clock, 3000)
+        self.assertNotIn(mock.call(2), self.sleep.call_args_list)
+        
+    def test_freeze_script_installed_once(self):
+        """Test that the freeze script is added once and removed when switched off."""
+        self.engine.capture_screenshot("https://example.com")
+        self.engine.capture_screenshot("https://example.org")
+        self.assertEqual(len(self.engine.driver.scripts), 1)
+        self.assertIn("animation-duration: 0s", self.engine.driver.scripts[0])
+        
+        self.engine.configure(dict(self.engine.options, freeze_animations=False, virtual_time_budget=0))
+        self.engine.capture_screenshot("https://example.net")
+        self.assertEqual(self.engine.driver.scripts, [None])
+        self.assertEqual(self.engine.driver.policies[-1], {'policy': 'advance'})
+        self.assertIn(mock.call(2), self.sleep.call_args_list)
+
+
+class CrashingDriver(FakeDriver):
+    """Fails navigation with a given exception."""
+    
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+        
+    def get(self, url):
+        """Fail to load the page."""
+        raise self.error
+        
+    def quit(self):
+        """Quitting a dead session fails as well."""
+        raise WebDriverException("chrome not reachable")
+
+
+class TestCrashRecovery(unittest.TestCase):
+    """Test cases for recognising and recovering from browser crashes."""
+    
+    def _engine(self, error):
+        """Create an engine whose driver fails with the given error."""
+        engine = BrowserEngine({'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                                'zoom': 1.0, 'format': 'png', 'quality': None, 'type': 'viewport'})
+        engine.driver = CrashingDriver(error)
+        return engine
+        
+    def test_is_session_dead(self):
+        """Test which errors count as a dead session."""
+        self.assertTrue(is_session_dead(InvalidSessionIdException("invalid session id")))
+        self.assertTrue(is_session_dead(WebDriverException("unknown error: session deleted because of page crash")))
+        self.assertTrue(is_session_dead(WebDriverException("disconnected: not connected to DevTools")))
+        self.assertFalse(is_session_dead(WebDriverException("unknown error: net::ERR_NAME_NOT_RESOLVED")))
+        self.assertFalse(is_session_dead(ValueError("bad value")))
+        
+    def test_crash_is_reported_as_crash(self):
+        """Test that a dead session raises BrowserCrashError with a one-line reason."""
+        engine = self._engine(WebDriverException("tab crashed\n  (Session info: chrome=120)"))
+        with self.assertRaises(BrowserCrashError) as caught:
+            engine.capture_screenshot("https://example.com")
+        self.assertEqual(str(caught.exception), "Message: tab crashed")
+        
+    def test_page_errors_are_not_crashes(self):
+        """Test that ordinary navigation errors pass through unchanged."""
+        engine = self._engine(WebDriverException("net::ERR_CONNECTION_REFUSED"))
+        with self.assertRaises(WebDriverException):
+            engine.capture_screenshot("https://example.com")
+            
+    def test_restart_replaces_dead_driver(self):
+        """Test that restart ignores the dead session and starts a new one."""
+        engine = self._engine(InvalidSessionIdException("invalid session id"))
+        with mock.patch.object(BrowserEngine, 'start') as start:
+            engine.restart()
+        start.assert_called_once_with()
+        self.assertIsNone(engine.driver)
+
+
+class ScrollCrashDriver:
+    """Scrolls a 2000px page and dies on the second viewport screenshot."""
+    
+    def __init__(self):
+        self.y = 0
+        self.screenshots = 0
+        
+    def execute_script(self, script):
+        """Answer the page-size and scroll scripts."""
+        if 'scrollHeight' in script:
+            return 2000
+        if 'innerHeight' in script:
+            return 600
+        if script.startswith('window.scrollTo'):
+            self.y = int(script[len('window.scrollTo(0, '):-1])
+            return None
+        return self.y
+        
+    def get_screenshot_as_png(self):
+        """Return a viewport screenshot, failing after the first one."""
+        self.screenshots += 1
+        if self.screenshots > 1:
+            raise InvalidSessionIdException("invalid session id")
+        output = io.BytesIO()
+        Image.new('RGB', (800, 600), 'blue').save(output, 'PNG')
+        return output.getvalue()
+
+
+class TestStitchCleanup(unittest.TestCase):
+    """Test cases for discarding partial full-page outputs."""
+    
+    def setUp(self):
+        """Set up an engine with the crashing driver and no scroll wait."""
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.engine = BrowserEngine({'output_dir': str(self.output_dir), 'width': 800, 'height': 600,
+                                     'zoom': 1.0, 'format': 'png', 'quality': None})
+        self.engine.driver = ScrollCrashDriver()
+        patcher = mock.patch('webshot.browser.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def test_stream_output_is_removed(self):
+        """Test that a crash mid-page leaves no partial PNG behind."""
+        with self.assertRaises(InvalidSessionIdException):
+            self.engine._capture_full_page_to_disk("https://example.com", 'stream')
+        self.assertEqual(self.engine.driver.screenshots, 2)
+        self.assertEqual(list(self.output_dir.glob('*.png')), [])
+        
+    def test_tile_output_is_removed(self):
+        """Test that a crash mid-page leaves no partial tile directory behind."""
+        with self.assertRaises(InvalidSessionIdException):
+            self.engine._capture_full_page_to_disk("https://example.com", 'tiles')
+        self.assertEqual([p.name for p in self.output_dir.iterdir() if p.is_dir()], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
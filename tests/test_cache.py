@@ -0,0 +1,100 @@
+"""
+Unit tests for the capture cache.
+"""
+
+import unittest
+import tempfile
+import time
+from pathlib import Path
+from webshot.cache import CaptureCache
+from webshot.results import CaptureResult
+from webshot.storage import LooseFileStore
+
+
+class TestCaptureCache(unittest.TestCase):
+    """Test cases for CaptureCache."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache = CaptureCache(self.temp_dir / "cache", ttl=60, max_bytes=1000)
+        self.options = {'type': 'viewport', 'width': 1920, 'height': 1080, 'output_dir': "a"}
+        
+    def _put(self, key, size=100, ttl=None):
+        """Store an entry of the given size."""
+        self.cache.put(key, b'x' * size, {'format': 'png', 'width': 1, 'height': 1}, ttl=ttl)
+        
+    def test_key_normalizes_url_and_ignores_storage_options(self):
+        """Test that equivalent URLs and storage-only options share a key."""
+        key = CaptureCache.make_key("https://Example.com:443/?b=2&a=1#top", self.options)
+        self.assertEqual(key, CaptureCache.make_key("https://example.com/?a=1&b=2",
+                                                    dict(self.options, output_dir="b")))
+        self.assertNotEqual(key, CaptureCache.make_key("https://example.com/?a=1&b=2",
+                                                       dict(self.options, width=800)))
+        
+    def test_hit_and_miss(self):
+        """Test counting hits and misses."""
+        self.assertIsNone(self.cache.get("k"))
+        self._put("k")
+        data, meta = self.cache.get("k")
+        self.assertEqual(len(data), 100)
+        self.assertEqual(meta['format'], 'png')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+        
+    def test_ttl_expiry(self):
+        """Test that entries expire after their own TTL."""
+        self._put("short", ttl=0.05)
+        self._put("long")
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("short"))
+        self.assertIsNotNone(self.cache.get("long"))
+        self.assertEqual(self.cache.stats()['expired'], 1)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        
+    def test_lru_eviction(self):
+        """Test that the least recently used entries go first."""
+        for key in "abc":
+            self._put(key, size=300)
+        self.cache.get("a")
+        self._put("d", size=300)
+        
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+        self.assertLessEqual(self.cache.stats()['bytes'], 1000)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        
+    def test_size_survives_reopen(self):
+        """Test that a reopened cache accounts for existing entries."""
+        self._put("a", size=400)
+        reopened = CaptureCache(self.cache.directory, max_bytes=1000)
+        self.assertEqual(reopened.stats()['bytes'], 400)
+        
+    def test_size_limit_covers_other_processes(self):
+        """Test that entries written by another cache on the same directory count toward the limit."""
+        other = CaptureCache(self.cache.directory, ttl=60, max_bytes=1000)
+        for key in "abcdef":
+            self._put(key, size=100)
+            other.put(key.upper(), b'x' * 100, {'format': 'png', 'width': 1, 'height': 1})
+            
+        on_disk = sum(p.stat().st_size for p in self.cache.directory.glob("*.png"))
+        self.assertLessEqual(on_disk, 1000)
+        self.assertIsNotNone(other.get("F"))
+        
+    def test_lookup_and_remember(self):
+        """Test serving a remembered capture through a store."""
+        store = LooseFileStore(self.temp_dir / "out")
+        location = store.save("https://example.com", b'png-bytes', 'png')
+        result = CaptureResult(url="https://example.com", location=location, width=10, height=5)
+        self.cache.remember("https://example.com", self.options, result)
+        
+        cached = self.cache.lookup("https://example.com/", self.options, store)
+        self.assertEqual(cached.status, 'cached')
+        self.assertNotEqual(cached.location, location)
+        self.assertEqual(Path(cached.location).read_bytes(), b'png-bytes')
+        self.assertEqual((cached.width, cached.height), (10, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
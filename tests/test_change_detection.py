@@ -0,0 +1,88 @@
+"""
+Unit tests for visual change detection.
+"""
+
+import unittest
+import tempfile
+import io
+from pathlib import Path
+from PIL import Image, ImageDraw
+from webshot.change_detection import (
+    ChangeDetector, perceptual_hash, hamming_distance, render_highlight
+)
+
+
+def make_page(block_color=None):
+    """Create a synthetic page, optionally with a coloured block."""
+    img = Image.new('RGB', (400, 800), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for y in range(0, 800, 40):
+        draw.line((0, y, 400, y), fill=(200, 200, 200))
+    if block_color:
+        draw.rectangle((50, 300, 350, 500), fill=block_color)
+    return img
+
+
+class TestChangeDetector(unittest.TestCase):
+    """Test cases for ChangeDetector."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.detector = ChangeDetector(Path(tempfile.mkdtemp()))
+        self.key = ChangeDetector.make_key("https://example.com/", "abc")
+        
+    def test_first_capture_is_changed(self):
+        """Test that a page without baseline counts as changed."""
+        report = self.detector.compare(self.key, make_page())
+        self.assertTrue(report.changed)
+        self.assertIsNone(report.previous_location)
+        
+    def test_identical_capture_is_unchanged(self):
+        """Test that re-capturing the same pixels is detected as unchanged."""
+        self.detector.update(self.key, make_page(), "first.png")
+        report = self.detector.compare(self.key, make_page())
+        
+        self.assertFalse(report.changed)
+        self.assertEqual(report.score, 0.0)
+        self.assertEqual(report.previous_location, "first.png")
+        
+    def test_modified_capture_is_changed(self):
+        """Test that a visible block change is detected with a mask."""
+        self.detector.update(self.key, make_page(), "first.png")
+        report = self.detector.compare(self.key, make_page((0, 0, 0)))
+        
+        self.assertTrue(report.changed)
+        self.assertGreater(report.score, 0.01)
+        self.assertTrue(report.mask.any())
+        self.assertFalse(report.mask[0].any())
+        
+    def test_keys_depend_on_options(self):
+        """Test that the same URL with other options gets another baseline."""
+        self.assertNotEqual(
+            ChangeDetector.make_key("https://example.com/", "a"),
+            ChangeDetector.make_key("https://example.com/", "b")
+        )
+        
+    def test_highlight_keeps_size(self):
+        """Test rendering the highlight image."""
+        self.detector.update(self.key, make_page(), "first.png")
+        page = make_page((0, 0, 0))
+        report = self.detector.compare(self.key, page)
+        
+        with Image.open(io.BytesIO(render_highlight(page, report.mask))) as img:
+            self.assertEqual(img.size, page.size)
+            self.assertEqual(img.getpixel((200, 400))[0], 127)
+
+
+class TestPerceptualHash(unittest.TestCase):
+    """Test cases for the perceptual hash."""
+    
+    def test_similar_and_different_images(self):
+        """Test that hashes are stable for identical images and differ otherwise."""
+        base = perceptual_hash(make_page())
+        self.assertEqual(hamming_distance(base, perceptual_hash(make_page())), 0)
+        self.assertGreater(hamming_distance(base, perceptual_hash(make_page((0, 0, 0)))), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Unit tests for canonical URL and duplicate page detection.
+"""
+
+import unittest
+import tempfile
+import io
+from unittest import mock
+from PIL import Image
+from webshot.browser import BrowserEngine
+from webshot.dedup import CapturedPages, alias_result, fold_duplicates, page_key
+from webshot.results import CaptureResult
+from webshot.utils import TRACKING_PARAMS, normalize_url
+
+
+class TestCanonicalUrls(unittest.TestCase):
+    """Test cases for URL canonicalization before queueing."""
+    
+    def test_tracking_params_are_stripped(self):
+        """Test that only parameters matching the patterns are dropped."""
+        url = "https://Example.com:443/shop?utm_source=mail&id=7&UTM_Medium=x&gclid=abc#top"
+        self.assertEqual(normalize_url(url, TRACKING_PARAMS), "https://example.com/shop?id=7")
+        self.assertEqual(normalize_url(url), "https://example.com/shop?UTM_Medium=x&gclid=abc&id=7&utm_source=mail")
+        
+    def test_duplicates_are_folded(self):
+        """Test that spellings of one URL are queued once, as first given."""
+        urls, duplicates = fold_duplicates([
+            "https://example.com/?utm_campaign=a",
+            "http://other.org",
+            "HTTPS://EXAMPLE.COM",
+            "https://example.com/?fbclid=1",
+        ])
+        self.assertEqual(urls, ["https://example.com/?utm_campaign=a", "http://other.org"])
+        self.assertEqual(duplicates, {"https://example.com/?utm_campaign=a": [
+            "HTTPS://EXAMPLE.COM", "https://example.com/?fbclid=1"]})
+        
+    def test_inputs_are_not_rewritten(self):
+        """Test that hash routes stay apart and URLs are captured as given."""
+        inputs = ["https://app.example/#/a", "https://app.example/#/b", "https://example.com/?flag&q=a%20b"]
+        urls, duplicates = fold_duplicates(inputs)
+        self.assertEqual(urls, inputs)
+        self.assertEqual(duplicates, {})
+        self.assertEqual(page_key("https://App.example:443/#/a?utm_source=x"), "https://app.example/#/a?utm_source=x")
+
+
+class TestCapturedPages(unittest.TestCase):
+    """Test cases for the per-job page registry."""
+    
+    def test_first_capture_wins(self):
+        """Test lookups by any URL that led to a page."""
+        pages = CapturedPages()
+        first = CaptureResult(url="http://example.com", location="first.png")
+        pages.add(first, "http://example.com", "https://www.example.com/?utm_source=x")
+        pages.add(CaptureResult(url="https://www.example.com", location="second.png"),
+                  "https://www.example.com/")
+        
+        self.assertIs(pages.find("https://WWW.example.com"), first)
+        self.assertIs(pages.find("http://example.com/"), first)
+        self.assertIsNone(pages.find("https://example.com/"))
+        
+    def test_suspect_captures_are_not_reused(self):
+        """Test that a blank or error capture never becomes an alias target."""
+        pages = CapturedPages()
+        pages.add(CaptureResult(url="https://example.com", location="x.png", status='suspect'),
+                  "https://example.com")
+        self.assertIsNone(pages.find("https://example.com"))
+        
+    def test_alias_points_at_original(self):
+        """Test that an alias of an alias still names the original capture."""
+        original = CaptureResult(url="https://example.com/", location="x.png", size=100)
+        alias = alias_result(alias_result(original, "http://example.com"), "https://ex.am/ple")
+        self.assertEqual((alias.url, alias.status, alias.alias_of, alias.location),
+                         ("https://ex.am/ple", 'alias', "https://example.com/", "x.png"))
+
+
+class RedirectDriver:
+    """Follows a fixed redirect map and renders a plain page."""
+    
+    def __init__(self, redirects):
+        self.redirects = redirects
+        self.current_url = None
+        self.screenshots = 0
+        
+    def get(self, url):
+        """Pretend to load a page, following redirects."""
+        self.current_url = self.redirects.get(url, url)
+        
+    def execute_script(self, script, *args):
+        """Answer document.URL."""
+        return self.current_url
+        
+    def execute_cdp_cmd(self, command, params):
+        """Accept device emulation."""
+        return {}
+        
+    def get_screenshot_as_png(self):
+        """Render a page."""
+        self.screenshots += 1
+        output = io.BytesIO()
+        Image.new('RGB', (800, 600), 'navy').save(output, 'PNG')
+        return output.getvalue()
+
+
+class TestEngineAliases(unittest.TestCase):
+    """Test cases for skipping pages already captured in the job."""
+    
+    def setUp(self):
+        """Set up two engines sharing one page registry."""
+        patcher = mock.patch('webshot.browser.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.driver = RedirectDriver({"http://example.com/": "https://www.example.com/",
+                                      "https://bit.ly/x": "https://www.example.com/?utm_source=x",
+                                      "https://down.example/": "chrome-error://chromewebdata/"})
+        self.pages = CapturedPages()
+        options = {'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                   'zoom': 1.0, 'format': 'png', 'quality': None, 'type': 'viewport'}
+        self.engines = [BrowserEngine(options, pages=self.pages) for _ in range(2)]
+        for engine in self.engines:
+            engine.driver = self.driver
+            
+    def test_redirect_to_captured_page_is_alias(self):
+        """Test that a URL landing on a captured page is not captured again."""
+        first = self.engines[0].capture_screenshot("http://example.com/")
+        second = self.engines[1].capture_screenshot("https://bit.ly/x")
+        
+        self.assertEqual(first.status, 'captured')
+        self.assertEqual(second.status, 'alias')
+        self.assertEqual(second.alias_of, "http://example.com/")
+        self.assertEqual(second.location, first.location)
+        self.assertEqual(self.driver.screenshots, 1)
+        
+    def test_error_pages_are_not_aliased(self):
+        """Test that unrelated failed loads on the browser error page are each captured."""
+        self.engines[0].capture_screenshot("https://down.example/")
+        result = self.engines[1].capture_screenshot("https://down.example/")
+        self.assertEqual(result.status, 'captured')
+        self.assertEqual(self.driver.screenshots, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Unit tests for page load diagnostics.
+"""
+
+import unittest
+import tempfile
+import json
+from pathlib import Path
+from webshot.diagnostics import (DiagnosticsReport, PageDiagnostics, build_waterfall,
+                                 parse_performance_log, summarize_hosts, to_har)
+
+
+def log_entry(method, **params):
+    """Build a chromedriver performance log entry."""
+    return {'message': json.dumps({'message': {'method': method, 'params': params}}), 'level': 'INFO'}
+
+
+def page_log():
+    """Performance log of a page with a redirect, a third-party script and a failed image."""
+    return [
+        log_entry('Network.requestWillBeSent', requestId='1', timestamp=100.0, wallTime=1700000000.0,
+                  type='Document', request={'url': 'http://example.com/', 'method': 'GET'}),
+        log_entry('Network.requestWillBeSent', requestId='1', timestamp=100.1, wallTime=1700000000.1,
+                  type='Document', request={'url': 'https://www.example.com/', 'method': 'GET'},
+                  redirectResponse={'status': 301}),
+        log_entry('Network.responseReceived', requestId='1', timestamp=100.3,
+                  response={'status': 200, 'mimeType': 'text/html', 'protocol': 'h2',
+                            'timing': {'requestTime': 100.1, 'dnsStart': 0, 'dnsEnd': 10,
+                                       'connectStart': 10, 'connectEnd': 50, 'sslStart': 20,
+                                       'sslEnd': 50, 'sendStart': 50, 'sendEnd': 51,
+                                       'receiveHeadersEnd': 150}}),
+        log_entry('Network.loadingFinished', requestId='1', timestamp=100.4, encodedDataLength=5000),
+        log_entry('Network.requestWillBeSent', requestId='2', timestamp=100.5, wallTime=1700000000.5,
+                  type='Script', request={'url': 'https://cdn.tracker.net/t.js', 'method': 'GET'}),
+        log_entry('Network.responseReceived', requestId='2', timestamp=101.9,
+                  response={'status': 200, 'mimeType': 'text/javascript', 'protocol': 'h2'}),
+        log_entry('Network.loadingFinished', requestId='2', timestamp=102.5, encodedDataLength=20000),
+        log_entry('Network.requestWillBeSent', requestId='3', timestamp=100.6, wallTime=1700000000.6,
+                  type='Image', request={'url': 'https://img.example.com/a.png', 'method': 'GET'}),
+        log_entry('Network.loadingFailed', requestId='3', timestamp=100.7, errorText='net::ERR_FAILED'),
+        log_entry('Tracing.dataCollected', name='Layout', ph='X', ts=1, dur=5),
+    ]
+
+
+class FakeDriver:
+    """Returns a canned performance log and navigation entry."""
+    
+    def __init__(self, entries):
+        self.entries = entries
+        
+    def get_log(self, kind):
+        """Hand out the log once, like chromedriver does."""
+        entries, self.entries = self.entries, []
+        return entries
+        
+    def execute_script(self, script):
+        """Return a navigation timing entry."""
+        return {'responseStart': 120.5, 'domContentLoadedEventEnd': 800.0, 'loadEventEnd': 2400.0}
+
+
+class TestWaterfall(unittest.TestCase):
+    """Test cases for turning Network events into a waterfall."""
+    
+    def setUp(self):
+        """Parse the sample log."""
+        self.network, self.trace = parse_performance_log(page_log())
+        self.requests = build_waterfall(self.network)
+        
+    def test_parse_splits_network_and_trace(self):
+        """Test that trace events are separated from Network events."""
+        self.assertEqual(len(self.network), 9)
+        self.assertEqual(self.trace, [{'name': 'Layout', 'ph': 'X', 'ts': 1, 'dur': 5}])
+        
+    def test_redirect_hops_and_failures(self):
+        """Test one record per redirect hop and failed requests."""
+        self.assertEqual([request['url'] for request in self.requests],
+                         ['http://example.com/', 'https://www.example.com/',
+                          'https://cdn.tracker.net/t.js', 'https://img.example.com/a.png'])
+        redirect, document, script, image = self.requests
+        self.assertEqual(redirect['status'], 301)
+        self.assertEqual(redirect['redirect_url'], 'https://www.example.com/')
+        self.assertEqual(document['size'], 5000)
+        self.assertAlmostEqual(script['time'], 2000.0)
+        self.assertEqual(image['error'], 'net::ERR_FAILED')
+        
+    def test_har_timings(self):
+        """Test that the HAR entries split the document time into phases."""
+        har = to_har('http://example.com/', self.requests, {'dom_content_loaded': 800.0, 'load': 2400.0})
+        self.assertEqual(har['log']['version'], '1.2')
+        self.assertEqual(har['log']['pages'][0]['pageTimings']['onLoad'], 2400.0)
+        
+        timings = har['log']['entries'][1]['timings']
+        self.assertAlmostEqual(timings['dns'], 10)
+        self.assertAlmostEqual(timings['connect'], 40)
+        self.assertAlmostEqual(timings['ssl'], 30)
+        self.assertAlmostEqual(timings['wait'], 99)
+        self.assertAlmostEqual(timings['receive'], 150)
+        self.assertEqual(har['log']['entries'][3]['_error'], 'net::ERR_FAILED')
+        
+    def test_third_party_hosts(self):
+        """Test that subdomains of the page's site are first-party."""
+        hosts = summarize_hosts('http://example.com/', self.requests)
+        self.assertFalse(hosts['img.example.com']['third_party'])
+        self.assertTrue(hosts['cdn.tracker.net']['third_party'])
+        self.assertEqual(hosts['img.example.com']['failed'], 1)
+
+
+class TestPageDiagnostics(unittest.TestCase):
+    """Test cases for collecting and reporting diagnostics."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.diagnostics = PageDiagnostics(self.temp_dir, trace_threshold=5.0)
+        
+    def test_fast_page_keeps_no_trace(self):
+        """Test that a HAR is written for every page but a trace only for slow ones."""
+        summary = self.diagnostics.collect(FakeDriver(page_log()), 'http://example.com/', 2.0)
+        self.assertIsNone(summary['trace'])
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['navigation']['ttfb'], 120.5)
+        with open(summary['har']) as f:
+            self.assertEqual(len(json.load(f)['log']['entries']), 4)
+            
+    def test_slow_page_keeps_trace(self):
+        """Test that the trace of a page over the threshold is saved."""
+        summary = self.diagnostics.collect(FakeDriver(page_log()), 'http://example.com/', 7.5)
+        with open(summary['trace']) as f:
+            self.assertEqual(len(json.load(f)['traceEvents']), 1)
+            
+    def test_report_ranks_pages_and_hosts(self):
+        """Test the slowest pages and third-party hosts of a batch."""
+        report = DiagnosticsReport()
+        report.add('http://example.com/', self.diagnostics.collect(FakeDriver(page_log()), 'http://example.com/', 2.0))
+        report.add('http://other.org/', self.diagnostics.collect(FakeDriver(page_log()), 'http://other.org/', 9.0))
+        
+        self.assertEqual([url for url, _ in report.slowest_pages()], ['http://other.org/', 'http://example.com/'])
+        hosts = dict(report.slowest_hosts())
+        self.assertEqual(hosts['cdn.tracker.net']['pages'], 2)
+        self.assertIn('www.example.com', hosts)  # third party on other.org only
+        self.assertEqual(hosts['www.example.com']['pages'], 1)
+        
+        report.save(self.temp_dir / "report.json")
+        with open(self.temp_dir / "report.json") as f:
+            saved = json.load(f)
+        self.assertEqual(saved['slowest_third_party_hosts'][0]['host'], 'cdn.tracker.net')
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
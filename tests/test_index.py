@@ -0,0 +1,83 @@
+"""
+Unit tests for the capture index.
+"""
+
+import unittest
+import tempfile
+import io
+import json
+from contextlib import redirect_stdout
+from pathlib import Path
+from webshot.cli import run
+from webshot.index import CaptureIndex, index_path
+from webshot.results import CaptureResult
+
+
+class TestCaptureIndex(unittest.TestCase):
+    """Test cases for CaptureIndex."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.index = CaptureIndex(index_path(self.output_dir), batch_size=10)
+        self.options = {'type': 'viewport', 'width': 1920, 'height': 1080,
+                        'output_dir': str(self.output_dir)}
+        
+    def tearDown(self):
+        """Stop the writer."""
+        self.index.close()
+        
+    def _capture(self, url, captured_at, **kwargs):
+        """Record a successful capture."""
+        result = CaptureResult(url=url, location=f"{url[-5:]}.png", captured_at=captured_at,
+                               width=1920, height=1080, size=1234, content_hash="abc",
+                               timings={'navigate': 0.5}, **kwargs)
+        self.index.record(url, result.status, result=result, options=self.options)
+        
+    def test_record_and_query(self):
+        """Test that records round-trip with options and timings."""
+        self._capture("https://example.com/a", 100.0)
+        self.index.flush()
+        
+        record = self.index.latest("https://example.com/a")
+        self.assertEqual(record['domain'], "example.com")
+        self.assertEqual(record['width'], 1920)
+        self.assertEqual(record['content_hash'], "abc")
+        self.assertEqual(record['timings'], {'navigate': 0.5})
+        self.assertEqual(record['options'], {'type': 'viewport', 'width': 1920, 'height': 1080})
+        
+    def test_filters(self):
+        """Test filtering by domain, status and time."""
+        for i in range(25):
+            self._capture(f"https://site{i % 3}.com/page{i}", float(i))
+        self.index.record("https://down.com/", 'unreachable', options=self.options, error="DNS")
+        self.index.flush()
+        
+        self.assertEqual(len(self.index.query(domain="SITE0.com", limit=None)), 9)
+        self.assertEqual(len(self.index.query(since=10, until=19, limit=None)), 10)
+        self.assertEqual(self.index.query(status='unreachable')[0]['error'], "DNS")
+        self.assertEqual(self.index.counts(), {'captured': 25, 'unreachable': 1})
+        
+        oldest = self.index.query(limit=2, oldest_first=True)
+        self.assertEqual([r['captured_at'] for r in oldest], [0.0, 1.0])
+        
+    def test_close_writes_pending_records(self):
+        """Test that closing flushes a partial batch."""
+        self._capture("https://example.com/a", 100.0)
+        self.index.close()
+        self.assertEqual(len(CaptureIndex(self.index.path).query()), 1)
+        
+    def test_cli_query(self):
+        """Test the index command of the command-line interface."""
+        self._capture("https://example.com/a", 100.0)
+        self.index.close()
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = run(["index", "--output-dir", str(self.output_dir), "--json"])
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output.getvalue())['url'], "https://example.com/a")
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
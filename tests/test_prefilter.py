@@ -0,0 +1,77 @@
+"""
+Unit tests for the DNS and connectivity pre-filter.
+"""
+
+import unittest
+import socket
+from webshot.prefilter import prefilter_urls, host_resolver_rules
+
+
+class TestPrefilter(unittest.TestCase):
+    """Test cases for prefilter_urls."""
+    
+    def setUp(self):
+        """Open a listening socket and find a closed port."""
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.open_port = self.listener.getsockname()[1]
+        
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        self.closed_port = probe.getsockname()[1]
+        probe.close()
+        
+    def tearDown(self):
+        """Close the listening socket."""
+        self.listener.close()
+        
+    def test_split_reachable_and_unreachable(self):
+        """Test that only URLs on answering hosts are kept, in input order."""
+        urls = [
+            f"http://127.0.0.1:{self.open_port}/a",
+            f"http://127.0.0.1:{self.closed_port}/",
+            f"http://localhost:{self.open_port}/b",
+            "http://nonexistent.invalid/",
+            f"http://127.0.0.1:{self.open_port}/c",
+        ]
+        result = prefilter_urls(urls, timeout=2)
+        
+        self.assertEqual(result.reachable, [urls[0], urls[2], urls[4]])
+        self.assertIn("connection failed", result.failures[urls[1]])
+        self.assertIn("DNS", result.failures[urls[3]])
+        self.assertIn("localhost", result.resolved)
+        
+    def test_missing_host(self):
+        """Test that URLs without a host name fail without a lookup."""
+        result = prefilter_urls(["https:///path"], timeout=1)
+        self.assertEqual(result.failures, {"https:///path": "no host name"})
+        
+    def test_invalid_host_name(self):
+        """Test that a host name IDNA rejects fails alone instead of the whole check."""
+        bad = f"http://{'a' * 64}.example.com/"
+        good = f"http://127.0.0.1:{self.open_port}/"
+        result = prefilter_urls([bad, good], timeout=2)
+        self.assertEqual(result.reachable, [good])
+        self.assertIn("invalid host name", result.failures[bad])
+
+
+class TestHostResolverRules(unittest.TestCase):
+    """Test cases for host_resolver_rules."""
+    
+    def test_rules_format(self):
+        """Test IPv4, IPv6 and literal-address handling."""
+        rules = host_resolver_rules({
+            "example.com": "93.184.216.34",
+            "v6.example.com": "2606:2800:220:1::1",
+            "127.0.0.1": "127.0.0.1",
+        })
+        self.assertEqual(rules, "MAP example.com 93.184.216.34, MAP v6.example.com [2606:2800:220:1::1]")
+        
+    def test_empty(self):
+        """Test that nothing to map yields no rules."""
+        self.assertIsNone(host_resolver_rules({}))
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Unit tests for conditional HTTP pre-flight checks.
+"""
+
+import unittest
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from webshot.preflight import ValidatorStore, run_preflight
+
+
+class ValidatorHandler(BaseHTTPRequestHandler):
+    """Serves /etag with an ETag and /dated with a Last-Modified header."""
+    
+    ETAG = '"v1"'
+    LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+    
+    def do_HEAD(self):
+        """Answer conditional HEAD requests."""
+        if self.path.startswith("/slow"):
+            time.sleep(0.1)
+        if self.path == "/etag" or self.path.startswith("/slow"):
+            if self.headers.get("If-None-Match") == self.ETAG:
+                self.send_response(304)
+            else:
+                self.send_response(200)
+            self.send_header("ETag", self.ETAG)
+        elif self.path == "/dated":
+            if self.headers.get("If-Modified-Since") == self.LAST_MODIFIED:
+                self.send_response(304)
+            else:
+                self.send_response(200)
+            self.send_header("Last-Modified", self.LAST_MODIFIED)
+        elif self.path == "/plain":
+            self.send_response(200)
+        else:
+            self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        
+    def log_message(self, format, *args):
+        """Keep test output quiet."""
+
+
+class TestPreflight(unittest.TestCase):
+    """Test cases for the pre-flight stage."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Start a local HTTP server."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ValidatorHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local HTTP server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        
+    def setUp(self):
+        """Set up test fixtures."""
+        self.store = ValidatorStore(Path(tempfile.mkdtemp()) / "validators.json")
+        self.urls = [f"{self.base}/etag", f"{self.base}/dated", f"{self.base}/plain"]
+        
+    def _remember(self, results):
+        """Store validators as the batch does after successful captures."""
+        for url, result in results.items():
+            self.store.update(url, result.etag, result.last_modified)
+            
+    def test_first_run_is_modified(self):
+        """Test that URLs without stored validators are all captured."""
+        results = run_preflight(self.urls, self.store)
+        self.assertEqual({r.status for r in results.values()}, {"modified"})
+        self.assertEqual(results[self.urls[0]].etag, '"v1"')
+        self.assertEqual(results[self.urls[1]].last_modified, ValidatorHandler.LAST_MODIFIED)
+        
+    def test_second_run_is_not_modified(self):
+        """Test that stored validators produce 304 skips."""
+        self._remember(run_preflight(self.urls, self.store))
+        self.store.save()
+        
+        store = ValidatorStore(self.store.path)
+        results = run_preflight(self.urls, store)
+        
+        self.assertTrue(results[self.urls[0]].not_modified)
+        self.assertTrue(results[self.urls[1]].not_modified)
+        self.assertFalse(results[self.urls[2]].not_modified)
+        
+    def test_force_capture(self):
+        """Test that forcing ignores stored validators."""
+        self._remember(run_preflight(self.urls, self.store))
+        results = run_preflight(self.urls, self.store, force=True)
+        self.assertFalse(any(r.not_modified for r in results.values()))
+        
+    def test_errors_are_reported(self):
+        """Test that HTTP errors and unreachable hosts are classified as errors."""
+        results = run_preflight([f"{self.base}/missing", "http://127.0.0.1:9/"], self.store, timeout=2)
+        self.assertEqual({r.status for r in results.values()}, {"error"})
+        
+    def test_queued_requests_do_not_time_out(self):
+        """Test that waiting for a free slot does not count against the timeout."""
+        urls = [f"{self.base}/slow?page={i}" for i in range(20)]
+        for url in urls:
+            self.store.update(url, etag=ValidatorHandler.ETAG)
+            
+        # 20 requests of 0.1 s over 2 slots take about 1 s, twice the timeout
+        results = run_preflight(urls, self.store, concurrency=2, timeout=0.5)
+        self.assertEqual({r.status for r in results.values()}, {"not_modified"})
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
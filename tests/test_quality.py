@@ -0,0 +1,168 @@
+"""
+Unit tests for the blank and error-page check.
+"""
+
+import unittest
+import tempfile
+import io
+from pathlib import Path
+from unittest import mock
+import numpy as np
+from PIL import Image, ImageDraw
+from webshot.browser import BrowserEngine
+from webshot.quality import ErrorSignatures, QualityChecker, image_measures
+
+
+def encode(image, fmt='PNG'):
+    """Encode an image to bytes."""
+    output = io.BytesIO()
+    image.save(output, fmt)
+    return output.getvalue()
+
+
+def busy_page():
+    """An image with plenty of detail, like a rendered page."""
+    rng = np.random.default_rng(1)
+    return Image.fromarray(rng.integers(0, 256, (600, 800, 3), dtype=np.uint8))
+
+
+def error_page():
+    """A stand-in for a browser error page: grey icon and text lines on white."""
+    image = Image.new('RGB', (800, 600), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 100, 160, 160), fill='gray')
+    for y in range(200, 400, 30):
+        draw.rectangle((100, y, 600, y + 12), fill='black')
+    return image
+
+
+class TestQualityChecker(unittest.TestCase):
+    """Test cases for QualityChecker."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.checker = QualityChecker(ErrorSignatures(self.temp_dir / "signatures.json"))
+        
+    def test_blank_frame_is_suspect(self):
+        """Test that a single-colour capture is flagged."""
+        report = self.checker.check(encode(Image.new('RGB', (800, 600), 'white')))
+        self.assertTrue(report.suspect)
+        self.assertEqual(report.uniform_ratio, 1.0)
+        self.assertEqual(report.entropy, 0.0)
+        self.assertIn("blank", report.reason)
+        
+    def test_spinner_is_suspect(self):
+        """Test that a lone spinner on a blank page is flagged."""
+        image = Image.new('RGB', (800, 600), 'white')
+        ImageDraw.Draw(image).ellipse((380, 280, 420, 320), outline='gray', width=4)
+        self.assertTrue(self.checker.check(encode(image, 'JPEG')).suspect)
+        
+    def test_rendered_page_passes(self):
+        """Test that a detailed capture is not flagged."""
+        report = self.checker.check(encode(busy_page()))
+        self.assertFalse(report.suspect)
+        self.assertGreater(report.entropy, 1)
+        
+    def test_error_page_signature(self):
+        """Test matching captures against a stored error-page signature."""
+        self.assertFalse(self.checker.check(encode(error_page())).suspect)
+        
+        self.checker.signatures.add("chrome-offline", error_page())
+        report = self.checker.check(encode(error_page()))
+        self.assertEqual(report.signature, "chrome-offline")
+        self.assertTrue(report.suspect)
+        
+        reloaded = ErrorSignatures(self.temp_dir / "signatures.json")
+        self.assertEqual(reloaded.hashes, self.checker.signatures.hashes)
+        self.assertIsNone(reloaded.match(busy_page()))
+        
+    def test_browser_error_page(self):
+        """Test that a page the browser reports as an error page is flagged."""
+        report = self.checker.check(encode(busy_page()), error_page=True)
+        self.assertEqual(report.reason, "browser error page")
+        
+    def test_measures(self):
+        """Test the uniform ratio of a half black, half white image."""
+        image = Image.new('L', (200, 100), 0)
+        image.paste(255, (100, 0, 200, 100))
+        uniform, entropy = image_measures(image)
+        self.assertAlmostEqual(uniform, 0.5, places=1)
+        self.assertAlmostEqual(entropy, 1.0, delta=0.2)
+
+
+class SlowPageDriver:
+    """Shows a blank frame until the page has had time to render."""
+    
+    def __init__(self, frames, url="https://example.com"):
+        self.frames = list(frames)
+        self.url = url
+        self.loads = 0
+        
+    def get(self, url):
+        """Pretend to load a page."""
+        self.loads += 1
+        
+    def execute_script(self, script, *args):
+        """Answer document.URL."""
+        return self.url
+        
+    def execute_cdp_cmd(self, command, params):
+        """Accept device emulation."""
+        return {}
+        
+    def get_screenshot_as_png(self):
+        """Return the next frame."""
+        return self.frames.pop(0)
+
+
+class TestCaptureRetry(unittest.TestCase):
+    """Test cases for retrying suspect captures in the engine."""
+    
+    def setUp(self):
+        """Patch out the page-load waits."""
+        patcher = mock.patch('webshot.browser.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def _engine(self, driver, **options):
+        """Create an engine with quality checks and the given driver."""
+        engine = BrowserEngine(dict({'output_dir': tempfile.mkdtemp(), 'width': 800, 'height': 600,
+                                     'zoom': 1.0, 'format': 'png', 'quality': None, 'type': 'viewport',
+                                     'quality_check': True, 'quality_retries': 2,
+                                     'quality_retry_wait': 3.0}, **options))
+        engine.driver = driver
+        return engine
+        
+    def test_blank_capture_is_retried(self):
+        """Test that a blank frame is taken again after a longer wait."""
+        blank = encode(Image.new('RGB', (800, 600), 'white'))
+        driver = SlowPageDriver([blank, blank, encode(busy_page())])
+        result = self._engine(driver).capture_screenshot("https://example.com")
+        
+        self.assertEqual(result.status, 'captured')
+        self.assertIsNone(result.suspect_reason)
+        self.assertEqual(driver.loads, 1)
+        self.assertEqual(self.sleep.call_args_list[-2:], [mock.call(3.0), mock.call(6.0)])
+        
+    def test_retry_budget(self):
+        """Test that a capture still blank after the retries is saved and flagged."""
+        blank = encode(Image.new('RGB', (800, 600), 'white'))
+        driver = SlowPageDriver([blank] * 3)
+        result = self._engine(driver).capture_screenshot("https://example.com")
+        
+        self.assertEqual(result.status, 'suspect')
+        self.assertIn("blank", result.suspect_reason)
+        self.assertTrue(Path(result.location).exists())
+        
+    def test_error_page_is_reloaded(self):
+        """Test that a browser error page is loaded again before the retry."""
+        driver = SlowPageDriver([encode(busy_page())] * 2, url="chrome-error://chromewebdata/")
+        result = self._engine(driver, quality_retries=1).capture_screenshot("https://example.com")
+        
+        self.assertEqual(driver.loads, 2)
+        self.assertEqual(result.suspect_reason, "browser error page")
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
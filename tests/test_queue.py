@@ -3,9 +3,11 @@ Unit tests for queue management.
 """
 
 import unittest
+import asyncio
 import time
 import threading
-from webshot.queue_manager import QueueManager
+from concurrent.futures import CancelledError
+from webshot.queue_manager import QueueManager, TaskResult
 
 
 class TestQueueManager(unittest.TestCase):
@@ -42,7 +44,7 @@ class TestQueueManager(unittest.TestCase):
         self.queue_manager.start_workers(2, mock_worker)
         
         # Wait for processing
-        time.sleep(1)
+        self.assertTrue(self.queue_manager.join(timeout=5))
         
         # Check results
         results = self.queue_manager.get_results()
@@ -62,7 +64,7 @@ class TestQueueManager(unittest.TestCase):
         self.queue_manager.start_workers(1, failing_worker)
         
         # Wait for processing
-        time.sleep(1)
+        self.assertTrue(self.queue_manager.join(timeout=5))
         
         # Check results
         results = self.queue_manager.get_results()
@@ -96,9 +98,7 @@ class TestQueueManager(unittest.TestCase):
         self.queue_manager.start_workers(2, slow_worker)
         
         # Wait for completion
-        while not self.queue_manager.is_empty():
-            time.sleep(0.1)
-        time.sleep(1)  # Extra time for workers to finish
+        self.assertTrue(self.queue_manager.join(timeout=5))
         
         # With 2 workers processing 4 URLs that take 0.5s each,
         # it should take about 1 second (2 batches of 2)
@@ -107,6 +107,210 @@ class TestQueueManager(unittest.TestCase):
         
         # Stop workers
         self.queue_manager.stop_workers()
+        
+        
+    def test_resize_workers(self):
+        """Test adding and retiring workers at runtime."""
+        def slow_worker(url):
+            time.sleep(0.1)
+            return url
+            
+        self.queue_manager.add_urls([f"http://example{i}.com" for i in range(10)])
+        self.queue_manager.start_workers(1, slow_worker)
+        
+        self.queue_manager.add_worker()
+        self.queue_manager.add_worker()
+        self.assertEqual(self.queue_manager.worker_count, 3)
+        
+        self.queue_manager.retire_worker()
+        self.assertEqual(self.queue_manager.worker_count, 2)
+        
+        self.assertTrue(self.queue_manager.join(timeout=5))
+        self.assertEqual(len(self.queue_manager.workers), 2)
+        self.assertEqual(len(self.queue_manager.get_results()), 10)
+        
+        stats = self.queue_manager.get_stats(window=10)
+        self.assertEqual(stats['completed'], 10)
+        self.assertGreaterEqual(stats['p95_latency'], 0.1)
+        
+        self.queue_manager.stop_workers()
+        
+    def test_retry_on(self):
+        """Test that retryable errors requeue a URL until its budget is spent."""
+        attempts = []
+        retried = []
+        
+        def crashing_worker(url):
+            attempts.append(url)
+            if url.endswith("flaky.com") and attempts.count(url) == 1:
+                raise ConnectionError("browser gone")
+            if url.endswith("broken.com"):
+                raise ConnectionError("browser gone")
+            return url
+            
+        self.queue_manager = QueueManager(max_retries=2, retry_on=(ConnectionError,),
+                                          on_retry=lambda url, error, attempt: retried.append((url, attempt)))
+        self.queue_manager.add_urls(["http://flaky.com", "http://broken.com"])
+        self.queue_manager.start_workers(1, crashing_worker)
+        
+        self.assertTrue(self.queue_manager.join(timeout=5))
+        
+        results = {url: success for success, url, _ in self.queue_manager.get_results()}
+        self.assertEqual(results, {"http://flaky.com": True, "http://broken.com": False})
+        self.assertEqual(attempts.count("http://broken.com"), 3)
+        self.assertIn(("http://broken.com", 2), retried)
+        self.assertNotIn(("http://broken.com", 3), retried)
+        
+        self.queue_manager.stop_workers()
+
+
+class TestCompletion(unittest.TestCase):
+    """Test cases for the event-driven completion API."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.queue_manager = QueueManager()
+        self.addCleanup(self.queue_manager.stop_workers)
+        
+    @staticmethod
+    def worker(url):
+        """Fail on URLs containing 'bad', return the upper-cased URL otherwise."""
+        time.sleep(0.01)
+        if "bad" in url:
+            raise ValueError(f"cannot load {url}")
+        return url.upper()
+        
+    def test_futures(self):
+        """Test that every submitted URL gets a future with a typed result."""
+        good, bad = self.queue_manager.add_urls(["http://good.com", "http://bad.com"])
+        self.queue_manager.start_workers(2, self.worker)
+        
+        result = good.result(timeout=5)
+        self.assertIsInstance(result, TaskResult)
+        self.assertEqual(result.value, "HTTP://GOOD.COM")
+        self.assertEqual(result.attempts, 1)
+        self.assertGreater(result.duration, 0)
+        
+        failure = bad.result(timeout=5)
+        self.assertFalse(failure.success)
+        self.assertIsInstance(failure.exception, ValueError)
+        self.assertEqual(tuple(failure), (False, "http://bad.com", "cannot load http://bad.com"))
+        
+    def test_as_completed(self):
+        """Test iterating results until all URLs have settled."""
+        urls = [f"http://site{i}.com" for i in range(5)] + ["http://bad.com"]
+        self.queue_manager.add_urls(urls)
+        self.queue_manager.start_workers(3, self.worker)
+        
+        results = list(self.queue_manager.as_completed(timeout=5))
+        self.assertEqual(sorted(result.url for result in results), sorted(urls))
+        self.assertEqual(sum(not result.success for result in results), 1)
+        self.assertEqual(self.queue_manager.unsettled, 0)
+        
+    def test_as_completed_timeout(self):
+        """Test that waiting for a result gives up after the timeout."""
+        self.queue_manager.add_urls(["http://example.com"])
+        with self.assertRaises(TimeoutError):
+            next(self.queue_manager.as_completed(timeout=0.05))
+        self.assertFalse(self.queue_manager.join(timeout=0.05))
+        
+    def test_done_callbacks(self):
+        """Test that callbacks see every result, even if one of them fails."""
+        seen = []
+        
+        def broken_callback(result):
+            raise RuntimeError("callback bug")
+            
+        self.queue_manager.add_done_callback(broken_callback)
+        self.queue_manager.add_done_callback(lambda result: seen.append(result.url))
+        self.queue_manager.add_urls(["http://a.com", "http://bad.com"])
+        self.queue_manager.start_workers(1, self.worker)
+        
+        self.assertTrue(self.queue_manager.join(timeout=5))
+        self.assertEqual(sorted(seen), ["http://a.com", "http://bad.com"])
+        
+    def test_results_async(self):
+        """Test consuming results from an asyncio event loop."""
+        urls = [f"http://site{i}.com" for i in range(4)]
+        
+        async def consume():
+            self.queue_manager.add_urls(urls)
+            self.queue_manager.start_workers(2, self.worker)
+            return [result.url async for result in self.queue_manager.results_async()]
+            
+        self.assertEqual(sorted(asyncio.run(asyncio.wait_for(consume(), 5))), urls)
+        
+    def test_cancel_pending(self):
+        """Test that queued URLs are cancelled and count as settled."""
+        release = threading.Event()
+        
+        def blocking_worker(url):
+            release.wait(5)
+            return url
+            
+        futures = self.queue_manager.add_urls([f"http://site{i}.com" for i in range(4)])
+        self.queue_manager.start_workers(1, blocking_worker)
+        while not futures[0].running():
+            time.sleep(0.01)
+            
+        self.assertEqual(self.queue_manager.cancel_pending(), 3)
+        self.assertTrue(all(future.cancelled() for future in futures[1:]))
+        with self.assertRaises(CancelledError):
+            futures[1].result()
+            
+        release.set()
+        results = list(self.queue_manager.as_completed(timeout=5))
+        self.assertEqual([result.url for result in results], ["http://site0.com"])
+        self.assertTrue(self.queue_manager.join(timeout=0))
+        
+    def test_cancel_returned_future(self):
+        """Test that a future cancelled by its consumer counts as settled."""
+        futures = self.queue_manager.add_urls([f"http://site{i}.com" for i in range(3)])
+        self.assertTrue(futures[1].cancel())
+        self.assertEqual(self.queue_manager.unsettled, 2)
+        
+        self.queue_manager.start_workers(1, self.worker)
+        self.assertTrue(self.queue_manager.join(timeout=2))
+        self.assertEqual([result.url for result in self.queue_manager.as_completed(timeout=2)],
+                         ["http://site0.com", "http://site2.com"])
+        
+    def test_cancel_requeued(self):
+        """Test that cancelling a URL waiting for its retry resolves its future."""
+        release = threading.Event()
+        
+        def worker(url):
+            if url == "http://flaky.com":
+                raise ConnectionError("browser gone")
+            release.wait(5)
+            return url
+            
+        self.queue_manager = QueueManager(max_retries=1, retry_on=(ConnectionError,))
+        self.addCleanup(self.queue_manager.stop_workers)
+        flaky, slow = self.queue_manager.add_urls(["http://flaky.com", "http://slow.com"])
+        self.queue_manager.start_workers(1, worker)
+        while not slow.running():
+            time.sleep(0.01)
+            
+        # The flaky URL now waits behind the slow one for its retry
+        self.assertEqual(self.queue_manager.cancel_pending(), 1)
+        with self.assertRaises(CancelledError):
+            flaky.result(timeout=5)
+            
+        release.set()
+        self.assertEqual([result.url for result in self.queue_manager.as_completed(timeout=5)],
+                         ["http://slow.com"])
+        
+    def test_idle_workers_block(self):
+        """Test that idle workers wake up for new URLs and for stop."""
+        self.queue_manager.start_workers(2, self.worker)
+        time.sleep(0.05)
+        future = self.queue_manager.submit("http://late.com")
+        self.assertTrue(future.result(timeout=5).success)
+        
+        started = time.monotonic()
+        self.queue_manager.stop_workers()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.queue_manager.workers, [])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+"""
+Unit tests for the recurring capture scheduler.
+"""
+
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+from webshot.scheduler import ScheduledJob, Scheduler
+
+
+class TestScheduledJob(unittest.TestCase):
+    """Test cases for job slots."""
+    
+    def test_offset_is_deterministic_and_spread(self):
+        """Test that offsets depend only on the name and stay inside the interval."""
+        offsets = [ScheduledJob(name=f"job{i}", interval=3600).offset for i in range(50)]
+        self.assertEqual(offsets[0], ScheduledJob(name="job0", interval=3600).offset)
+        self.assertTrue(all(0 <= offset < 3600 for offset in offsets))
+        self.assertGreater(len({int(offset // 600) for offset in offsets}), 3)
+        
+    def test_jitter_limits_spread(self):
+        """Test that the jitter bounds the offset."""
+        self.assertLess(ScheduledJob(name="daily", interval=86400, jitter=600).offset, 600)
+        
+    def test_next_slot(self):
+        """Test that slots repeat every interval after the offset."""
+        job = ScheduledJob(name="job", interval=100)
+        first = job.next_slot(0)
+        self.assertAlmostEqual(first, job.offset if job.offset > 0 else 100)
+        self.assertAlmostEqual(job.next_slot(first), first + 100)
+        self.assertAlmostEqual(job.next_slot(first + 50), first + 100)
+
+
+class TestScheduler(unittest.TestCase):
+    """Test cases for the scheduler."""
+    
+    def setUp(self):
+        """Set up a scheduler whose jobs block until released."""
+        self.state_file = Path(tempfile.mkdtemp()) / "schedule.json"
+        self.release = threading.Event()
+        self.runs = []
+        self.scheduler = Scheduler(self.state_file, run_job=self._run, max_concurrent=2)
+        
+    def tearDown(self):
+        """Let running jobs finish."""
+        self.release.set()
+        self.scheduler.stop()
+        
+    def _run(self, job):
+        """Record the run and wait for the test to release it."""
+        self.runs.append(job.name)
+        self.release.wait(5)
+        return 0
+        
+    def _add(self, name, interval=100):
+        """Add a job that is due right away."""
+        self.scheduler.add(ScheduledJob(name=name, interval=interval, urls=["https://example.com"]))
+        job = self.scheduler.jobs[name]
+        job.next_run = 0
+        return job
+        
+    def test_concurrency_cap(self):
+        """Test that no more than max_concurrent jobs run at once."""
+        for name in ("a", "b", "c"):
+            self._add(name)
+        self.assertEqual(len(self.scheduler.tick(now=1)), 2)
+        self.assertEqual(len(self.scheduler.running()), 2)
+        
+        waiting = next(job for job in self.scheduler.jobs.values() if job.name not in self.scheduler.running())
+        self.assertEqual(waiting.next_run, 0)  # Still due once a slot frees up
+        
+    def test_no_overlapping_runs(self):
+        """Test that a job still running skips its next slot."""
+        job = self._add("a")
+        self.assertEqual(self.scheduler.tick(now=1), ["a"])
+        job.next_run = 2
+        self.assertEqual(self.scheduler.tick(now=3), [])
+        self.assertEqual(job.skipped, 1)
+        self.assertGreater(job.next_run, 3)
+        
+    def test_state_persists(self):
+        """Test that jobs and their history survive a restart."""
+        self._add("a")
+        self.scheduler.tick(now=1)
+        self.release.set()
+        self.scheduler.stop()
+        
+        reloaded = Scheduler(self.state_file)
+        job = reloaded.jobs["a"]
+        self.assertEqual(job.runs, 1)
+        self.assertEqual(job.last_failures, 0)
+        self.assertEqual(job.urls, ["https://example.com"])
+        self.assertGreater(job.next_run, 1)
+        
+    def test_jobs_changed_by_another_process(self):
+        """Test that jobs added or removed elsewhere survive the scheduler's saves."""
+        self._add("a")
+        self._add("c")
+        self.scheduler.tick(now=1)
+        
+        # `siteseeing schedule add/remove` works on its own Scheduler
+        other = Scheduler(self.state_file)
+        other.add(ScheduledJob(name="b", interval=100, urls=["https://example.org"]))
+        other.remove("c")
+        
+        self.release.set()
+        self.scheduler.stop()
+        self.assertEqual(sorted(self.scheduler.jobs), ["a", "b"])
+        reloaded = Scheduler(self.state_file)
+        self.assertEqual(sorted(reloaded.jobs), ["a", "b"])
+        self.assertEqual(reloaded.jobs["a"].runs, 1)
+        
+    def test_concurrent_saves(self):
+        """Test that saves from several threads never fail or tear the state file."""
+        for name in ("a", "b", "c"):
+            self._add(name)
+        errors = []
+        
+        def save_repeatedly():
+            try:
+                for _ in range(50):
+                    self.scheduler.save()
+            except Exception as e:
+                errors.append(e)
+                
+        threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(Scheduler(self.state_file).jobs), ["a", "b", "c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Unit tests for the HTTP capture service.
+"""
+
+import unittest
+import tempfile
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from webshot.server import CaptureService, StubEngine, create_server
+
+
+class TestCaptureService(unittest.TestCase):
+    """Test cases for the capture service on localhost with the stub engine."""
+    
+    def start_service(self, workers=2, queue_size=10, delay=0.3, cache=False):
+        """Start a service and an HTTP server on a free port."""
+        options = {'type': 'viewport', 'width': 320, 'height': 200, 'zoom': 1.0,
+                   'format': 'png', 'quality': None, 'output_dir': tempfile.mkdtemp(), 'cache': cache}
+        self.engines = []
+        
+        def factory(options, store):
+            engine = StubEngine(options, store, delay=delay)
+            self.engines.append(engine)
+            return engine
+            
+        self.service = CaptureService(options, engine_factory=factory, workers=workers,
+                                      queue_size=queue_size)
+        self.server = create_server(self.service, port=0)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.service.start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        
+    def tearDown(self):
+        """Stop the server and the service."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.stop()
+        
+    def post(self, body):
+        """POST a capture request and return (status, headers, body)."""
+        request = urllib.request.Request(f"{self.base}/captures", data=json.dumps(body).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+            
+    def get(self, path):
+        """GET a path and return (status, body)."""
+        try:
+            with urllib.request.urlopen(f"{self.base}{path}", timeout=10) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+            
+    def test_wait_returns_image(self):
+        """Test that a waiting request gets the image back."""
+        self.start_service(delay=0)
+        status, headers, body = self.post({'url': "https://example.com", 'wait': 5,
+                                           'options': {'width': 400}})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], "image/png")
+        self.assertTrue(body.startswith(b'\x89PNG'))
+        
+    def test_poll_job(self):
+        """Test submitting without waiting and polling the job."""
+        self.start_service()
+        status, headers, body = self.post({'url': "https://example.com"})
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)['id']
+        self.assertEqual(headers['Location'], f"/captures/{job_id}")
+        
+        for _ in range(50):
+            job = json.loads(self.get(f"/captures/{job_id}")[1])
+            if job['status'] == 'done':
+                break
+            time.sleep(0.1)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['width'], 320)
+        
+        status, body = self.get(f"/captures/{job_id}/image")
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith(b'\x89PNG'))
+        
+    def test_element_parts(self):
+        """Test that each element of a multi-selector capture has its own image."""
+        self.start_service(delay=0)
+        status, headers, _ = self.post({'url': "https://example.com", 'wait': 5,
+                                        'options': {'type': 'element', 'selectors': ['#a', '.b']}})
+        self.assertEqual(status, 200)
+        
+        job = json.loads(self.get(f"/captures/{headers['X-Job-Id']}")[1])
+        self.assertEqual([part['selector'] for part in job['parts']], ['#a', '.b'])
+        status, body = self.get(job['parts'][1]['image'])
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith(b'\x89PNG'))
+        
+    def test_identical_requests_are_coalesced(self):
+        """Test that concurrent identical requests share one capture."""
+        self.start_service()
+        responses = []
+        threads = [
+            threading.Thread(target=lambda: responses.append(
+                self.post({'url': "https://example.com", 'wait': 5})))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        self.assertEqual([status for status, _, _ in responses], [200] * 5)
+        self.assertEqual(len({headers['X-Job-Id'] for _, headers, _ in responses}), 1)
+        self.assertEqual(sum(engine.captures for engine in self.engines), 1)
+        self.assertEqual(self.service.stats()['coalesced'], 4)
+        
+    def test_repeat_request_served_from_cache(self):
+        """Test that a repeated request does not reach an engine."""
+        self.start_service(delay=0, cache=True)
+        first = self.post({'url': "https://example.com", 'wait': 5})
+        second = self.post({'url': "https://EXAMPLE.com/", 'wait': 5})
+        
+        self.assertEqual(first[2], second[2])
+        self.assertEqual(sum(engine.captures for engine in self.engines), 1)
+        self.assertEqual(self.service.stats()['cache']['hits'], 1)
+        
+    def test_full_queue_returns_503(self):
+        """Test that a full request queue rejects new captures."""
+        self.start_service(workers=1, queue_size=1, delay=1.0)
+        statuses = [self.post({'url': f"https://example{i}.com"})[0] for i in range(3)]
+        self.assertIn(503, statuses)
+        
+        status, headers, _ = self.post({'url': "https://example9.com"})
+        self.assertEqual(status, 503)
+        self.assertEqual(headers['Retry-After'], "5")
+        
+    def test_invalid_request(self):
+        """Test that bad URLs and options are rejected with 400."""
+        self.start_service()
+        self.assertEqual(self.post({'url': ""})[0], 400)
+        self.assertEqual(self.post({'url': "https://example.com", 'options': {'output_dir': "/"}})[0], 400)
+        self.assertEqual(self.get("/captures/unknown")[0], 404)
+
+
+class TestStubMode(unittest.TestCase):
+    """Test cases for serving without a browser."""
+    
+    def test_stub_mode_needs_no_browser(self):
+        """Test that serving with the stub engine never imports Selenium."""
+        script = (
+            "import sys, tempfile\n"
+            "from webshot.server import CaptureService, StubEngine\n"
+            "options = {'type': 'viewport', 'width': 32, 'height': 20, 'zoom': 1.0, 'format': 'png',\n"
+            "           'quality': None, 'output_dir': tempfile.mkdtemp(), 'cache': False}\n"
+            "service = CaptureService(options, engine_factory=lambda o, s: StubEngine(o, s, delay=0), workers=1)\n"
+            "service.start()\n"
+            "job = service.submit('https://example.com', {})\n"
+            "job.done.wait(10)\n"
+            "service.stop()\n"
+            "assert job.status == 'done', job.status\n"
+            "print('selenium' in sys.modules)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60)
+        self.assertEqual(output.stdout.strip(), "False", output.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
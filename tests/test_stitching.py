@@ -0,0 +1,114 @@
+"""
+Unit tests for full-page stitching sinks.
+"""
+
+import unittest
+import tempfile
+import io
+import json
+from pathlib import Path
+from PIL import Image
+from webshot.stitching import MemorySink, PNGStreamWriter, TileWriter
+
+
+def make_strip(width, height, color):
+    """Create a solid-colour strip."""
+    return Image.new('RGB', (width, height), color)
+
+
+class TestPNGStreamWriter(unittest.TestCase):
+    """Test cases for PNGStreamWriter."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        
+    def test_round_trip(self):
+        """Test that streamed rows decode to the same pixels."""
+        path = self.temp_dir / "page.png"
+        writer = PNGStreamWriter(path, 40, 30, chunk_size=64)
+        writer.write(make_strip(40, 10, (255, 0, 0)))
+        writer.write(make_strip(40, 20, (0, 0, 255)))
+        writer.close()
+        
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (40, 30))
+            self.assertEqual(img.getpixel((5, 5)), (255, 0, 0))
+            self.assertEqual(img.getpixel((5, 25)), (0, 0, 255))
+            
+    def test_truncates_and_pads(self):
+        """Test that rows past the declared height are dropped and gaps padded."""
+        path = self.temp_dir / "short.png"
+        writer = PNGStreamWriter(path, 10, 20)
+        writer.write(make_strip(10, 5, (0, 255, 0)))
+        writer.close()
+        
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (10, 20))
+            self.assertEqual(img.getpixel((0, 19)), (255, 255, 255))
+            
+        path = self.temp_dir / "long.png"
+        writer = PNGStreamWriter(path, 10, 5)
+        writer.write(make_strip(10, 50, (0, 255, 0)))
+        writer.close()
+        
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (10, 5))
+
+
+class TestTileWriter(unittest.TestCase):
+    """Test cases for TileWriter."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        
+    def test_tiles_and_index(self):
+        """Test that strips are cut into fixed-height tiles."""
+        writer = TileWriter(self.temp_dir / "page", 20, 25, tile_height=10)
+        writer.write(make_strip(20, 15, (255, 0, 0)))
+        writer.write(make_strip(20, 10, (0, 0, 255)))
+        directory = writer.close()
+        
+        index = json.loads((directory / "index.json").read_text())
+        self.assertEqual(index['height'], 25)
+        tiles = index['levels'][0]['tiles']
+        self.assertEqual(len(tiles), 3)
+        
+        with Image.open(directory / tiles[1]) as tile:
+            self.assertEqual(tile.size, (20, 10))
+            self.assertEqual(tile.getpixel((0, 0)), (255, 0, 0))
+            self.assertEqual(tile.getpixel((0, 9)), (0, 0, 255))
+        with Image.open(directory / tiles[2]) as tile:
+            self.assertEqual(tile.size, (20, 5))
+            
+    def test_pyramid(self):
+        """Test that pyramid levels halve until a single tile remains."""
+        writer = TileWriter(self.temp_dir / "pyramid", 16, 40, tile_height=10, pyramid=True)
+        writer.write(make_strip(16, 40, (10, 20, 30)))
+        directory = writer.close()
+        
+        index = json.loads((directory / "index.json").read_text())
+        counts = [len(level['tiles']) for level in index['levels']]
+        self.assertEqual(counts, [4, 2, 1])
+        
+        with Image.open(directory / index['levels'][2]['tiles'][0]) as top:
+            self.assertEqual(top.size, (4, 10))
+
+
+class TestMemorySink(unittest.TestCase):
+    """Test cases for MemorySink."""
+    
+    def test_stitch(self):
+        """Test stitching strips into PNG bytes."""
+        sink = MemorySink(8, 12)
+        sink.write(make_strip(8, 6, (1, 2, 3)))
+        sink.write(make_strip(8, 6, (4, 5, 6)))
+        
+        with Image.open(io.BytesIO(sink.close())) as img:
+            self.assertEqual(img.size, (8, 12))
+            self.assertEqual(img.getpixel((0, 11)), (4, 5, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Unit tests for output storage backends.
+"""
+
+import unittest
+import tempfile
+import json
+import tarfile
+from pathlib import Path
+from webshot.storage import LooseFileStore, ArchiveStore, unique_stem
+
+
+class TestLooseFileStore(unittest.TestCase):
+    """Test cases for LooseFileStore."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        
+    def test_same_domain_does_not_collide(self):
+        """Test that rapid captures of one domain get distinct files."""
+        store = LooseFileStore(self.temp_dir)
+        locations = {store.save("https://www.example.com/", b"data", "png") for _ in range(50)}
+        
+        self.assertEqual(len(locations), 50)
+        self.assertEqual(len(list(self.temp_dir.glob("example_com_*.png"))), 50)
+        
+    def test_unique_stem_format(self):
+        """Test the collision-proof stem layout."""
+        stem = unique_stem("https://www.example.com/path")
+        self.assertTrue(stem.startswith("example_com_"))
+        self.assertEqual(len(stem.split("_")), 6)
+
+
+class TestArchiveStore(unittest.TestCase):
+    """Test cases for ArchiveStore."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        
+    def test_index_offsets_point_at_data(self):
+        """Test that index offsets can be used to read members back directly."""
+        store = ArchiveStore(self.temp_dir, shard_max_bytes=4096)
+        payloads = {f"https://site{i}.com/": bytes([i]) * 1500 for i in range(6)}
+        for url, data in payloads.items():
+            store.save(url, data, "png")
+        store.close()
+        
+        entries = [json.loads(line) for line in (self.temp_dir / "index.jsonl").read_text().splitlines()]
+        self.assertEqual(len(entries), 6)
+        self.assertGreater(len({entry['shard'] for entry in entries}), 1)
+        
+        for entry in entries:
+            with open(self.temp_dir / entry['shard'], 'rb') as f:
+                f.seek(entry['offset'])
+                self.assertEqual(f.read(entry['size']), payloads[entry['url']])
+                
+        for shard in self.temp_dir.glob("captures-*.tar"):
+            with tarfile.open(shard) as tar:
+                self.assertTrue(tar.getnames())
+                
+    def test_staged_directory_is_archived(self):
+        """Test that staged tile directories are appended and cleaned up."""
+        store = ArchiveStore(self.temp_dir)
+        staged = store.new_path("https://example.com/")
+        (staged / "0").mkdir(parents=True)
+        (staged / "0" / "tile_00000.png").write_bytes(b"tile")
+        (staged / "index.json").write_text("{}")
+        
+        location = store.add_path("https://example.com/", staged)
+        store.close()
+        
+        self.assertTrue(location.endswith("/index.json"))
+        self.assertFalse(staged.exists())
+        
+    def test_new_store_starts_new_shard(self):
+        """Test that existing shards are never appended to again."""
+        store = ArchiveStore(self.temp_dir)
+        store.save("https://example.com/", b"one", "png")
+        store.close()
+        
+        store = ArchiveStore(self.temp_dir)
+        location = store.save("https://example.com/", b"two", "png")
+        store.close()
+        
+        self.assertTrue(location.startswith("captures-00002.tar:"))
+        
+    def test_concurrent_stores_use_separate_shards(self):
+        """Test that two stores on one directory never write the same shard."""
+        first = ArchiveStore(self.temp_dir)
+        second = ArchiveStore(self.temp_dir)
+        payloads = {"https://one.com/": b"one" * 100, "https://two.com/": b"two" * 100}
+        first.save("https://one.com/", payloads["https://one.com/"], "png")
+        second.save("https://two.com/", payloads["https://two.com/"], "png")
+        first.close()
+        second.close()
+        
+        entries = [json.loads(line) for line in (self.temp_dir / "index.jsonl").read_text().splitlines()]
+        self.assertEqual(sorted(entry['shard'] for entry in entries),
+                         ["captures-00001.tar", "captures-00002.tar"])
+        for entry in entries:
+            with open(self.temp_dir / entry['shard'], 'rb') as f:
+                f.seek(entry['offset'])
+                self.assertEqual(f.read(entry['size']), payloads[entry['url']])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -5,6 +5,12 @@ Webshot - Core package for the Siteseeing application.
 __version__ = "1.0.0"
 __author__ = "Your Name"
 
-from .app import main
+__all__ = ["main"]
 
-__all__ = ["main"]
\ No newline at end of file
+
+def __getattr__(name):
+    """Import the application lazily so importing the package stays cheap."""
+    if name == "main":
+        from .app import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
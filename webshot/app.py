@@ -5,7 +5,6 @@ Main application module for Siteseeing.
 import sys
 import logging
 from pathlib import Path
-from .gui import SiteseeingGUI
 from .config import Config
 
 
@@ -24,8 +23,17 @@ def setup_logging():
     )
 
 
-def main():
-    """Main application entry point."""
+def main(argv=None):
+    """
+    Main application entry point.
+    
+    Starts the GUI, or runs a command-line command when arguments are given.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from .cli import run
+        sys.exit(run(argv))
+        
     setup_logging()
     logger = logging.getLogger(__name__)
     logger.info("Starting Siteseeing application")
@@ -33,7 +41,8 @@ def main():
     # Load configuration
     config = Config()
     
-    # Create and run GUI
+    # Create and run GUI; imported here so the commands work without a display
+    from .gui import SiteseeingGUI
     app = SiteseeingGUI(config)
     app.run()
     
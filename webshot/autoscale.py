@@ -0,0 +1,163 @@
+"""
+Adaptive worker autoscaling for QueueManager.
+
+The controller samples throughput, p95 capture latency, failure rate, CPU
+utilisation and available memory at a fixed interval and adjusts the
+number of browser workers with AIMD rules: one worker is added while the
+host has headroom and latency holds, one is removed when CPU saturates or
+latency rises without a throughput gain, and the pool is halved on memory
+pressure or a rising failure rate.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+import psutil
+
+
+@dataclass
+class Sample:
+    """One observation of the batch and the host."""
+    
+    workers: int
+    pending: int
+    throughput: float
+    p95_latency: Optional[float]
+    failure_rate: float
+    cpu_percent: float
+    available_mb: float
+
+
+class AutoScaler:
+    """Grows and shrinks the worker pool of a QueueManager at runtime."""
+    
+    def __init__(self, queue_manager, min_workers=1, max_workers=8, interval=10.0,
+                 cpu_high=85.0, memory_reserve_mb=1024, memory_per_worker_mb=400,
+                 latency_factor=1.5, failure_rate_high=0.3):
+        """
+        Initialize the controller.
+        
+        Args:
+            queue_manager: QueueManager whose workers are scaled
+            min_workers: Lower bound of the pool
+            max_workers: Upper bound of the pool
+            interval: Seconds between control decisions
+            cpu_high: CPU utilisation (percent) treated as saturated
+            memory_reserve_mb: Available memory below which the pool is halved
+            memory_per_worker_mb: Memory headroom required to add a worker
+            latency_factor: p95 growth over the best p95 seen that counts as rising
+            failure_rate_high: Failure rate that triggers a sharp back-off
+        """
+        self.logger = logging.getLogger(__name__)
+        self.queue_manager = queue_manager
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.interval = interval
+        self.cpu_high = cpu_high
+        self.memory_reserve_mb = memory_reserve_mb
+        self.memory_per_worker_mb = memory_per_worker_mb
+        self.latency_factor = latency_factor
+        self.failure_rate_high = failure_rate_high
+        
+        self.best_p95 = None
+        self.previous = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        
+    def start(self):
+        """Start the control loop in a background thread."""
+        psutil.cpu_percent(None)  # Prime the CPU counter
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="AutoScaler")
+        self._thread.start()
+        self.logger.info(f"Autoscaling between {self.min_workers} and {self.max_workers} workers")
+        
+    def stop(self):
+        """Stop the control loop."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+            
+    def _run(self):
+        """Control loop."""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                self.logger.error(f"Autoscaling step failed: {str(e)}")
+                
+    def sample(self):
+        """Observe the queue and the host."""
+        stats = self.queue_manager.get_stats(window=self.interval)
+        memory = psutil.virtual_memory()
+        return Sample(
+            workers=self.queue_manager.worker_count,
+            pending=self.queue_manager.get_queue_size(),
+            throughput=stats['throughput'],
+            p95_latency=stats['p95_latency'],
+            failure_rate=stats['failure_rate'],
+            cpu_percent=psutil.cpu_percent(None),
+            available_mb=memory.available / (1024 * 1024)
+        )
+        
+    def step(self):
+        """Take one sample and resize the pool towards the decided target."""
+        sample = self.sample()
+        target, reason = self.decide(sample)
+        
+        if target > sample.workers:
+            for _ in range(target - sample.workers):
+                self.queue_manager.add_worker()
+        elif target < sample.workers:
+            for _ in range(sample.workers - target):
+                self.queue_manager.retire_worker()
+                
+        if target != sample.workers:
+            self.logger.info(f"Autoscaling {sample.workers} -> {target} workers ({reason})")
+        return target
+        
+    def decide(self, sample):
+        """
+        Apply the AIMD rules to a sample.
+        
+        Returns:
+            Tuple of the target worker count and the reason for it
+        """
+        workers = sample.workers
+        previous, self.previous = self.previous, sample
+        
+        if sample.p95_latency is not None:
+            if self.best_p95 is None or sample.p95_latency < self.best_p95:
+                self.best_p95 = sample.p95_latency
+                
+        # Multiplicative decrease: memory pressure or a failure spike
+        if sample.available_mb < self.memory_reserve_mb:
+            return self._clamp(workers // 2), "memory pressure"
+        if sample.failure_rate > self.failure_rate_high and (
+                previous is None or sample.failure_rate > previous.failure_rate):
+            return self._clamp(workers // 2), "rising failure rate"
+            
+        # No finished tasks yet: nothing to judge latency or throughput by
+        if sample.p95_latency is None:
+            return self._clamp(workers), "warming up"
+            
+        if sample.cpu_percent > self.cpu_high:
+            return self._clamp(workers - 1), "CPU saturated"
+            
+        latency_rising = self.best_p95 and sample.p95_latency > self.best_p95 * self.latency_factor
+        throughput_gain = previous is None or sample.throughput > previous.throughput * 1.05
+        if latency_rising and not throughput_gain:
+            return self._clamp(workers - 1), "latency rising without throughput gain"
+            
+        # Additive increase while there is work queued and headroom left
+        headroom = sample.available_mb - self.memory_per_worker_mb >= self.memory_reserve_mb
+        if sample.pending > workers and headroom:
+            return self._clamp(workers + 1), "headroom available"
+            
+        return self._clamp(workers), "steady"
+        
+    def _clamp(self, workers):
+        """Keep a worker count within the configured bounds."""
+        return max(self.min_workers, min(self.max_workers, workers))
\ No newline at end of file
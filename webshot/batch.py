@@ -0,0 +1,341 @@
+"""
+Batch job runner shared by the front ends.
+
+A batch takes a list of URLs and a set of capture options, runs the
+optional pre-flight stages and then captures the remaining URLs on a
+QueueManager worker pool, one browser per worker. Every outcome is
+recorded in the capture index next to the outputs. A browser that crashes
+mid-capture is restarted and its URL requeued, so one dead renderer does
+not fail the batch. Input URLs that are spellings of one page are
+captured once, and a URL that leads to a page already captured in the
+job is recorded as an alias of that capture. Progress is reported
+through an ``emit(msg_type, data)`` callback using the same message
+types the GUI message queue understands: ``log`` lines and ``progress``
+dictionaries with ``done``, ``total`` and ``failures``.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlparse
+from .autoscale import AutoScaler
+from .browser import BrowserEngine
+from .cache import create_cache
+from .dedup import CapturedPages, alias_result, fold_duplicates
+from .diagnostics import DiagnosticsReport
+from .errors import BrowserCrashError
+from .index import CaptureIndex, index_path
+from .prefilter import PrefilterResult, prefilter_urls, host_resolver_rules
+from .preflight import ValidatorStore, run_preflight
+from .queue_manager import QueueManager
+from .storage import create_store
+from .utils import TRACKING_PARAMS
+
+
+class BatchRunner:
+    """Runs one capture job from URL list to finished outputs."""
+    
+    def __init__(self, options, emit=None, cancel_event=None):
+        """
+        Initialize the runner.
+        
+        Args:
+            options: Capture options dictionary
+            emit: Callback receiving (msg_type, data) progress messages
+            cancel_event: threading.Event that cancels the job when set,
+                even before run() is called
+        """
+        self.options = options
+        self.emit = emit or (lambda msg_type, data: None)
+        self.cancel_event = cancel_event or threading.Event()
+        self.logger = logging.getLogger(__name__)
+        self.running = False
+        self.total = 0
+        self.done = 0
+        self.failures = 0
+        self.crashes = Counter()
+        self.suspects = 0
+        self.aliases = 0
+        self.duplicates = {}
+        self.report = None
+        self.state_dir = Path(options['output_dir']) / ".siteseeing"
+        self.index = None
+        self._queue_manager = None
+        
+    def cancel(self):
+        """Ask the running job to stop after the current URL."""
+        self.cancel_event.set()
+        self.running = False
+        queue_manager = self._queue_manager
+        if queue_manager is not None:
+            queue_manager.cancel_pending()
+        
+    def run(self, urls):
+        """Process all URLs and return the number of failed captures."""
+        self.running = not self.cancel_event.is_set()
+        self.total = len(urls)
+        self.done = 0
+        self.failures = 0
+        self.crashes = Counter()
+        self.suspects = 0
+        self.aliases = 0
+        self.duplicates = {}
+        self.report = DiagnosticsReport() if self.options.get('diagnostics') else None
+        engine_options = self.options
+        
+        if self.options.get('capture_index', True):
+            self.index = CaptureIndex(index_path(self.options['output_dir']))
+            
+        try:
+            return self._run(urls, engine_options)
+        finally:
+            if self.index is not None:
+                self.index.close()
+                self.index = None
+                
+    def _run(self, urls, engine_options):
+        """Fold duplicates, filter, pre-flight and capture the URLs."""
+        if self.options.get('dedup_pages', True):
+            urls, self.duplicates = fold_duplicates(urls, self.options.get('strip_params', TRACKING_PARAMS))
+            folded = sum(len(others) for others in self.duplicates.values())
+            if folded:
+                self.emit("log", f"{folded} URLs are duplicates of others in the list and will not be captured again")
+                
+        if self.options.get('prefilter'):
+            prefilter = self._run_prefilter(urls)
+            for url, reason in prefilter.failures.items():
+                self._record_failure(url, f"✗ Unreachable: {url} - {reason}",
+                                     status='unreachable', error=reason)
+            urls = prefilter.reachable
+            
+            rules = host_resolver_rules(prefilter.resolved)
+            if rules:
+                engine_options = dict(self.options, host_resolver_rules=rules)
+                
+        validators = None
+        preflight = {}
+        if self.options.get('preflight'):
+            validators = ValidatorStore(self.state_dir / "validators.json")
+            preflight = self._run_preflight(urls, validators)
+            
+        to_capture = []
+        for url in urls:
+            check = preflight.get(url)
+            if check is not None and check.not_modified:
+                for same in [url] + self.duplicates.pop(url, []):
+                    self.done += 1
+                    self.emit("log", f"= Not modified: {same}")
+                    if self.index is not None:
+                        self.index.record(same, 'not_modified', options=self.options)
+            else:
+                to_capture.append(url)
+        self._emit_progress()
+        
+        try:
+            if to_capture and self.running:
+                self._capture_all(to_capture, engine_options, preflight, validators)
+        finally:
+            if validators is not None:
+                validators.save()
+                
+        return self.failures
+        
+    def _capture_all(self, urls, engine_options, preflight, validators):
+        """Capture URLs on a pool of workers, each with its own browser."""
+        store = create_store(engine_options)
+        cache = create_cache(engine_options)
+        use_cached = not self.options.get('force_capture', False)
+        local = threading.local()
+        crash_lock = threading.Lock()
+        pages = None
+        if self.options.get('dedup_pages', True):
+            pages = CapturedPages(self.options.get('strip_params', TRACKING_PARAMS))
+        
+        def capture(url):
+            # Cache hits are served before a browser is even started
+            if cache is not None and use_cached:
+                result = cache.lookup(url, engine_options, store)
+                if result is not None:
+                    return result
+                    
+            engine = getattr(local, 'engine', None)
+            if engine is None:
+                engine = BrowserEngine(engine_options, store=store, pages=pages)
+                local.engine = engine
+            if engine.driver is None:
+                engine.start()
+            self.emit("log", f"Processing: {url}")
+            try:
+                result = engine.capture_screenshot(url)
+            except BrowserCrashError as e:
+                with crash_lock:
+                    self.crashes[(urlparse(url).hostname or '').lower()] += 1
+                if self.index is not None:
+                    self.index.record(url, 'crashed', options=self.options, error=str(e))
+                # Replace the dead browser before the URL is requeued
+                engine.restart()
+                raise
+            if cache is not None:
+                cache.remember(url, engine_options, result)
+            return result
+            
+        def release():
+            engine = getattr(local, 'engine', None)
+            if engine is not None:
+                engine.stop()
+                local.engine = None
+                
+        def requeued(url, error, attempt):
+            self.emit("log", f"⚠ Browser crashed on {url}; retrying ({attempt}/{crash_retries})")
+            
+        crash_retries = self.options.get('crash_retries', 2)
+        queue_manager = QueueManager(max_retries=crash_retries, retry_on=(BrowserCrashError,),
+                                     on_retry=requeued)
+        queue_manager.add_urls(urls)
+        self._queue_manager = queue_manager
+        if not self.running:
+            queue_manager.cancel_pending()  # cancelled while the queue was being set up
+        
+        workers = max(1, self.options.get('threads', 1))
+        autoscaler = None
+        if self.options.get('autoscale'):
+            autoscaler = AutoScaler(
+                queue_manager,
+                min_workers=self.options.get('min_workers', 1),
+                max_workers=self.options.get('max_workers', 8)
+            )
+            workers = max(autoscaler.min_workers, min(autoscaler.max_workers, workers))
+            
+        queue_manager.start_workers(workers, capture, on_worker_exit=release)
+        if autoscaler:
+            autoscaler.start()
+            
+        try:
+            # Blocks until each result arrives; cancel() drops the queued URLs
+            for result in queue_manager.as_completed():
+                url = result.url
+                if result.success:
+                    self._record_success(url, result.value)
+                    check = preflight.get(url)
+                    if validators is not None and check is not None:
+                        validators.update(url, check.etag, check.last_modified)
+                else:
+                    self._record_failure(url, f"✗ Error: {url} - {result.error}", error=result.error)
+                
+        finally:
+            self._queue_manager = None
+            if autoscaler:
+                autoscaler.stop()
+            queue_manager.stop_workers()
+            store.close()
+            if cache is not None:
+                stats = cache.stats()
+                self.emit("log", f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+            if self.report is not None and self.report.pages:
+                self._write_report()
+            if self.suspects:
+                self.emit("log", f"{self.suspects} captures look blank or like error pages")
+            if self.aliases:
+                self.emit("log", f"{self.aliases} URLs led to pages already captured in this job")
+            if self.crashes:
+                hosts = ", ".join(f"{host} ({count})" for host, count in self.crashes.most_common())
+                self.emit("log", f"Browser crashes: {sum(self.crashes.values())} on {hosts}")
+                
+    def _record_success(self, url, result):
+        """Report a finished capture."""
+        self.done += 1
+        if self.report is not None and result.diagnostics:
+            self.report.add(url, result.diagnostics)
+        for part in result.parts or [result]:
+            if self.index is not None:
+                self.index.record(url, part.status, result=part, options=self.options,
+                                  error=part.suspect_reason)
+            if part.status == 'suspect':
+                self.suspects += 1
+                self.emit("log", f"⚠ Suspect: {part} - {part.suspect_reason}")
+            elif part.status == 'unchanged':
+                self.emit("log", f"= Unchanged: {url}")
+            elif part.status == 'cached':
+                self.emit("log", f"= Cached: {part}")
+            elif part.status == 'alias':
+                self.emit("log", f"= Same page as {part.alias_of}: {url}")
+            elif part.selector:
+                self.emit("log", f"✓ Saved: {part} ({part.selector})")
+            else:
+                self.emit("log", f"✓ Saved: {part}")
+        if result.status == 'alias':
+            self.aliases += 1
+        self._emit_progress()
+        
+        for same in self.duplicates.pop(url, []):
+            self._record_success(same, alias_result(result, same))
+        
+    def _record_failure(self, url, message, status='failed', error=None):
+        """Report a URL that could not be captured."""
+        self.done += 1
+        self.failures += 1
+        if self.index is not None:
+            self.index.record(url, status, options=self.options, error=error)
+        self.emit("log", message)
+        self._emit_progress()
+        
+        for same in self.duplicates.pop(url, []):
+            self._record_failure(same, message.replace(url, same), status=status, error=error)
+        
+    def _write_report(self):
+        """Save the diagnostics report and log the slowest pages and hosts."""
+        path = self.state_dir / "diagnostics" / f"report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        self.report.save(path)
+        
+        self.emit("log", "Slowest pages:")
+        for url, summary in self.report.slowest_pages(5):
+            self.emit("log", f"  {summary['elapsed']:.1f}s  {url} ({summary['requests']} requests)")
+        hosts = self.report.slowest_hosts(5)
+        if hosts:
+            self.emit("log", "Slowest third-party hosts:")
+            for host, totals in hosts:
+                self.emit("log", f"  {totals['time'] / 1000:.1f}s  {host} "
+                                 f"({totals['requests']} requests on {totals['pages']} pages)")
+        self.emit("log", f"Diagnostics report: {path}")
+        
+    def _emit_progress(self):
+        """Send the current progress counters."""
+        self.emit("progress", {'done': self.done, 'total': self.total, 'failures': self.failures})
+        
+    def _run_prefilter(self, urls):
+        """Resolve and connect to every host before any browser work."""
+        self.emit("log", f"Checking {len(urls)} URLs for reachable hosts...")
+        try:
+            result = prefilter_urls(
+                urls,
+                concurrency=self.options.get('prefilter_concurrency', 500),
+                timeout=self.options.get('prefilter_timeout', 5.0)
+            )
+        except Exception as e:
+            self.logger.error(f"Pre-filter failed: {str(e)}")
+            self.emit("log", f"Pre-filter failed, capturing everything: {str(e)}")
+            return PrefilterResult(reachable=list(urls), failures={}, resolved={})
+            
+        self.emit("log", f"Pre-filter: {len(result.failures)} of {len(urls)} URLs unreachable")
+        return result
+        
+    def _run_preflight(self, urls, validators):
+        """Check HTTP validators for all URLs before any browser work."""
+        self.emit("log", f"Checking {len(urls)} URLs for changes...")
+        try:
+            results = run_preflight(
+                urls, validators,
+                concurrency=self.options.get('preflight_concurrency', 50),
+                timeout=self.options.get('preflight_timeout', 10.0),
+                force=self.options.get('force_capture', False)
+            )
+        except Exception as e:
+            self.logger.error(f"Pre-flight check failed: {str(e)}")
+            self.emit("log", f"Pre-flight check failed, capturing everything: {str(e)}")
+            return {}
+            
+        skipped = sum(1 for result in results.values() if result.not_modified)
+        self.emit("log", f"Pre-flight: {skipped} of {len(urls)} URLs not modified")
+        return results
\ No newline at end of file
@@ -2,27 +2,177 @@
 Browser engine module for capturing screenshots using Selenium.
 """
 
+import base64
+import dataclasses
+import functools
+import hashlib
+import json
 import logging
-from pathlib import Path
-from urllib.parse import urlparse
+import shutil
 import time
+from pathlib import Path
 from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from PIL import Image
 import io
+from .change_detection import ChangeDetector, render_highlight
+from .dedup import alias_result
+from .diagnostics import PageDiagnostics, enable_performance_log
+from .errors import BrowserCrashError
+from .quality import create_quality_checker
+from .results import CaptureResult
+from .stitching import MemorySink, PNGStreamWriter, TileWriter
+from .storage import create_store
+from .utils import options_fingerprint
+
+
+# Document-coordinate rectangles of the first element matching each selector,
+# scrolling each into view so lazy content renders; null when nothing visible matches
+ELEMENT_RECTS_SCRIPT = """
+return arguments[0].map(function (selector) {
+    var element = document.querySelector(selector);
+    if (!element) { return null; }
+    element.scrollIntoView({block: 'nearest', inline: 'nearest'});
+    var rect = element.getBoundingClientRect();
+    if (rect.width < 1 || rect.height < 1) { return null; }
+    return {x: rect.left + window.scrollX, y: rect.top + window.scrollY,
+            width: rect.width, height: rect.height};
+});
+"""
+
+
+# Injected before any page script runs: CSS animations and transitions jump
+# to their end state, carets stop blinking and media never starts playing
+FREEZE_SCRIPT = """
+(function () {
+    var css = '*, *::before, *::after {'
+        + ' animation-duration: 0s !important; animation-delay: 0s !important;'
+        + ' animation-iteration-count: 1 !important;'
+        + ' transition-duration: 0s !important; transition-delay: 0s !important;'
+        + ' caret-color: transparent !important; scroll-behavior: auto !important; }';
+    function inject() {
+        var style = document.createElement('style');
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    }
+    if (document.documentElement) {
+        inject();
+    } else {
+        new MutationObserver(function (records, observer) {
+            if (document.documentElement) {
+                observer.disconnect();
+                inject();
+            }
+        }).observe(document, {childList: true});
+    }
+    document.addEventListener('play', function (event) { event.target.pause(); }, true);
+})();
+"""
+
+# Run right before capture: rewind media and settle script-driven animations
+SETTLE_SCRIPT = """
+document.querySelectorAll('video, audio').forEach(function (media) {
+    media.pause();
+    media.currentTime = 0;
+});
+if (document.getAnimations) {
+    document.getAnimations().forEach(function (animation) {
+        try { animation.finish(); } catch (e) { animation.cancel(); }
+    });
+}
+"""
+
+# Error messages of a browser session that cannot take further commands:
+# the renderer or the whole browser died, or chromedriver lost it
+SESSION_DEAD_MARKERS = (
+    "invalid session id",
+    "session deleted because of page crash",
+    "tab crashed",
+    "chrome not reachable",
+    "disconnected: not connected to devtools",
+    "unable to receive message from renderer",
+    "no such window",
+)
+
+
+def device_metrics(options):
+    """
+    Build the Emulation.setDeviceMetricsOverride parameters for capture options.
+    
+    ``width`` and ``height`` are the output size in pixels at a device scale
+    factor of 1. Zoom shrinks the CSS viewport and raises the scale factor by
+    the same amount, so the page lays out once at the zoomed size and the
+    output keeps its pixel size; ``device_scale_factor`` multiplies the output
+    size for high-DPI captures.
+    """
+    zoom = options.get('zoom') or 1.0
+    width = max(1, round(options['width'] / zoom))
+    height = max(1, round(options['height'] / zoom))
+    return {
+        'width': width,
+        'height': height,
+        'deviceScaleFactor': zoom * (options.get('device_scale_factor') or 1.0),
+        'mobile': bool(options.get('mobile', False)),
+        'screenWidth': width,
+        'screenHeight': height,
+    }
+
+
+def is_session_dead(error):
+    """Return whether an exception means the browser session is gone."""
+    if isinstance(error, (InvalidSessionIdException, ConnectionError)):
+        return True
+    message = str(error).lower()
+    if any(marker in message for marker in SESSION_DEAD_MARKERS):
+        return True
+    # Chromedriver itself exited: its HTTP endpoint refuses connections
+    return "max retries exceeded" in message and "connection refused" in message
 
 
 class BrowserEngine:
     """Manages the headless browser for screenshot capture."""
     
-    def __init__(self, options):
-        """Initialize the browser engine with given options."""
+    def __init__(self, options, store=None, pages=None):
+        """
+        Initialize the browser engine with given options.
+        
+        Args:
+            options: Capture options dictionary
+            store: Output store shared between engines; one is created from
+                the options (and closed on stop) when omitted
+            pages: CapturedPages of the job, shared between engines; a URL
+                that ends up on one of these pages is recorded as an alias
+        """
         self.options = options
+        self.pages = pages
         self.logger = logging.getLogger(__name__)
         self.driver = None
+        self._metrics = None
+        self._freeze_script = None
+        self._virtual_time = False
+        self._owns_store = store is None
+        self.store = store if store is not None else create_store(options)
         
+        self.change_detector = None
+        if options.get('change_detection', 'off') != 'off':
+            self.change_detector = ChangeDetector(
+                Path(options['output_dir']) / ".siteseeing" / "changes",
+                threshold=options.get('change_threshold', 0.01),
+                use_phash=options.get('change_phash', True)
+            )
+            
+        self.quality_checker = create_quality_checker(options)
+        
+        self.diagnostics = None
+        if options.get('diagnostics'):
+            self.diagnostics = PageDiagnostics(
+                Path(options['output_dir']) / ".siteseeing" / "diagnostics",
+                trace_threshold=options.get('trace_threshold', 10.0)
+            )
+            
     def start(self):
         """Start the browser engine."""
         chrome_options = Options()
@@ -31,11 +181,23 @@ class BrowserEngine:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument(f"--window-size={self.options['width']},{self.options['height']}")
         
+        # Hosts already resolved by the pre-filter skip Chrome's own lookup
+        if self.options.get('host_resolver_rules'):
+            chrome_options.add_argument(f"--host-resolver-rules={self.options['host_resolver_rules']}")
+            
+        # Network events and trace for the per-page diagnostics
+        if self.diagnostics:
+            enable_performance_log(chrome_options)
+            
         # Set up service
         service = Service(ChromeDriverManager().install())
         
         # Create driver
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        self._metrics = None
+        self._freeze_script = None
+        self._virtual_time = False
+        self._emulate_device()
         self.logger.info("Browser engine started")
         
     def stop(self):
@@ -45,95 +207,462 @@ class BrowserEngine:
             self.driver = None
             self.logger.info("Browser engine stopped")
             
+        if self._owns_store:
+            self.store.close()
+            
+    def restart(self):
+        """Replace a dead browser session with a fresh one."""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                self.logger.debug(f"Ignoring error while quitting dead browser: {str(e)}")
+            self.driver = None
+        self.start()
+        self.logger.info("Browser engine restarted")
+        
+    def configure(self, options):
+        """
+        Switch to different capture options without restarting the browser.
+        
+        Only the device metrics need the running browser to change; everything
+        else is read from the options at capture time.
+        """
+        self.options = options
+        if self.driver:
+            self._emulate_device()
+            
+    def _emulate_device(self):
+        """Apply the viewport, scale factor and mobile flag of the options, if they changed."""
+        metrics = device_metrics(self.options)
+        if metrics != self._metrics:
+            self.driver.execute_cdp_cmd('Emulation.setDeviceMetricsOverride', metrics)
+            self._metrics = metrics
+            
     def capture_screenshot(self, url):
-        """Capture a screenshot of the given URL."""
+        """Capture a screenshot of the given URL and return a CaptureResult."""
         if not self.driver:
             raise RuntimeError("Browser engine not started")
             
         try:
+            # Per-phase wall-clock timings, recorded in the capture index
+            timings = {}
+            started = time.perf_counter()
+            
+            # Device metrics and render mode must be in place before the first layout
+            self._emulate_device()
+            self._prepare_render_mode()
+            
+            if self.diagnostics:
+                self.diagnostics.begin(self.driver)
+                
             # Navigate to URL
             self.driver.get(url)
+            timings['navigate'] = time.perf_counter() - started
             
             # Wait for page to load
-            time.sleep(2)  # Simple wait, could be improved with WebDriverWait
+            if self.options.get('virtual_time_budget'):
+                self._advance_virtual_time(self.options['virtual_time_budget'])
+            else:
+                time.sleep(2)  # Simple wait, could be improved with WebDriverWait
+            if self.options.get('freeze_animations'):
+                self.driver.execute_script(SETTLE_SCRIPT)
+            timings['settle'] = time.perf_counter() - started - timings['navigate']
             
-            # Apply zoom
-            zoom = self.options['zoom']
-            if zoom != 1.0:
-                self.driver.execute_script(f"document.body.style.zoom='{zoom}'")
-                
-            # Capture screenshot
-            if self.options['type'] == 'fullpage':
-                screenshot_data = self._capture_full_page()
+            # Capture and save screenshot, unless the job already has this page
+            final_url = self._final_url(url)
+            existing = self.pages.find(final_url) if final_url else None
+            if existing is not None:
+                self.logger.info(f"{url} leads to {final_url}, already captured as {existing.url}")
+                result = alias_result(existing, url)
             else:
-                screenshot_data = self.driver.get_screenshot_as_png()
-                
-            # Save screenshot
-            filename = self._save_screenshot(url, screenshot_data)
-            return filename
+                result = self._capture_page(url, timings)
+                if final_url:
+                    self.pages.add(result, url, final_url)
+            result.timings = timings
+            
+            if self.diagnostics:
+                result.diagnostics = self._collect_diagnostics(url, time.perf_counter() - started)
+            return result
             
         except Exception as e:
+            if is_session_dead(e):
+                self.logger.error(f"Browser crashed while capturing {url}: {str(e)}")
+                # Selenium messages carry a stack trace after the first line
+                reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                raise BrowserCrashError(reason) from e
             self.logger.error(f"Failed to capture screenshot for {url}: {str(e)}")
             raise
             
+    def _prepare_render_mode(self):
+        """
+        Install or remove the animation freeze and set the virtual time policy.
+        
+        With a virtual time budget, page timers run on Chrome's virtual clock,
+        which only advances while no network fetch is pending, so the load is
+        not cut short and timers fire as fast as the page can run them.
+        Virtual time cannot be switched off in a running session; a later
+        capture without a budget lets it advance freely instead.
+        """
+        freeze = bool(self.options.get('freeze_animations'))
+        if freeze and self._freeze_script is None:
+            response = self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                                   {'source': FREEZE_SCRIPT})
+            self._freeze_script = response['identifier']
+        elif not freeze and self._freeze_script is not None:
+            self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument',
+                                        {'identifier': self._freeze_script})
+            self._freeze_script = None
+            
+        budget = self.options.get('virtual_time_budget')
+        if budget:
+            self.driver.execute_cdp_cmd('Emulation.setVirtualTimePolicy',
+                                        {'policy': 'pauseIfNetworkFetchesPending', 'budget': budget})
+            self._virtual_time = True
+        elif self._virtual_time:
+            self.driver.execute_cdp_cmd('Emulation.setVirtualTimePolicy', {'policy': 'advance'})
+            
+    def _advance_virtual_time(self, budget):
+        """
+        Fast-forward the loaded page by a virtual time budget in milliseconds.
+        
+        Virtual time is paused to read the page clock, then given the budget;
+        it stops by itself once the budget is used up, so the capture sees the
+        page exactly ``budget`` milliseconds of page time after load. Waits at
+        most ``virtual_time_timeout`` seconds of real time for that to happen.
+        """
+        self.driver.execute_cdp_cmd('Emulation.setVirtualTimePolicy', {'policy': 'pause'})
+        start = self.driver.execute_script("return performance.now()")
+        self.driver.execute_cdp_cmd('Emulation.setVirtualTimePolicy',
+                                    {'policy': 'pauseIfNetworkFetchesPending', 'budget': budget})
+        
+        deadline = time.monotonic() + self.options.get('virtual_time_timeout', 30.0)
+        while self.driver.execute_script("return performance.now()") < start + budget - 1:
+            if time.monotonic() > deadline:
+                self.logger.warning(f"Virtual time budget of {budget}ms not used up in time")
+                break
+            time.sleep(0.05)
+            
+    def _capture_page(self, url, timings):
+        """Capture the loaded page in the configured way, recording the capture and save phases."""
+        phase_started = time.perf_counter()
+        if self.options['type'] == 'element':
+            result = self._capture_elements(url)
+            timings['capture'] = time.perf_counter() - phase_started
+            return self._flag_error_page(result)
+        if self.options['type'] == 'region':
+            x, y, width, height = self.options['clip']
+            grab = functools.partial(self._capture_clip, {'x': x, 'y': y, 'width': width, 'height': height})
+        elif self.options['type'] == 'fullpage':
+            mode = self.options.get('stitch_mode', 'memory')
+            if mode in ('stream', 'tiles'):
+                result = self._capture_full_page_to_disk(url, mode)
+                timings['capture'] = time.perf_counter() - phase_started
+                return self._flag_error_page(result)
+            grab = self._capture_full_page
+        else:
+            grab = self.driver.get_screenshot_as_png
+            
+        screenshot_data = grab()
+        report = None
+        if self.quality_checker:
+            screenshot_data, report = self._check_quality(url, screenshot_data, grab)
+        timings['capture'] = time.perf_counter() - phase_started
+        
+        phase_started = time.perf_counter()
+        if report is not None and report.suspect:
+            # A bad capture must not become the change-detection baseline
+            result = self._save_screenshot(url, screenshot_data)
+            result.status = 'suspect'
+            result.suspect_reason = report.reason
+        elif self.change_detector:
+            result = self._save_if_changed(url, screenshot_data)
+        else:
+            result = self._save_screenshot(url, screenshot_data)
+        timings['save'] = time.perf_counter() - phase_started
+        return result
+        
+    def _final_url(self, url):
+        """Return the URL the browser ended up on, or None if pages are not deduplicated."""
+        if self.pages is None:
+            return None
+        final_url = self.driver.current_url
+        # Browser error pages all share one URL
+        return final_url if final_url.startswith(('http://', 'https://')) else None
+        
+    def _on_error_page(self):
+        """Return whether the browser shows its own error page instead of the site."""
+        return str(self.driver.execute_script("return document.URL")).startswith("chrome-error://")
+        
+    def _check_quality(self, url, data, grab):
+        """
+        Check a capture for blank frames and error pages, retrying within the budget.
+        
+        A blank capture is taken again after a longer wait; an error page is
+        reloaded first. Each retry waits ``quality_retry_wait`` seconds longer
+        than the one before.
+        
+        Returns:
+            Tuple of the last capture's bytes and its QualityReport
+        """
+        retries = self.options.get('quality_retries', 1)
+        wait = self.options.get('quality_retry_wait', 3.0)
+        for attempt in range(retries + 1):
+            report = self.quality_checker.check(data, error_page=self._on_error_page())
+            if not report.suspect or attempt == retries:
+                break
+            self.logger.info(f"Suspect capture of {url} ({report.reason}); retrying ({attempt + 1}/{retries})")
+            if report.error_page:
+                self.driver.get(url)
+            if self.options.get('virtual_time_budget'):
+                # Page timers only move on virtual time
+                self._advance_virtual_time(round(wait * (attempt + 1) * 1000))
+            else:
+                time.sleep(wait * (attempt + 1))
+            data = grab()
+        if report.suspect:
+            self.logger.warning(f"Suspect capture of {url}: {report.reason}")
+        return data, report
+        
+    def _flag_error_page(self, result):
+        """Flag an already saved capture (and its parts) taken of a browser error page."""
+        if self.quality_checker and self._on_error_page():
+            for part in [result] + result.parts:
+                part.status = 'suspect'
+                part.suspect_reason = "browser error page"
+        return result
+        
+    def _collect_diagnostics(self, url, elapsed):
+        """Write the page's waterfall (and trace, if slow); diagnostics never fail a capture."""
+        try:
+            return self.diagnostics.collect(self.driver, url, elapsed)
+        except Exception as e:
+            if is_session_dead(e):
+                raise
+            self.logger.warning(f"Could not collect diagnostics for {url}: {str(e)}")
+            return None
+            
+    def _capture_clip(self, clip, fmt='png', quality=None):
+        """
+        Capture one rectangle of the page in a single CDP call.
+        
+        The rectangle is in CSS pixels relative to the document and may lie
+        outside the viewport; its height is capped at the ``max_height`` option.
+        
+        Returns:
+            Encoded image bytes in the requested format
+        """
+        max_height = self.options.get('max_height')
+        height = min(clip['height'], max_height) if max_height else clip['height']
+        params = {
+            'format': fmt,
+            'clip': {'x': clip['x'], 'y': clip['y'], 'width': clip['width'],
+                     'height': height, 'scale': 1},
+            'captureBeyondViewport': True,
+        }
+        if fmt == 'jpeg':
+            params['quality'] = quality or 85
+        response = self.driver.execute_cdp_cmd('Page.captureScreenshot', params)
+        return base64.b64decode(response['data'])
+        
+    def _capture_elements(self, url):
+        """
+        Capture the element matched by each CSS selector as its own output.
+        
+        All selectors are resolved in one script call after a single page
+        load. Chrome encodes each clip in the output format directly, so
+        nothing is decoded or re-encoded here.
+        
+        Returns:
+            CaptureResult of the first element, with every element's result in ``parts``
+        """
+        selectors = self.options.get('selectors') or []
+        if not selectors:
+            raise ValueError("Element capture needs at least one CSS selector")
+            
+        fmt = self.options['format']
+        rects = self.driver.execute_script(ELEMENT_RECTS_SCRIPT, selectors)
+        parts = []
+        missing = []
+        
+        for selector, rect in zip(selectors, rects):
+            if rect is None:
+                missing.append(selector)
+                continue
+            data = self._capture_clip(rect, fmt, self.options.get('quality'))
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size  # Header only, no decoding
+            location = self.store.save(url, data, fmt)
+            parts.append(CaptureResult(url=url, location=location, width=width, height=height,
+                                       size=len(data), format=fmt, selector=selector,
+                                       content_hash=hashlib.sha256(data).hexdigest()))
+            
+        if not parts:
+            raise RuntimeError(f"No visible element matches {'; '.join(missing)}")
+        if missing:
+            self.logger.warning(f"No visible element matches {'; '.join(missing)} on {url}")
+            
+        return dataclasses.replace(parts[0], parts=parts)
+        
     def _capture_full_page(self):
-        """Capture a full-page screenshot by scrolling and stitching."""
+        """Capture a full-page screenshot by scrolling and stitching in memory."""
+        data, _, _ = self._scroll_and_stitch(MemorySink)
+        return data
+        
+    def _capture_full_page_to_disk(self, url, mode):
+        """Capture a full page straight to disk as a streamed PNG or as tiles."""
+        if mode == 'stream':
+            if self.options['format'] != 'png':
+                self.logger.warning("Streaming stitch mode always writes PNG")
+            reserved = self.store.new_path(url, 'png')
+            writers = []
+            
+            def open_writer(width, height):
+                writers.append(PNGStreamWriter(reserved, width, height))
+                return writers[0]
+                
+            sink_factory = open_writer
+        else:
+            reserved = self.store.new_path(url)
+            
+            def sink_factory(width, height):
+                return TileWriter(
+                    reserved, width, height,
+                    tile_height=self.options.get('tile_height') or 4096,
+                    fmt=self.options['format'],
+                    quality=self.options.get('quality'),
+                    pyramid=self.options.get('tile_pyramid', False)
+                )
+                
+        try:
+            path, width, height = self._scroll_and_stitch(sink_factory)
+        except BaseException:
+            # Release the name reserved for the output if no sink got to delete it
+            if reserved.is_dir():
+                shutil.rmtree(reserved, ignore_errors=True)
+            else:
+                reserved.unlink(missing_ok=True)
+            raise
+            
+        if mode == 'stream':
+            size = path.stat().st_size
+            content_hash = writers[0].sha256.hexdigest()
+            fmt = 'png'
+        else:
+            size = sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+            content_hash = None
+            fmt = self.options['format']
+            
+        location = self.store.add_path(url, path)
+        return CaptureResult(url=url, location=location, width=width,
+                             height=height, size=size, format=fmt,
+                             content_hash=content_hash)
+        
+    def _scroll_and_stitch(self, sink_factory):
+        """
+        Scroll through the page and feed each viewport strip to a sink.
+        
+        Only the current viewport screenshot is held in memory; the sink
+        decides whether to accumulate, stream or tile the strips. The page
+        height is capped at the ``max_height`` option (CSS pixels).
+        
+        Returns:
+            Tuple of the sink's close() value and the output pixel size
+        """
         # Get page dimensions
-        total_height = self.driver.execute_script("return document.body.scrollHeight")
+        total_height = self.driver.execute_script(
+            "return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight)"
+        )
         viewport_height = self.driver.execute_script("return window.innerHeight")
-        viewport_width = self.options['width']
-        
-        # Calculate number of scrolls needed
-        scrolls = (total_height + viewport_height - 1) // viewport_height
-        
-        # Capture screenshots at each scroll position
-        screenshots = []
-        for i in range(scrolls):
-            # Scroll to position
-            scroll_y = i * viewport_height
-            self.driver.execute_script(f"window.scrollTo(0, {scroll_y})")
-            time.sleep(0.5)  # Wait for scroll to complete
-            
-            # Capture screenshot
-            screenshot_data = self.driver.get_screenshot_as_png()
-            screenshots.append(Image.open(io.BytesIO(screenshot_data)))
-            
-        # Stitch screenshots together
-        full_image = Image.new('RGB', (viewport_width, total_height))
-        y_offset = 0
-        
-        for i, img in enumerate(screenshots):
-            # For the last image, only use the visible part
-            if i == len(screenshots) - 1:
-                remaining_height = total_height - y_offset
-                if remaining_height < viewport_height:
-                    img = img.crop((0, 0, viewport_width, remaining_height))
+        
+        max_height = self.options.get('max_height')
+        if max_height and total_height > max_height:
+            self.logger.warning(f"Page height {total_height}px capped at {max_height}px")
+            total_height = max_height
+        total_height = max(total_height, 1)
+        
+        sink = None
+        scale = 1.0
+        y = 0
+        finished = False
+        
+        try:
+            while y < total_height:
+                # Scroll to position; the browser clamps the last scroll to the page bottom
+                self.driver.execute_script(f"window.scrollTo(0, {y})")
+                time.sleep(0.5)  # Wait for scroll to complete
+                actual_y = self.driver.execute_script("return window.pageYOffset")
+                
+                img = Image.open(io.BytesIO(self.driver.get_screenshot_as_png()))
+                
+                if sink is None:
+                    # Screenshots are in device pixels, scroll positions in CSS pixels
+                    scale = img.height / viewport_height
+                    sink = sink_factory(img.width, round(total_height * scale))
                     
-            full_image.paste(img, (0, y_offset))
-            y_offset += img.height
-            
-        # Convert to bytes
-        output = io.BytesIO()
-        full_image.save(output, format='PNG')
-        return output.getvalue()
+                top = max(0, y - actual_y)
+                rows = min(viewport_height - top, total_height - y)
+                if rows <= 0:
+                    break
+                    
+                pixel_top = round(top * scale)
+                pixel_rows = round((y + rows) * scale) - round(y * scale)
+                sink.write(img.crop((0, pixel_top, img.width, pixel_top + pixel_rows)))
+                img.close()
+                y += rows
+                
+            result = sink.close(), sink.width, sink.height
+            finished = True
+            return result
+        finally:
+            # A crash or timeout mid-page must not leave an open file or a partial output
+            if sink is not None and not finished:
+                sink.abort()
         
-    def _save_screenshot(self, url, screenshot_data):
-        """Save the screenshot to file."""
-        # Generate filename from URL
-        parsed = urlparse(url)
-        domain = parsed.netloc.replace('www.', '').replace('.', '_')
-        if not domain:
-            domain = 'screenshot'
+    def _save_if_changed(self, url, screenshot_data):
+        """
+        Save the screenshot unless it matches the previous capture of the page.
+        
+        Unchanged pages are either skipped or stored as a small reference to
+        the previous output, depending on the ``change_detection`` option.
+        The baseline only moves when a changed capture is stored, so slow
+        drift still adds up to a detected change.
+        """
+        img = Image.open(io.BytesIO(screenshot_data))
+        key = ChangeDetector.make_key(url, options_fingerprint(self.options))
+        report = self.change_detector.compare(key, img)
+        
+        if not report.changed:
+            location = report.previous_location
+            if self.options.get('change_detection') == 'reference':
+                reference = json.dumps({
+                    'url': url,
+                    'reference': report.previous_location,
+                    'diff_score': report.score,
+                }).encode()
+                location = self.store.save(url, reference, 'ref.json')
+            self.logger.info(f"Unchanged since last capture: {url} (score {report.score:.4f})")
+            return CaptureResult(url=url, location=location, width=img.width,
+                                 height=img.height, format=self.options['format'],
+                                 status='unchanged', diff_score=report.score,
+                                 reference=report.previous_location)
             
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-        ext = self.options['format']
-        filename = f"{domain}_{timestamp}.{ext}"
+        result = self._save_image(url, img)
+        if report.previous_location is not None:
+            result.diff_score = report.score
+            if self.options.get('change_highlight') and report.mask is not None and report.mask.any():
+                result.highlight = self.store.save(url, render_highlight(img, report.mask), 'diff.png')
+                
+        self.change_detector.update(key, img, result.location)
+        return result
         
-        # Full path
-        filepath = self.options['output_dir'] / filename
+    def _save_screenshot(self, url, screenshot_data):
+        """Decode a PNG screenshot and save it in the output format."""
+        return self._save_image(url, Image.open(io.BytesIO(screenshot_data)))
         
-        # Save image
-        img = Image.open(io.BytesIO(screenshot_data))
+    def _save_image(self, url, img):
+        """Encode an image in the output format and hand it to the store."""
+        output = io.BytesIO()
         
         if self.options['format'] == 'jpeg':
             # Convert RGBA to RGB for JPEG
@@ -142,8 +671,12 @@ class BrowserEngine:
                 rgb_img.paste(img, mask=img.split()[3])
                 img = rgb_img
                 
-            img.save(filepath, 'JPEG', quality=self.options['quality'])
+            img.save(output, 'JPEG', quality=self.options['quality'])
         else:
-            img.save(filepath, 'PNG')
+            img.save(output, 'PNG')
             
-        return filepath
\ No newline at end of file
+        data = output.getvalue()
+        location = self.store.save(url, data, self.options['format'])
+        return CaptureResult(url=url, location=location, width=img.width,
+                             height=img.height, size=len(data), format=self.options['format'],
+                             content_hash=hashlib.sha256(data).hexdigest())
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Capture result cache.
+
+Repeated captures of the same page with the same render options within a
+short window are served from a copy of the earlier output instead of being
+rendered again. Entries are keyed by the normalized URL plus the options
+fingerprint, expire after a per-entry TTL and are evicted least recently
+used first once the cache exceeds its size limit.
+
+Each entry is an image file plus a JSON sidecar in the cache directory, so
+several processes (GUI, CLI, service) can share one cache directory. Every
+store rescans the directory before evicting, so the size limit covers the
+entries written by all of them, not just the current process.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from .results import CaptureResult
+from .utils import normalize_url, options_fingerprint
+
+
+class CaptureCache:
+    """Size-bounded LRU cache of capture outputs with per-entry TTL."""
+    
+    def __init__(self, directory, ttl=300.0, max_bytes=512 * 1024 * 1024):
+        """
+        Open the cache directory and account for the entries already in it.
+        
+        Args:
+            directory: Directory holding the cached outputs
+            ttl: Default lifetime of an entry in seconds
+            max_bytes: Total size of cached outputs before LRU eviction
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total = 0
+        self._rescan()
+        
+    @staticmethod
+    def make_key(url, options):
+        """Build the cache key of a URL captured with the given options."""
+        raw = f"{normalize_url(url)}\0{options_fingerprint(options)}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+        
+    def lookup(self, url, options, store):
+        """
+        Serve a capture from the cache.
+        
+        The cached output is written to the store like a fresh capture.
+        
+        Returns:
+            CaptureResult with status ``cached``, or None on a miss
+        """
+        entry = self.get(self.make_key(url, options))
+        if entry is None:
+            return None
+            
+        data, meta = entry
+        location = store.save(url, data, meta['format'])
+        return CaptureResult(url=url, location=location, width=meta['width'],
+                             height=meta['height'], size=len(data), format=meta['format'],
+                             status='cached', content_hash=meta.get('content_hash'))
+        
+    def remember(self, url, options, result, ttl=None):
+        """
+        Add a fresh single-file capture to the cache.
+        
+        Outputs that are not a single readable file (tile directories,
+        archive members, multi-element captures) are not cached.
+        """
+        if result.status != 'captured' or result.parts:
+            return
+        path = Path(result.location)
+        if not path.is_file():
+            return
+            
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            self.logger.warning(f"Could not cache {url}: {str(e)}")
+            return
+            
+        self.put(self.make_key(url, options), data, {
+            'url': url,
+            'format': result.format,
+            'width': result.width,
+            'height': result.height,
+            'content_hash': result.content_hash,
+        }, ttl=ttl)
+        
+    def get(self, key):
+        """
+        Return (data, meta) of a live entry, or None.
+        
+        Expired entries are removed on access.
+        """
+        sidecar = self.directory / f"{key}.json"
+        with self._lock:
+            try:
+                meta = json.loads(sidecar.read_text())
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+                
+            if meta['expires_at'] <= time.time():
+                self._remove(key, meta.get('format'))
+                self.expired += 1
+                self.misses += 1
+                return None
+                
+            try:
+                data = self._data_path(key, meta['format']).read_bytes()
+            except OSError:
+                self._remove(key, meta.get('format'))
+                self.misses += 1
+                return None
+                
+            os.utime(sidecar)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return data, meta
+            
+    def put(self, key, data, meta, ttl=None):
+        """Store an entry, then evict least recently used entries over the size limit."""
+        size = len(data)
+        if size > self.max_bytes:
+            return
+            
+        now = time.time()
+        meta = dict(meta, size=size, created_at=now, expires_at=now + (self.ttl if ttl is None else ttl))
+        
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)
+                
+            data_path = self._data_path(key, meta['format'])
+            tmp_path = data_path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            tmp_path.replace(data_path)
+            
+            sidecar = self.directory / f"{key}.json"
+            tmp_path = sidecar.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(meta))
+            tmp_path.replace(sidecar)
+            
+            # Other processes may have added or removed entries since the last store
+            self._rescan()
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            
+            while self._total > self.max_bytes and self._entries:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self.evictions += 1
+                
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+                
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
+            
+    def _rescan(self):
+        """Rebuild the entry list from the sidecars on disk (lock held or during init)."""
+        # Least recently used first; hits touch the sidecar, and the known order
+        # breaks ties between sidecars touched within one timestamp tick
+        order = {key: position for position, key in enumerate(self._entries)}
+        sidecars = []
+        for sidecar in self.directory.glob("*.json"):
+            try:
+                sidecars.append((sidecar.stat().st_mtime, order.get(sidecar.stem, len(order)), sidecar))
+            except OSError:
+                continue
+        sidecars.sort(key=lambda item: item[:2])
+        
+        entries = OrderedDict()
+        for _, _, sidecar in sidecars:
+            size = self._entries.get(sidecar.stem)
+            if size is None:
+                try:
+                    size = json.loads(sidecar.read_text())['size']
+                except (OSError, ValueError, KeyError):
+                    continue
+            entries[sidecar.stem] = size
+        self._entries = entries
+        self._total = sum(entries.values())
+        
+    def _data_path(self, key, fmt):
+        """Path of an entry's output file."""
+        return self.directory / f"{key}.{fmt}"
+        
+    def _remove(self, key, fmt=None):
+        """Delete an entry's files and forget it (lock held)."""
+        self._total -= self._entries.pop(key, 0)
+        sidecar = self.directory / f"{key}.json"
+        if fmt is None:
+            try:
+                fmt = json.loads(sidecar.read_text())['format']
+            except (OSError, ValueError, KeyError):
+                fmt = None
+        for path in ([self._data_path(key, fmt)] if fmt else []) + [sidecar]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def create_cache(options):
+    """Create the capture cache described by the options, or None when disabled."""
+    if not options.get('cache'):
+        return None
+    return CaptureCache(
+        Path(options['output_dir']) / ".siteseeing" / "cache",
+        ttl=options.get('cache_ttl', 300),
+        max_bytes=int(options.get('cache_max_mb', 512) * 1024 * 1024)
+    )
\ No newline at end of file
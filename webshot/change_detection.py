@@ -0,0 +1,193 @@
+"""
+Visual change detection against the previous capture of a page.
+
+Each capture is reduced to a small grayscale thumbnail and a 64-bit
+perceptual hash. Comparisons are vectorized NumPy operations on those
+thumbnails, so checking a multi-megapixel page costs a few microseconds
+once the thumbnail exists.
+"""
+
+import hashlib
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from PIL import Image
+
+
+THUMB_WIDTH = 128
+MAX_THUMB_HEIGHT = 1024
+
+
+def to_thumbnail(image, width=THUMB_WIDTH):
+    """
+    Downscale an image to a grayscale float array in the range 0..1.
+    
+    Args:
+        image: PIL image
+        width: Thumbnail width; height keeps the aspect ratio
+        
+    Returns:
+        2-D NumPy array of shape (height, width)
+    """
+    height = max(1, min(MAX_THUMB_HEIGHT, round(image.height * width / image.width)))
+    thumb = image.convert('L').resize((width, height), Image.BILINEAR)
+    return np.asarray(thumb, dtype=np.float32) / 255.0
+
+
+def _dct_matrix(n):
+    """Return the orthonormal DCT-II basis matrix of size n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def perceptual_hash(image):
+    """
+    Compute a 64-bit DCT perceptual hash of an image.
+    
+    Args:
+        image: PIL image
+        
+    Returns:
+        Hash as a Python int
+    """
+    pixels = np.asarray(image.convert('L').resize((32, 32), Image.BILINEAR), dtype=np.float32)
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8].flatten()
+    # Skip the DC term when picking the threshold, it dominates the median
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming_distance(a, b):
+    """Return the number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+def diff_score(previous, current):
+    """
+    Mean absolute difference between two thumbnails (0 = identical, 1 = inverted).
+    
+    Thumbnails of different heights (page length changed) score 1.0.
+    """
+    if previous.shape != current.shape:
+        return 1.0
+    return float(np.abs(previous - current).mean())
+
+
+@dataclass
+class ChangeReport:
+    """Outcome of comparing a capture with its predecessor."""
+    
+    changed: bool
+    score: float
+    hash_distance: Optional[int] = None
+    previous_location: Optional[str] = None
+    mask: Optional[np.ndarray] = None
+
+
+class ChangeDetector:
+    """Compares captures with the previous capture for the same key."""
+    
+    def __init__(self, state_dir, threshold=0.01, use_phash=True, max_hash_distance=4,
+                 cell_threshold=0.05):
+        """
+        Initialize the detector.
+        
+        Args:
+            state_dir: Directory holding one baseline file per key
+            threshold: Mean pixel difference above which a page counts as changed
+            use_phash: Also require the perceptual hashes to be close
+            max_hash_distance: Largest hash distance still treated as unchanged
+            cell_threshold: Per-pixel difference marked in the change mask
+        """
+        self.logger = logging.getLogger(__name__)
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.use_phash = use_phash
+        self.max_hash_distance = max_hash_distance
+        self.cell_threshold = cell_threshold
+        
+    @staticmethod
+    def make_key(url, fingerprint):
+        """Build the baseline key for a URL captured with the given options."""
+        return hashlib.sha1(f"{url}\n{fingerprint}".encode()).hexdigest()
+        
+    def compare(self, key, image):
+        """Compare an image with the stored baseline for the key."""
+        baseline = self._load(key)
+        if baseline is None:
+            return ChangeReport(changed=True, score=1.0)
+            
+        thumb = to_thumbnail(image)
+        score = diff_score(baseline['thumb'], thumb)
+        changed = score > self.threshold
+        
+        distance = None
+        if self.use_phash:
+            distance = hamming_distance(int(baseline['phash']), perceptual_hash(image))
+            changed = changed or distance > self.max_hash_distance
+            
+        mask = None
+        if baseline['thumb'].shape == thumb.shape:
+            mask = np.abs(baseline['thumb'] - thumb) > self.cell_threshold
+            
+        return ChangeReport(changed=changed, score=score, hash_distance=distance,
+                            previous_location=str(baseline['location']), mask=mask)
+        
+    def update(self, key, image, location):
+        """Store the image as the new baseline for the key."""
+        path = self.state_dir / f"{key}.npz"
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez_compressed(
+            tmp_path,
+            thumb=to_thumbnail(image),
+            phash=np.uint64(perceptual_hash(image)),
+            location=np.array(str(location))
+        )
+        tmp_path.replace(path)
+        
+    def _load(self, key):
+        """Load the baseline for a key, if any."""
+        path = self.state_dir / f"{key}.npz"
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                return {name: data[name] for name in data.files}
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable change baseline {path}: {str(e)}")
+            return None
+
+
+def render_highlight(image, mask, color=(255, 0, 0), alpha=0.5):
+    """
+    Overlay changed regions of a thumbnail mask onto the full-size image.
+    
+    Args:
+        image: PIL image of the new capture
+        mask: Boolean thumbnail-resolution change mask
+        color: Highlight colour
+        alpha: Highlight opacity
+        
+    Returns:
+        PNG bytes of the highlighted image
+    """
+    pixels = np.asarray(image.convert('RGB'), dtype=np.float32)
+    rows = np.arange(pixels.shape[0]) * mask.shape[0] // pixels.shape[0]
+    cols = np.arange(pixels.shape[1]) * mask.shape[1] // pixels.shape[1]
+    full_mask = mask[rows][:, cols]
+    
+    pixels[full_mask] = pixels[full_mask] * (1 - alpha) + np.array(color, dtype=np.float32) * alpha
+    
+    output = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(output, format='PNG')
+    return output.getvalue()
\ No newline at end of file
@@ -0,0 +1,349 @@
+"""
+Command-line interface for Siteseeing.
+
+Running ``siteseeing`` without a command starts the GUI; the commands here
+work on existing outputs and do not need a display.
+"""
+
+import argparse
+import functools
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from .config import Config
+from .index import CaptureIndex, index_path
+from .utils import format_bytes, format_duration, parse_clip, parse_interval, parse_url_list
+
+
+def parse_time(value):
+    """Parse a Unix timestamp or an ISO 8601 date/time into a timestamp."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a timestamp or ISO date: {value}")
+
+
+def parse_option(text):
+    """Parse a KEY=VALUE option override; the value is JSON if it parses, else a string."""
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE: {text}")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def build_parser():
+    """Build the argument parser with one sub-parser per command."""
+    parser = argparse.ArgumentParser(prog="siteseeing",
+                                     description="Website screenshot capture tool")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    
+    capture = commands.add_parser("capture", help="capture URLs with the configured options")
+    capture.add_argument("urls", nargs="*", help="URLs to capture")
+    capture.add_argument("--file", help="text file with one URL per line")
+    capture.add_argument("--output-dir", help="output directory (default: the configured one)")
+    capture.add_argument("--selector", action="append", dest="selectors",
+                         help="capture only the element matching this CSS selector (repeatable)")
+    capture.add_argument("--clip", type=parse_clip, help="capture only this region: x,y,width,height")
+    capture.add_argument("--scale", type=float, help="device pixel ratio (default: the configured one)")
+    capture.add_argument("--mobile", action="store_true", help="emulate a mobile device viewport")
+    capture.add_argument("--freeze", action="store_true",
+                         help="stop CSS animations, transitions and media before capture")
+    capture.add_argument("--virtual-time", type=int, metavar="MS",
+                         help="fast-forward page timers by this much virtual time instead of waiting")
+    capture.add_argument("--diagnostics", action="store_true",
+                         help="record a network waterfall per page and report the slowest pages and hosts")
+    capture.add_argument("--force", action="store_true", help="ignore the cache and HTTP validators")
+    capture.add_argument("--no-cache", action="store_true", help="neither read nor fill the capture cache")
+    capture.add_argument("--no-dedup", action="store_true",
+                         help="capture every URL, even if it leads to a page already captured")
+    
+    cache = commands.add_parser("cache", help="show or clear the capture cache")
+    cache.add_argument("--output-dir", help="output directory (default: the configured one)")
+    cache.add_argument("--clear", action="store_true", help="remove every cached capture")
+    
+    index = commands.add_parser("index", help="query the capture index of an output directory")
+    index.add_argument("--output-dir", help="output directory (default: the configured one)")
+    index.add_argument("--url", help="exact URL")
+    index.add_argument("--domain", help="host name")
+    index.add_argument("--status", help="captured, unchanged, suspect, alias, not_modified, failed, crashed or unreachable")
+    index.add_argument("--since", type=parse_time, help="earliest capture time (timestamp or ISO date)")
+    index.add_argument("--until", type=parse_time, help="latest capture time (timestamp or ISO date)")
+    index.add_argument("--limit", type=int, default=50, help="maximum records, 0 for all (default: 50)")
+    index.add_argument("--oldest-first", action="store_true", help="sort by ascending capture time")
+    index.add_argument("--json", action="store_true", help="print one JSON record per line")
+    index.add_argument("--counts", action="store_true", help="print the number of records per status")
+    
+    signature = commands.add_parser("signature", help="manage known error-page signatures")
+    signature.add_argument("--output-dir", help="output directory (default: the configured one)")
+    signature_actions = signature.add_subparsers(dest="action", metavar="action", required=True)
+    signature_add = signature_actions.add_parser("add", help="flag captures that look like this image")
+    signature_add.add_argument("name", help="signature name")
+    signature_add.add_argument("image", help="example capture of the error page")
+    signature_remove = signature_actions.add_parser("remove", help="remove a signature")
+    signature_remove.add_argument("name")
+    signature_actions.add_parser("list", help="list signatures")
+    
+    schedule = commands.add_parser("schedule", help="manage and run recurring capture jobs")
+    actions = schedule.add_subparsers(dest="action", metavar="action", required=True)
+    
+    add = actions.add_parser("add", help="add or replace a recurring job")
+    add.add_argument("name", help="job name; also seeds the job's start offset")
+    add.add_argument("--every", type=parse_interval, required=True, help="interval such as 15m, 1h or 1d")
+    add.add_argument("--url", action="append", default=[], dest="urls", help="URL to capture (repeatable)")
+    add.add_argument("--file", help="text file with one URL per line, read at every run")
+    add.add_argument("--jitter", type=parse_interval,
+                     help="spread the start within this much of the interval (default: the whole interval)")
+    add.add_argument("--option", type=parse_option, action="append", default=[], dest="options",
+                     help="capture option override KEY=VALUE (repeatable)")
+    
+    remove = actions.add_parser("remove", help="remove a job")
+    remove.add_argument("name")
+    
+    actions.add_parser("list", help="list jobs with their next and last runs")
+    
+    run = actions.add_parser("run", help="run the scheduler in the foreground")
+    run.add_argument("--max-concurrent", type=int, help="jobs running at once (default: the configured number)")
+    
+    serve = commands.add_parser("serve", help="run the HTTP capture service")
+    serve.add_argument("--host", help="address to listen on (default: the configured one)")
+    serve.add_argument("--port", type=int, help="port to listen on (default: the configured one)")
+    serve.add_argument("--output-dir", help="output directory (default: the configured one)")
+    serve.add_argument("--engines", type=int, help="number of warm browser engines (default: parallel threads)")
+    serve.add_argument("--queue-size", type=int, help="maximum queued captures before 503 (default: the configured one)")
+    serve.add_argument("--stub", action="store_true", help="render placeholder images instead of starting browsers")
+    serve.add_argument("--stub-delay", type=float, default=0.0, help="seconds each stub capture takes")
+    
+    return parser
+
+
+def cmd_capture(args, config):
+    """Capture URLs from the command line and print the progress log."""
+    from .batch import BatchRunner
+    
+    text = "\n".join(args.urls)
+    if args.file:
+        text += "\n" + Path(args.file).read_text()
+    urls = parse_url_list(text)
+    if not urls:
+        print("No valid URLs given", file=sys.stderr)
+        return 2
+        
+    options = config.capture_options()
+    if args.output_dir:
+        options['output_dir'] = args.output_dir
+    if args.selectors:
+        options.update(type='element', selectors=args.selectors, clip=None)
+    elif args.clip:
+        options.update(type='region', selectors=None, clip=args.clip)
+    if args.scale:
+        options['device_scale_factor'] = args.scale
+    if args.mobile:
+        options['mobile'] = True
+    if args.freeze:
+        options['freeze_animations'] = True
+    if args.virtual_time is not None:
+        options['virtual_time_budget'] = args.virtual_time
+    if args.diagnostics:
+        options['diagnostics'] = True
+    options['force_capture'] = args.force
+    if args.no_cache:
+        options['cache'] = False
+    if args.no_dedup:
+        options['dedup_pages'] = False
+        
+    def emit(msg_type, data):
+        if msg_type == "log":
+            print(data)
+            
+    failures = BatchRunner(options, emit).run(urls)
+    return 1 if failures else 0
+
+
+def cmd_cache(args, config):
+    """Print cache statistics, or clear the cache."""
+    from .cache import create_cache
+    
+    options = config.capture_options()
+    if args.output_dir:
+        options['output_dir'] = args.output_dir
+    cache = create_cache(dict(options, cache=True))
+    
+    if args.clear:
+        cache.clear()
+        print("Cache cleared")
+        return 0
+        
+    stats = cache.stats()
+    print(f"{stats['entries']} entries, {format_bytes(stats['bytes'])} of {format_bytes(stats['max_bytes'])}")
+    return 0
+
+
+def cmd_index(args, config):
+    """Print records from the capture index."""
+    path = index_path(args.output_dir or config.get("output_directory"))
+    if not path.exists():
+        print(f"No capture index at {path}", file=sys.stderr)
+        return 1
+        
+    index = CaptureIndex(path)
+    if args.counts:
+        for status, count in sorted(index.counts().items()):
+            print(f"{status}\t{count}")
+        return 0
+        
+    records = index.query(url=args.url, domain=args.domain, status=args.status,
+                          since=args.since, until=args.until,
+                          limit=args.limit or None, oldest_first=args.oldest_first)
+    for record in records:
+        if args.json:
+            print(json.dumps(record))
+            continue
+        captured_at = datetime.fromtimestamp(record['captured_at']).strftime("%Y-%m-%d %H:%M:%S")
+        detail = record['location'] or record['error'] or ''
+        if record['width']:
+            detail += f" ({record['width']}x{record['height']}, {format_bytes(record['size'] or 0)})"
+        print(f"{captured_at}\t{record['status']}\t{record['url']}\t{detail}")
+    return 0
+
+
+def cmd_signature(args, config):
+    """Add, remove or list error-page signatures."""
+    from PIL import Image
+    from .quality import ErrorSignatures, signatures_path
+    
+    signatures = ErrorSignatures(signatures_path(args.output_dir or config.get("output_directory")))
+    if args.action == "add":
+        with Image.open(args.image) as image:
+            signatures.add(args.name, image)
+        return 0
+        
+    if args.action == "remove":
+        if not signatures.remove(args.name):
+            print(f"No signature named {args.name}", file=sys.stderr)
+            return 1
+        return 0
+        
+    for name, value in sorted(signatures.hashes.items()):
+        print(f"{name}\t{value:016x}")
+    return 0
+
+
+def cmd_schedule(args, config):
+    """Add, remove, list or run recurring capture jobs."""
+    from .scheduler import ScheduledJob, Scheduler, batch_job_runner
+    
+    scheduler = Scheduler(
+        config.get("schedule_file", "schedule.json"),
+        run_job=batch_job_runner(config.capture_options()),
+        max_concurrent=getattr(args, 'max_concurrent', None) or config.get("schedule_max_concurrent", 2)
+    )
+    
+    if args.action == "add":
+        if not args.urls and not args.file:
+            print("A job needs --url or --file", file=sys.stderr)
+            return 2
+        job = ScheduledJob(name=args.name, interval=args.every, urls=args.urls,
+                           url_file=str(Path(args.file).resolve()) if args.file else None,
+                           options=dict(args.options), jitter=args.jitter)
+        scheduler.add(job)
+        next_run = datetime.fromtimestamp(job.next_run).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"Job {job.name} runs every {format_duration(job.interval)}, next at {next_run}")
+        return 0
+        
+    if args.action == "remove":
+        if not scheduler.remove(args.name):
+            print(f"No job named {args.name}", file=sys.stderr)
+            return 1
+        return 0
+        
+    if args.action == "list":
+        for job in scheduler.jobs.values():
+            next_run = datetime.fromtimestamp(job.next_run).strftime("%Y-%m-%d %H:%M:%S") if job.next_run else "-"
+            last = "never"
+            if job.last_finished:
+                last = datetime.fromtimestamp(job.last_finished).strftime("%Y-%m-%d %H:%M:%S")
+                last += f" ({job.last_error or f'{job.last_failures} failures'})"
+            print(f"{job.name}\tevery {format_duration(job.interval)}\tnext {next_run}\t"
+                  f"last {last}\truns {job.runs}\tskipped {job.skipped}")
+        return 0
+        
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Stopping; waiting for running jobs to finish", file=sys.stderr)
+    finally:
+        scheduler.stop()
+    return 0
+
+
+def cmd_serve(args, config):
+    """Run the capture service until interrupted."""
+    from .server import CaptureService, StubEngine, browser_engine, create_server
+    
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    options = config.capture_options()
+    if args.output_dir:
+        options['output_dir'] = args.output_dir
+    engine_factory = functools.partial(StubEngine, delay=args.stub_delay) if args.stub else browser_engine
+    
+    service = CaptureService(
+        options,
+        engine_factory=engine_factory,
+        workers=args.engines or config.get("parallel_threads", 1),
+        queue_size=args.queue_size or config.get("serve_queue_size", 100)
+    )
+    server = create_server(service, host=args.host or config.get("serve_host", "127.0.0.1"),
+                           port=args.port or config.get("serve_port", 8750))
+    
+    service.start()
+    host, port = server.server_address[:2]
+    print(f"Serving captures on http://{host}:{port}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+COMMANDS = {
+    "capture": cmd_capture,
+    "cache": cmd_cache,
+    "index": cmd_index,
+    "signature": cmd_signature,
+    "schedule": cmd_schedule,
+    "serve": cmd_serve,
+}
+
+
+def run(argv, config=None):
+    """
+    Run a command-line command.
+    
+    Returns:
+        Process exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return COMMANDS[args.command](args, config or Config())
\ No newline at end of file
@@ -5,6 +5,7 @@ Configuration management module.
 import json
 import logging
 from pathlib import Path
+from .utils import TRACKING_PARAMS, parse_clip, parse_selectors
 
 
 class Config:
@@ -22,11 +23,12 @@ class Config:
         if self.config_file.exists():
             try:
                 with open(self.config_file, 'r') as f:
-                    self.settings = json.load(f)
+                    # Saved values override defaults; newly added keys keep their default
+                    self.settings = {**self._get_defaults(), **json.load(f)}
                 self.logger.info(f"Configuration loaded from {self.config_file}")
             except Exception as e:
                 self.logger.error(f"Failed to load configuration: {str(e)}")
-                self.settings = {}
+                self.settings = self._get_defaults()
         else:
             self.logger.info("No configuration file found, using defaults")
             self.settings = self._get_defaults()
@@ -48,6 +50,56 @@ class Config:
         """Set a configuration value."""
         self.settings[key] = value
         
+    def capture_options(self):
+        """Build a capture options dictionary from the saved settings."""
+        settings = {**self._get_defaults(), **self.settings}
+        shot_type = settings["shot_type"]
+        return {
+            'type': shot_type,
+            'width': settings["viewport_width"],
+            'height': settings["viewport_height"],
+            'zoom': settings["zoom_level"],
+            'device_scale_factor': settings["device_scale_factor"],
+            'mobile': settings["mobile_emulation"],
+            'freeze_animations': settings["freeze_animations"],
+            'virtual_time_budget': settings["virtual_time_budget"],
+            'format': settings["output_format"],
+            'quality': settings["jpeg_quality"] if settings["output_format"] == 'jpeg' else None,
+            'output_dir': settings["output_directory"],
+            'output_mode': settings["output_mode"],
+            'shard_size_mb': settings["shard_size_mb"],
+            'stitch_mode': settings["stitch_mode"],
+            'max_height': settings["max_page_height"],
+            'selectors': parse_selectors(settings["element_selectors"]) if shot_type == 'element' else None,
+            'clip': parse_clip(settings["clip_region"]) if shot_type == 'region' else None,
+            'tile_height': settings["tile_height"],
+            'tile_pyramid': settings["tile_pyramid"],
+            'change_detection': settings["change_detection"],
+            'change_threshold': settings["change_threshold"],
+            'change_phash': settings["change_phash"],
+            'change_highlight': settings["change_highlight"],
+            'preflight': settings["preflight"],
+            'preflight_concurrency': settings["preflight_concurrency"],
+            'prefilter': settings["prefilter"],
+            'prefilter_concurrency': settings["prefilter_concurrency"],
+            'threads': settings["parallel_threads"],
+            'autoscale': settings["autoscale"],
+            'min_workers': settings["min_workers"],
+            'max_workers': settings["max_workers"],
+            'crash_retries': settings["crash_retries"],
+            'capture_index': settings["capture_index"],
+            'cache': settings["cache"],
+            'cache_ttl': settings["cache_ttl"],
+            'cache_max_mb': settings["cache_max_mb"],
+            'diagnostics': settings["diagnostics"],
+            'trace_threshold': settings["trace_threshold"],
+            'quality_check': settings["quality_check"],
+            'quality_retries': settings["quality_retries"],
+            'quality_retry_wait': settings["quality_retry_wait"],
+            'dedup_pages': settings["dedup_pages"],
+            'strip_params': settings["strip_params"],
+        }
+        
     def _get_defaults(self):
         """Get default configuration values."""
         return {
@@ -56,8 +108,49 @@ class Config:
             "viewport_width": 1920,
             "viewport_height": 1080,
             "zoom_level": 1.0,
+            "device_scale_factor": 1.0,
+            "mobile_emulation": False,
+            "freeze_animations": False,
+            "virtual_time_budget": 0,
             "output_format": "png",
             "jpeg_quality": 85,
+            "stitch_mode": "memory",
+            "max_page_height": 30000,
+            "element_selectors": "",
+            "clip_region": "",
+            "tile_height": 4096,
+            "tile_pyramid": False,
+            "output_mode": "files",
+            "shard_size_mb": 1024,
+            "change_detection": "off",
+            "change_threshold": 0.01,
+            "change_phash": True,
+            "change_highlight": False,
+            "preflight": False,
+            "preflight_concurrency": 50,
+            "prefilter": False,
+            "prefilter_concurrency": 500,
             "parallel_threads": 1,
+            "autoscale": False,
+            "min_workers": 1,
+            "max_workers": 8,
+            "crash_retries": 2,
+            "capture_index": True,
+            "cache": True,
+            "cache_ttl": 300,
+            "cache_max_mb": 512,
+            "diagnostics": False,
+            "trace_threshold": 10.0,
+            "quality_check": True,
+            "quality_retries": 1,
+            "quality_retry_wait": 3.0,
+            "dedup_pages": True,
+            "strip_params": list(TRACKING_PARAMS),
+            "status_max_lines": 1000,
+            "serve_host": "127.0.0.1",
+            "serve_port": 8750,
+            "serve_queue_size": 100,
+            "schedule_file": "schedule.json",
+            "schedule_max_concurrent": 2,
             "window_geometry": "900x700"
         }
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Per-job deduplication of URLs that lead to the same page.
+
+Input lists often name one page several ways: http and https, with and
+without ``www``, with tracking parameters or through a short link. Input
+URLs that share a canonical form are queued once, and after navigation
+the browser's final URL is looked up among the pages already captured in
+the job; a hit is recorded as an alias of the existing output instead of
+being rendered and encoded again.
+
+Canonical forms are only compared, never loaded or recorded, and they
+keep the fragment so hash-routed pages stay apart.
+"""
+
+import threading
+import time
+from dataclasses import replace
+from .utils import TRACKING_PARAMS, normalize_url
+
+
+def page_key(url, strip_params=TRACKING_PARAMS):
+    """Return the canonical form under which a URL is compared with others."""
+    return normalize_url(url, strip_params, keep_fragment=True)
+
+
+def fold_duplicates(urls, strip_params=TRACKING_PARAMS):
+    """
+    Fold input URLs that share a canonical form.
+    
+    Args:
+        urls: Input URLs
+        strip_params: Patterns of query parameters ignored when comparing
+        
+    Returns:
+        Tuple of the URLs to capture, each the first spelling of its page in
+        input order and unchanged, and a dictionary mapping each of them to
+        the further input URLs of the same page
+    """
+    first = {}
+    duplicates = {}
+    for url in urls:
+        key = page_key(url, strip_params)
+        if key in first:
+            duplicates.setdefault(first[key], []).append(url)
+        else:
+            first[key] = url
+    return list(first.values()), duplicates
+
+
+def alias_result(result, url):
+    """Return a result for a URL that points at the outputs of an existing capture."""
+    fields = dict(url=url, status='alias', captured_at=time.time(), timings={}, diagnostics=None)
+    parts = [replace(part, alias_of=part.alias_of or part.url, **fields) for part in result.parts]
+    return replace(result, alias_of=result.alias_of or result.url, parts=parts, **fields)
+
+
+class CapturedPages:
+    """The pages captured so far in one job, keyed by their final URL; thread-safe."""
+    
+    def __init__(self, strip_params=TRACKING_PARAMS):
+        """
+        Initialize an empty set of pages.
+        
+        Args:
+            strip_params: Patterns of query parameters ignored when comparing URLs
+        """
+        self.strip_params = tuple(strip_params)
+        self._lock = threading.Lock()
+        self._pages = {}
+        
+    def find(self, url):
+        """Return the capture of the page at a URL, or None."""
+        key = page_key(url, self.strip_params)
+        with self._lock:
+            return self._pages.get(key)
+            
+    def add(self, result, *urls):
+        """
+        Remember a capture under the URLs that lead to it; the first capture wins.
+        
+        Suspect captures and aliases are never reused.
+        """
+        if result.status in ('suspect', 'alias'):
+            return
+        with self._lock:
+            for url in urls:
+                self._pages.setdefault(page_key(url, self.strip_params), result)
\ No newline at end of file
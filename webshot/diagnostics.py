@@ -0,0 +1,369 @@
+"""
+Per-page load diagnostics.
+
+With diagnostics on, the browser session is started with Chrome's
+performance log enabled, so chromedriver reports every DevTools Network
+event and the page's trace events. After each capture the Network events
+become a HAR file (the request waterfall) next to the outputs, alongside
+the page's Navigation Timing. The raw trace is only kept for pages slower
+than a threshold; Chrome DevTools and Perfetto open it as is.
+
+A DiagnosticsReport collects the per-page summaries of a batch and ranks
+the slowest pages and the third-party hosts that cost the most time.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+from .storage import unique_stem
+
+
+TRACE_CATEGORIES = ",".join((
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "blink.user_timing",
+    "loading",
+    "v8.execute",
+))
+
+NAVIGATION_TIMING_SCRIPT = """
+var entry = performance.getEntriesByType('navigation')[0];
+return entry ? entry.toJSON() : null;
+"""
+
+# Navigation Timing milestones kept in the page summary (milliseconds from navigation start)
+NAVIGATION_MILESTONES = {
+    'ttfb': 'responseStart',
+    'response_end': 'responseEnd',
+    'dom_interactive': 'domInteractive',
+    'dom_content_loaded': 'domContentLoadedEventEnd',
+    'load': 'loadEventEnd',
+}
+
+
+def enable_performance_log(chrome_options, trace=True):
+    """Ask chromedriver to record Network events and, optionally, trace events."""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    prefs = {'enableNetwork': True, 'enablePage': False}
+    if trace:
+        prefs['traceCategories'] = TRACE_CATEGORIES
+    chrome_options.add_experimental_option('perfLoggingPrefs', prefs)
+
+
+def parse_performance_log(entries):
+    """
+    Split chromedriver performance log entries by kind.
+    
+    Returns:
+        Tuple of (Network event messages, trace event dictionaries)
+    """
+    network, trace = [], []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get('method', '')
+        if method == 'Tracing.dataCollected':
+            trace.append(message.get('params', {}))
+        elif method.startswith('Network.'):
+            network.append(message)
+    return network, trace
+
+
+def _har_timings(request):
+    """Split a request's duration into HAR phases from its DevTools ResourceTiming."""
+    total = request['time']
+    timing = request.get('timing')
+    if not timing:
+        return {'blocked': 0, 'dns': -1, 'connect': -1, 'ssl': -1,
+                'send': 0, 'wait': total, 'receive': 0}
+        
+    def span(start, end):
+        begin, finish = timing.get(start, -1), timing.get(end, -1)
+        return finish - begin if begin >= 0 and finish >= 0 else -1
+        
+    queued = max(0.0, (timing['requestTime'] - request['start']) * 1000)
+    first = next((timing[key] for key in ('dnsStart', 'connectStart', 'sendStart')
+                  if timing.get(key, -1) >= 0), 0)
+    send = max(0, span('sendStart', 'sendEnd'))
+    wait = max(0, span('sendEnd', 'receiveHeadersEnd'))
+    return {
+        'blocked': queued + first,
+        'dns': span('dnsStart', 'dnsEnd'),
+        'connect': span('connectStart', 'connectEnd'),
+        'ssl': span('sslStart', 'sslEnd'),
+        'send': send,
+        'wait': wait,
+        'receive': max(0, total - queued - timing.get('receiveHeadersEnd', 0)),
+    }
+
+
+def build_waterfall(events):
+    """
+    Turn DevTools Network events into one record per request.
+    
+    Every redirect hop is its own record. Times are in milliseconds;
+    ``start`` is the monotonic DevTools timestamp in seconds.
+    
+    Returns:
+        Request dictionaries ordered by start time
+    """
+    open_requests = {}
+    finished = []
+    
+    def finish(request, end):
+        request['time'] = max(0.0, (end - request['start']) * 1000)
+        finished.append(request)
+        
+    for event in events:
+        params = event.get('params', {})
+        request_id = params.get('requestId')
+        method = event['method']
+        
+        if method == 'Network.requestWillBeSent':
+            previous = open_requests.pop(request_id, None)
+            if previous is not None and 'redirectResponse' in params:
+                previous['status'] = params['redirectResponse'].get('status')
+                previous['redirect_url'] = params['request']['url']
+                finish(previous, params['timestamp'])
+            open_requests[request_id] = {
+                'url': params['request']['url'],
+                'method': params['request'].get('method', 'GET'),
+                'type': params.get('type'),
+                'start': params['timestamp'],
+                'wall_time': params.get('wallTime', time.time()),
+                'status': None,
+                'size': 0,
+            }
+            continue
+            
+        request = open_requests.get(request_id)
+        if request is None:
+            continue
+        if method == 'Network.responseReceived':
+            response = params['response']
+            request.update(status=response.get('status'), mime_type=response.get('mimeType'),
+                           protocol=response.get('protocol'), ip=response.get('remoteIPAddress'),
+                           timing=response.get('timing'),
+                           from_cache=response.get('fromDiskCache', False))
+        elif method == 'Network.requestServedFromCache':
+            request['from_cache'] = True
+        elif method == 'Network.loadingFinished':
+            request['size'] = params.get('encodedDataLength', 0)
+            finish(open_requests.pop(request_id), params['timestamp'])
+        elif method == 'Network.loadingFailed':
+            request['error'] = 'canceled' if params.get('canceled') else params.get('errorText')
+            finish(open_requests.pop(request_id), params['timestamp'])
+            
+    # Requests still open when the capture ended, such as long polls
+    last = max((event['params'].get('timestamp', 0) for event in events if 'params' in event), default=0)
+    for request in open_requests.values():
+        request['error'] = 'unfinished'
+        finish(request, max(last, request['start']))
+        
+    return sorted(finished, key=lambda request: request['start'])
+
+
+def to_har(page_url, requests, navigation=None):
+    """Build a HAR 1.2 document for one page from its request records."""
+    started = min((request['wall_time'] for request in requests), default=time.time())
+    page_timings = {'onContentLoad': -1, 'onLoad': -1}
+    if navigation:
+        page_timings = {'onContentLoad': navigation.get('dom_content_loaded', -1),
+                        'onLoad': navigation.get('load', -1)}
+        
+    def iso(timestamp):
+        return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+        
+    entries = []
+    for request in requests:
+        version = request.get('protocol') or ''
+        entry = {
+            'pageref': 'page_1',
+            'startedDateTime': iso(request['wall_time']),
+            'time': request['time'],
+            'request': {'method': request['method'], 'url': request['url'], 'httpVersion': version,
+                        'cookies': [], 'headers': [], 'queryString': [],
+                        'headersSize': -1, 'bodySize': -1},
+            'response': {'status': request['status'] or 0, 'statusText': '', 'httpVersion': version,
+                         'cookies': [], 'headers': [],
+                         'content': {'size': -1, 'mimeType': request.get('mime_type') or ''},
+                         'redirectURL': request.get('redirect_url', ''),
+                         'headersSize': -1, 'bodySize': request['size'],
+                         '_transferSize': request['size']},
+            'cache': {},
+            'timings': _har_timings(request),
+            '_resourceType': request.get('type'),
+            '_fromCache': request.get('from_cache', False),
+        }
+        if request.get('ip'):
+            entry['serverIPAddress'] = request['ip'].strip('[]')
+        if request.get('error'):
+            entry['_error'] = request['error']
+        entries.append(entry)
+        
+    return {'log': {
+        'version': '1.2',
+        'creator': {'name': 'siteseeing', 'version': '1.0'},
+        'pages': [{'id': 'page_1', 'title': page_url, 'startedDateTime': iso(started),
+                   'pageTimings': page_timings}],
+        'entries': entries,
+    }}
+
+
+def site_of(host):
+    """
+    Reduce a host name to its site (last two labels) for first/third-party checks.
+    
+    Multi-label public suffixes such as ``co.uk`` are not known here, so
+    hosts under them compare by suffix plus one label too few.
+    """
+    labels = (host or '').lower().rstrip('.').split('.')
+    return '.'.join(labels[-2:])
+
+
+def summarize_hosts(page_url, requests):
+    """Total the requests of a page per host, flagging third-party hosts."""
+    page_site = site_of(urlparse(page_url).hostname)
+    hosts = {}
+    for request in requests:
+        host = (urlparse(request['url']).hostname or '').lower()
+        if not host:
+            continue  # data: and blob: URLs
+        summary = hosts.setdefault(host, {'requests': 0, 'time': 0.0, 'max_time': 0.0, 'bytes': 0,
+                                          'failed': 0, 'third_party': site_of(host) != page_site})
+        summary['requests'] += 1
+        summary['time'] += request['time']
+        summary['max_time'] = max(summary['max_time'], request['time'])
+        summary['bytes'] += request['size']
+        summary['failed'] += 1 if request.get('error') else 0
+    return hosts
+
+
+class PageDiagnostics:
+    """Collects the network waterfall, navigation timing and trace of each capture."""
+    
+    def __init__(self, directory, trace_threshold=10.0):
+        """
+        Initialize the collector.
+        
+        Args:
+            directory: Directory for HAR and trace files
+            trace_threshold: Capture seconds above which the trace is kept
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.trace_threshold = trace_threshold
+        
+    def begin(self, driver):
+        """Discard log entries left over from earlier pages."""
+        try:
+            driver.get_log('performance')
+        except Exception as e:
+            self.logger.warning(f"Performance log unavailable: {str(e)}")
+            
+    def collect(self, driver, url, elapsed):
+        """
+        Write the diagnostics of the page just captured.
+        
+        Args:
+            driver: WebDriver that loaded the page
+            url: Captured URL
+            elapsed: Seconds from navigation start to the end of the capture
+            
+        Returns:
+            Page summary dictionary with the HAR and trace locations
+        """
+        network, trace = parse_performance_log(driver.get_log('performance'))
+        requests = build_waterfall(network)
+        
+        navigation = {}
+        entry = driver.execute_script(NAVIGATION_TIMING_SCRIPT) or {}
+        for name, key in NAVIGATION_MILESTONES.items():
+            if entry.get(key):
+                navigation[name] = entry[key]
+                
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = unique_stem(url)
+        har_path = self.directory / f"{stem}.har"
+        with open(har_path, 'w') as f:
+            json.dump(to_har(url, requests, navigation), f)
+            
+        trace_path = None
+        if elapsed >= self.trace_threshold and trace:
+            trace_path = self.directory / f"{stem}.trace.json"
+            with open(trace_path, 'w') as f:
+                json.dump({'traceEvents': trace}, f)
+            self.logger.info(f"Kept trace of slow page {url} ({elapsed:.1f}s)")
+            
+        return {
+            'elapsed': elapsed,
+            'navigation': navigation,
+            'requests': len(requests),
+            'bytes': sum(request['size'] for request in requests),
+            'failed': sum(1 for request in requests if request.get('error')),
+            'hosts': summarize_hosts(url, requests),
+            'har': str(har_path),
+            'trace': str(trace_path) if trace_path else None,
+        }
+
+
+class DiagnosticsReport:
+    """Ranks the slowest pages and third-party hosts of a batch."""
+    
+    def __init__(self):
+        """Initialize an empty report."""
+        self.pages = {}
+        self.hosts = {}
+        
+    def add(self, url, diagnostics):
+        """Add the summary of one captured page."""
+        self.pages[url] = diagnostics
+        for host, summary in diagnostics['hosts'].items():
+            if not summary['third_party']:
+                continue
+            total = self.hosts.setdefault(host, {'pages': 0, 'requests': 0, 'time': 0.0,
+                                                 'max_time': 0.0, 'bytes': 0, 'failed': 0})
+            total['pages'] += 1
+            total['requests'] += summary['requests']
+            total['time'] += summary['time']
+            total['max_time'] = max(total['max_time'], summary['max_time'])
+            total['bytes'] += summary['bytes']
+            total['failed'] += summary['failed']
+            
+    def slowest_pages(self, limit=10):
+        """Return (url, summary) pairs of the slowest captures, slowest first."""
+        ranked = sorted(self.pages.items(), key=lambda item: item[1]['elapsed'], reverse=True)
+        return ranked[:limit]
+        
+    def slowest_hosts(self, limit=10):
+        """Return (host, totals) pairs of the third-party hosts with the most request time."""
+        ranked = sorted(self.hosts.items(), key=lambda item: item[1]['time'], reverse=True)
+        return ranked[:limit]
+        
+    def to_dict(self, limit=50):
+        """Return the report as a JSON-serializable dictionary."""
+        return {
+            'pages': len(self.pages),
+            'slowest_pages': [
+                {'url': url, 'elapsed': summary['elapsed'], 'requests': summary['requests'],
+                 'bytes': summary['bytes'], 'failed': summary['failed'],
+                 'navigation': summary['navigation'], 'har': summary['har'], 'trace': summary['trace']}
+                for url, summary in self.slowest_pages(limit)
+            ],
+            'slowest_third_party_hosts': [
+                dict(totals, host=host, mean_time=totals['time'] / totals['requests'])
+                for host, totals in self.slowest_hosts(limit)
+            ],
+        }
+        
+    def save(self, path):
+        """Write the report as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
\ No newline at end of file
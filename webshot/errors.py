@@ -0,0 +1,11 @@
+"""
+Exceptions shared by the capture engine and its callers.
+
+Kept free of browser dependencies, so front ends that never start a
+browser (such as the stub capture service) can handle them without
+importing Selenium.
+"""
+
+
+class BrowserCrashError(RuntimeError):
+    """The browser session died while capturing; the URL itself may be fine."""
\ No newline at end of file
@@ -7,10 +7,15 @@ from tkinter import ttk, scrolledtext, filedialog, messagebox
 import threading
 import queue
 import logging
+import time
+from collections import deque
 from pathlib import Path
-from .browser import BrowserEngine
-from .queue_manager import QueueManager
-from .utils import validate_url
+from .utils import TRACKING_PARAMS, validate_url, format_duration, parse_selectors, parse_clip
+
+
+# Message handling budget per Tk callback, and how often progress is redrawn
+MESSAGE_SLICE_SECONDS = 0.015
+PROGRESS_REFRESH_SECONDS = 0.25
 
 
 class SiteseeingGUI:
@@ -29,13 +34,22 @@ class SiteseeingGUI:
         
         # Queue for thread communication
         self.message_queue = queue.Queue()
-        self.queue_manager = QueueManager()
-        self.browser_engine = None
+        self.batch_runner = None
+        self.cancel_event = threading.Event()
         self.processing = False
+        self.message_handler = None
+        self.awaiting_completion = False
+        
+        # Live batch statistics, refreshed at a fixed rate
+        self.max_status_lines = self.config.get("status_max_lines", 1000)
+        self.status_line_count = 0
+        self.status_log = None
+        self.pending_progress = None
+        self.last_progress_refresh = 0.0
+        self.progress_samples = deque(maxlen=120)
         
         self._setup_ui()
         self._load_settings()
-        self._start_message_handler()
         
     def _setup_ui(self):
         """Set up the user interface."""
@@ -82,6 +96,10 @@ class SiteseeingGUI:
                        value="viewport").grid(row=0, column=1, sticky=tk.W)
         ttk.Radiobutton(shot_frame, text="Full Page", variable=self.shot_type, 
                        value="fullpage").grid(row=0, column=2, sticky=tk.W)
+        ttk.Radiobutton(shot_frame, text="Elements", variable=self.shot_type, 
+                       value="element").grid(row=0, column=3, sticky=tk.W)
+        ttk.Radiobutton(shot_frame, text="Region", variable=self.shot_type, 
+                       value="region").grid(row=0, column=4, sticky=tk.W)
         
         # Viewport size
         ttk.Label(shot_frame, text="Viewport:").grid(row=1, column=0, sticky=tk.W)
@@ -95,6 +113,15 @@ class SiteseeingGUI:
         ttk.Label(viewport_frame, text=" × ").pack(side=tk.LEFT)
         ttk.Entry(viewport_frame, textvariable=self.height_var, width=8).pack(side=tk.LEFT)
         
+        # Device emulation: pixel ratio and mobile viewport
+        self.scale_factor_var = tk.DoubleVar(value=1.0)
+        self.mobile_var = tk.BooleanVar(value=False)
+        ttk.Label(viewport_frame, text="  Pixel ratio:").pack(side=tk.LEFT)
+        ttk.Combobox(viewport_frame, textvariable=self.scale_factor_var,
+                    values=(1, 1.5, 2, 3), width=4).pack(side=tk.LEFT)
+        ttk.Checkbutton(viewport_frame, text="Mobile",
+                       variable=self.mobile_var).pack(side=tk.LEFT, padx=(10, 0))
+        
         # Zoom level
         ttk.Label(shot_frame, text="Zoom:").grid(row=2, column=0, sticky=tk.W)
         self.zoom_var = tk.DoubleVar(value=1.0)
@@ -109,6 +136,42 @@ class SiteseeingGUI:
         
         self.zoom_scale.bind("<Motion>", self._update_zoom_label)
         
+        # Full-page stitching
+        ttk.Label(shot_frame, text="Stitching:").grid(row=3, column=0, sticky=tk.W)
+        stitch_frame = ttk.Frame(shot_frame)
+        stitch_frame.grid(row=3, column=1, columnspan=2, sticky=tk.W)
+        
+        self.stitch_mode_var = tk.StringVar(value="memory")
+        ttk.Combobox(stitch_frame, textvariable=self.stitch_mode_var, state="readonly",
+                    values=("memory", "stream", "tiles"), width=8).pack(side=tk.LEFT)
+        ttk.Label(stitch_frame, text=" Max height:").pack(side=tk.LEFT)
+        self.max_height_var = tk.IntVar(value=30000)
+        ttk.Entry(stitch_frame, textvariable=self.max_height_var, width=8).pack(side=tk.LEFT)
+        
+        # Deterministic rendering
+        ttk.Label(shot_frame, text="Settle:").grid(row=6, column=0, sticky=tk.W)
+        settle_frame = ttk.Frame(shot_frame)
+        settle_frame.grid(row=6, column=1, columnspan=4, sticky=tk.W)
+        
+        self.freeze_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settle_frame, text="Freeze animations",
+                       variable=self.freeze_var).pack(side=tk.LEFT)
+        ttk.Label(settle_frame, text="  Virtual time (ms):").pack(side=tk.LEFT)
+        self.virtual_time_var = tk.IntVar(value=0)
+        ttk.Spinbox(settle_frame, from_=0, to=60000, increment=500,
+                   textvariable=self.virtual_time_var, width=7).pack(side=tk.LEFT)
+        
+        # Element selectors and region clip
+        ttk.Label(shot_frame, text="Selectors:").grid(row=4, column=0, sticky=tk.W)
+        self.selectors_var = tk.StringVar()
+        ttk.Entry(shot_frame, textvariable=self.selectors_var).grid(
+            row=4, column=1, columnspan=4, sticky=(tk.W, tk.E))
+        ttk.Label(shot_frame, text="Region:").grid(row=5, column=0, sticky=tk.W)
+        self.clip_var = tk.StringVar()
+        ttk.Entry(shot_frame, textvariable=self.clip_var, width=24).grid(
+            row=5, column=1, columnspan=2, sticky=tk.W)
+        ttk.Label(shot_frame, text="x, y, width, height").grid(row=5, column=3, columnspan=2, sticky=tk.W)
+        
         # Format options
         format_frame = ttk.LabelFrame(options_frame, text="Output Format", padding="5")
         format_frame.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N))
@@ -145,14 +208,22 @@ class SiteseeingGUI:
         ttk.Button(output_frame, text="Browse", 
                   command=self._browse_output_dir).grid(row=0, column=1, padx=(5, 0))
         
+        self.output_mode_var = tk.StringVar(value="files")
+        ttk.Combobox(output_frame, textvariable=self.output_mode_var, state="readonly",
+                    values=("files", "archive"), width=8).grid(row=0, column=2, padx=(5, 0))
+        
         # Batch processing options
         batch_frame = ttk.LabelFrame(main_frame, text="Batch Processing", padding="5")
         batch_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
         ttk.Label(batch_frame, text="Parallel threads:").pack(side=tk.LEFT)
         self.threads_var = tk.IntVar(value=1)
-        ttk.Spinbox(batch_frame, from_=1, to=5, textvariable=self.threads_var, 
-                   width=5).pack(side=tk.LEFT, padx=(5, 20))
+        ttk.Spinbox(batch_frame, from_=1, to=32, textvariable=self.threads_var, 
+                   width=5).pack(side=tk.LEFT, padx=(5, 5))
+        
+        self.autoscale_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_frame, text="Auto-scale", 
+                       variable=self.autoscale_var).pack(side=tk.LEFT, padx=(0, 20))
         
         # Control buttons
         self.start_button = ttk.Button(batch_frame, text="Start", command=self._start_processing)
@@ -166,6 +237,14 @@ class SiteseeingGUI:
                                        state=tk.DISABLED)
         self.cancel_button.pack(side=tk.LEFT)
         
+        self.force_capture_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_frame, text="Force capture", 
+                       variable=self.force_capture_var).pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.diagnostics_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_frame, text="Diagnostics", 
+                       variable=self.diagnostics_var).pack(side=tk.LEFT, padx=(10, 0))
+        
         # Status panel
         status_frame = ttk.LabelFrame(main_frame, text="Status", padding="5")
         status_frame.grid(row=4, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -181,6 +260,11 @@ class SiteseeingGUI:
                                            mode='determinate')
         self.progress_bar.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
         
+        # Live summary
+        self.summary_var = tk.StringVar(value="Idle")
+        ttk.Label(status_frame, textvariable=self.summary_var).grid(row=2, column=0, sticky=tk.W, 
+                                                                    pady=(5, 0))
+        
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
         
@@ -189,12 +273,21 @@ class SiteseeingGUI:
         # Output directory
         output_dir = self.config.get("output_directory", str(Path.cwd() / "screenshots"))
         self.output_dir_var.set(output_dir)
+        self.output_mode_var.set(self.config.get("output_mode", "files"))
         
         # Screenshot options
         self.shot_type.set(self.config.get("shot_type", "viewport"))
         self.width_var.set(self.config.get("viewport_width", 1920))
         self.height_var.set(self.config.get("viewport_height", 1080))
+        self.scale_factor_var.set(self.config.get("device_scale_factor", 1.0))
+        self.mobile_var.set(self.config.get("mobile_emulation", False))
+        self.freeze_var.set(self.config.get("freeze_animations", False))
+        self.virtual_time_var.set(self.config.get("virtual_time_budget", 0))
         self.zoom_var.set(self.config.get("zoom_level", 1.0))
+        self.stitch_mode_var.set(self.config.get("stitch_mode", "memory"))
+        self.selectors_var.set(self.config.get("element_selectors", ""))
+        self.clip_var.set(self.config.get("clip_region", ""))
+        self.max_height_var.set(self.config.get("max_page_height", 30000))
         
         # Format options
         self.format_var.set(self.config.get("output_format", "png"))
@@ -203,46 +296,129 @@ class SiteseeingGUI:
         
         # Batch options
         self.threads_var.set(self.config.get("parallel_threads", 1))
+        self.autoscale_var.set(self.config.get("autoscale", False))
+        self.diagnostics_var.set(self.config.get("diagnostics", False))
         
     def _save_settings(self):
         """Save current settings to config."""
         self.config.set("output_directory", self.output_dir_var.get())
+        self.config.set("output_mode", self.output_mode_var.get())
         self.config.set("shot_type", self.shot_type.get())
         self.config.set("viewport_width", self.width_var.get())
         self.config.set("viewport_height", self.height_var.get())
+        self.config.set("device_scale_factor", self.scale_factor_var.get())
+        self.config.set("mobile_emulation", self.mobile_var.get())
+        self.config.set("freeze_animations", self.freeze_var.get())
+        self.config.set("virtual_time_budget", self.virtual_time_var.get())
         self.config.set("zoom_level", self.zoom_var.get())
+        self.config.set("stitch_mode", self.stitch_mode_var.get())
+        self.config.set("element_selectors", self.selectors_var.get())
+        self.config.set("clip_region", self.clip_var.get())
+        self.config.set("max_page_height", self.max_height_var.get())
         self.config.set("output_format", self.format_var.get())
         self.config.set("jpeg_quality", self.quality_var.get())
         self.config.set("parallel_threads", self.threads_var.get())
+        self.config.set("autoscale", self.autoscale_var.get())
+        self.config.set("diagnostics", self.diagnostics_var.get())
         self.config.set("window_geometry", self.root.geometry())
         
     def _start_message_handler(self):
-        """Start the message queue handler."""
-        self._process_message_queue()
+        """Start the message queue handler for a job, unless it is running."""
+        if self.message_handler is None:
+            self._process_message_queue()
         
     def _process_message_queue(self):
-        """Process messages from worker threads."""
+        """
+        Process messages from worker threads in short time slices.
+        
+        Log lines are inserted in one batch per slice, progress updates are
+        merged and only the latest one is drawn, at most every
+        PROGRESS_REFRESH_SECONDS. If messages are left when the slice ends,
+        the handler yields to Tk and continues right away. Once the job's
+        completion message is handled the handler stops, so an idle window
+        is not woken up.
+        """
+        deadline = time.monotonic() + MESSAGE_SLICE_SECONDS
+        lines = []
+        complete = False
+        
         try:
-            while True:
+            while time.monotonic() < deadline:
                 msg_type, msg_data = self.message_queue.get_nowait()
                 
                 if msg_type == "log":
-                    self._add_status_message(msg_data)
+                    lines.append(msg_data)
                 elif msg_type == "progress":
-                    self.progress_var.set(msg_data)
+                    self.pending_progress = msg_data
                 elif msg_type == "complete":
-                    self._on_processing_complete()
+                    complete = True
+                    break
                     
         except queue.Empty:
             pass
             
-        self.root.after(100, self._process_message_queue)
+        if lines:
+            self._add_status_lines(lines)
+            
+        now = time.monotonic()
+        if self.pending_progress and (complete or now - self.last_progress_refresh >= PROGRESS_REFRESH_SECONDS):
+            self._refresh_progress(self.pending_progress)
+            self.pending_progress = None
+            self.last_progress_refresh = now
+            
+        if complete:
+            self.awaiting_completion = False
+            self._on_processing_complete()
+            
+        if not self.awaiting_completion and self.message_queue.empty():
+            self.message_handler = None
+            return
+            
+        delay = 1 if not self.message_queue.empty() else 100
+        self.message_handler = self.root.after(delay, self._process_message_queue)
         
     def _add_status_message(self, message):
         """Add a message to the status panel."""
-        self.status_text.insert(tk.END, f"{message}\n")
+        self._add_status_lines([message])
+        
+    def _add_status_lines(self, lines):
+        """
+        Append lines to the status panel and the on-disk job log.
+        
+        The panel behaves like a ring buffer: only the most recent
+        max_status_lines lines are kept in the widget.
+        """
+        text = "\n".join(lines) + "\n"
+        if self.status_log:
+            self.status_log.write(text)
+            
+        self.status_text.insert(tk.END, text)
+        # Messages such as error traces can span several lines
+        self.status_line_count += text.count("\n")
+        
+        excess = self.status_line_count - self.max_status_lines
+        if excess > 0:
+            self.status_text.delete("1.0", f"{excess + 1}.0")
+            self.status_line_count -= excess
+            
         self.status_text.see(tk.END)
         
+    def _refresh_progress(self, progress):
+        """Redraw the progress bar and the rate / ETA / failure summary."""
+        done, total, failures = progress['done'], progress['total'], progress['failures']
+        self.progress_var.set((done / total) * 100 if total else 0)
+        
+        now = time.monotonic()
+        self.progress_samples.append((now, done))
+        first_time, first_done = self.progress_samples[0]
+        elapsed = now - first_time
+        rate = (done - first_done) / elapsed if elapsed > 0 else 0.0
+        
+        summary = f"{done}/{total} done · {failures} failed"
+        if rate > 0:
+            summary += f" · {rate * 60:.1f}/min · ETA {format_duration((total - done) / rate)}"
+        self.summary_var.set(summary)
+        
     def _update_zoom_label(self, event=None):
         """Update the zoom percentage label."""
         zoom = self.zoom_var.get()
@@ -297,6 +473,9 @@ class SiteseeingGUI:
             line = line.strip()
             if line and not line.startswith('#'):
                 if validate_url(line):
+                    # Add scheme if missing
+                    if not line.startswith(('http://', 'https://')):
+                        line = 'https://' + line
                     urls.append(line)
                 else:
                     self._add_status_message(f"Invalid URL skipped: {line}")
@@ -305,6 +484,21 @@ class SiteseeingGUI:
             messagebox.showwarning("No Valid URLs", "No valid URLs found.")
             return
             
+        # Selectors and clip only take part in element and region captures
+        selectors = None
+        if self.shot_type.get() == 'element':
+            selectors = parse_selectors(self.selectors_var.get())
+        if selectors == []:
+            messagebox.showwarning("No Selectors", "Enter at least one CSS selector (separate several with ';').")
+            return
+        clip = None
+        if self.shot_type.get() == 'region':
+            try:
+                clip = parse_clip(self.clip_var.get())
+            except ValueError as e:
+                messagebox.showwarning("Invalid Region", f"The {str(e)}.")
+                return
+                
         # Create output directory
         output_dir = Path(self.output_dir_var.get())
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -315,9 +509,15 @@ class SiteseeingGUI:
         self.pause_button.config(state=tk.NORMAL)
         self.cancel_button.config(state=tk.NORMAL)
         
-        # Clear status
+        # Clear status and open the full log for this job
         self.status_text.delete(1.0, tk.END)
+        self.status_line_count = 0
         self.progress_var.set(0)
+        self.progress_samples.clear()
+        self.progress_samples.append((time.monotonic(), 0))
+        self.pending_progress = None
+        self.summary_var.set(f"0/{len(urls)} done")
+        self._open_status_log()
         
         # Save settings
         self._save_settings()
@@ -328,50 +528,76 @@ class SiteseeingGUI:
             'width': self.width_var.get(),
             'height': self.height_var.get(),
             'zoom': self.zoom_var.get(),
+            'device_scale_factor': self.scale_factor_var.get(),
+            'mobile': self.mobile_var.get(),
+            'freeze_animations': self.freeze_var.get(),
+            'virtual_time_budget': self.virtual_time_var.get(),
             'format': self.format_var.get(),
             'quality': self.quality_var.get() if self.format_var.get() == 'jpeg' else None,
-            'output_dir': output_dir
+            'output_dir': output_dir,
+            'output_mode': self.output_mode_var.get(),
+            'shard_size_mb': self.config.get("shard_size_mb", 1024),
+            'stitch_mode': self.stitch_mode_var.get(),
+            'max_height': self.max_height_var.get(),
+            'selectors': selectors,
+            'clip': clip,
+            'tile_height': self.config.get("tile_height", 4096),
+            'tile_pyramid': self.config.get("tile_pyramid", False),
+            'change_detection': self.config.get("change_detection", "off"),
+            'change_threshold': self.config.get("change_threshold", 0.01),
+            'change_phash': self.config.get("change_phash", True),
+            'change_highlight': self.config.get("change_highlight", False),
+            'preflight': self.config.get("preflight", False),
+            'preflight_concurrency': self.config.get("preflight_concurrency", 50),
+            'prefilter': self.config.get("prefilter", False),
+            'prefilter_concurrency': self.config.get("prefilter_concurrency", 500),
+            'threads': self.threads_var.get(),
+            'autoscale': self.autoscale_var.get(),
+            'min_workers': self.config.get("min_workers", 1),
+            'max_workers': self.config.get("max_workers", 8),
+            'crash_retries': self.config.get("crash_retries", 2),
+            'capture_index': self.config.get("capture_index", True),
+            'cache': self.config.get("cache", True),
+            'cache_ttl': self.config.get("cache_ttl", 300),
+            'cache_max_mb': self.config.get("cache_max_mb", 512),
+            'diagnostics': self.diagnostics_var.get(),
+            'trace_threshold': self.config.get("trace_threshold", 10.0),
+            'quality_check': self.config.get("quality_check", True),
+            'quality_retries': self.config.get("quality_retries", 1),
+            'quality_retry_wait': self.config.get("quality_retry_wait", 3.0),
+            'dedup_pages': self.config.get("dedup_pages", True),
+            'strip_params': self.config.get("strip_params", list(TRACKING_PARAMS)),
+            'force_capture': self.force_capture_var.get()
         }
         
         # Start processing in thread
+        self.batch_runner = None
+        self.cancel_event = threading.Event()
+        self.awaiting_completion = True
+        self._start_message_handler()
         thread = threading.Thread(
             target=self._process_urls,
-            args=(urls, options),
+            args=(urls, options, self.cancel_event),
             daemon=True
         )
         thread.start()
         
-    def _process_urls(self, urls, options):
+    def _process_urls(self, urls, options, cancel_event):
         """Process URLs in a worker thread."""
         try:
-            # Initialize browser engine
-            self.browser_engine = BrowserEngine(options)
-            self.browser_engine.start()
+            # Selenium, PIL and friends are only loaded once a capture starts
+            from .batch import BatchRunner
             
-            total_urls = len(urls)
+            self.batch_runner = BatchRunner(
+                options, lambda msg_type, data: self.message_queue.put((msg_type, data)),
+                cancel_event=cancel_event
+            )
+            self.batch_runner.run(urls)
             
-            for i, url in enumerate(urls):
-                if not self.processing:
-                    break
-                    
-                self.message_queue.put(("log", f"Processing {i+1}/{total_urls}: {url}"))
-                
-                try:
-                    filename = self.browser_engine.capture_screenshot(url)
-                    self.message_queue.put(("log", f"✓ Saved: {filename}"))
-                except Exception as e:
-                    self.message_queue.put(("log", f"✗ Error: {url} - {str(e)}"))
-                    
-                progress = ((i + 1) / total_urls) * 100
-                self.message_queue.put(("progress", progress))
-                
         except Exception as e:
             self.message_queue.put(("log", f"Fatal error: {str(e)}"))
             
         finally:
-            if self.browser_engine:
-                self.browser_engine.stop()
-                
             self.message_queue.put(("complete", None))
             
     def _pause_processing(self):
@@ -381,8 +607,29 @@ class SiteseeingGUI:
     def _cancel_processing(self):
         """Cancel processing."""
         self.processing = False
+        self.cancel_event.set()
+        if self.batch_runner:
+            self.batch_runner.cancel()
         self._add_status_message("Cancelling...")
         
+    def _open_status_log(self):
+        """Open a per-job log file that keeps every status line."""
+        self._close_status_log()
+        log_dir = Path("logs")
+        log_dir.mkdir(exist_ok=True)
+        log_path = log_dir / f"batch_{time.strftime('%Y%m%d_%H%M%S')}.log"
+        try:
+            self.status_log = open(log_path, 'a', encoding='utf-8', buffering=1 << 16)
+        except Exception as e:
+            self.logger.error(f"Failed to open status log: {str(e)}")
+            self.status_log = None
+            
+    def _close_status_log(self):
+        """Flush and close the per-job log file."""
+        if self.status_log:
+            self.status_log.close()
+            self.status_log = None
+            
     def _on_processing_complete(self):
         """Handle processing completion."""
         self.processing = False
@@ -390,12 +637,17 @@ class SiteseeingGUI:
         self.pause_button.config(state=tk.DISABLED)
         self.cancel_button.config(state=tk.DISABLED)
         self._add_status_message("Processing complete!")
+        self._close_status_log()
         
     def _on_closing(self):
         """Handle window closing."""
         if self.processing:
             if messagebox.askokcancel("Quit", "Processing is in progress. Are you sure you want to quit?"):
                 self.processing = False
+                self.cancel_event.set()
+                if self.batch_runner:
+                    self.batch_runner.cancel()
+                self._close_status_log()
                 self._save_settings()
                 self.root.destroy()
         else:
@@ -0,0 +1,280 @@
+"""
+Queryable index of captures.
+
+Every finished, skipped or failed URL of a batch is recorded in a SQLite
+database next to the outputs (``output_dir/.siteseeing/index.sqlite``), with
+the render options, output location, dimensions, size, content hash and
+per-phase timings. Records are handed to a background writer thread and
+inserted in batches, so recording never waits on the disk.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from .utils import options_fingerprint, render_options
+
+
+INDEX_FILENAME = "index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    location TEXT,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER,
+    content_hash TEXT,
+    diff_score REAL,
+    options_fingerprint TEXT,
+    timings TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS option_sets (
+    fingerprint TEXT PRIMARY KEY,
+    options TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_url ON captures (url, captured_at);
+CREATE INDEX IF NOT EXISTS captures_domain ON captures (domain, captured_at);
+CREATE INDEX IF NOT EXISTS captures_captured_at ON captures (captured_at);
+CREATE INDEX IF NOT EXISTS captures_status ON captures (status, captured_at);
+"""
+
+COLUMNS = ("url", "domain", "captured_at", "status", "location", "format", "width",
+           "height", "size", "content_hash", "diff_score", "options_fingerprint",
+           "timings", "error")
+
+# Queue markers for the writer thread
+_FLUSH = object()
+_STOP = object()
+
+
+def index_path(output_dir):
+    """Return the index location for an output directory."""
+    return Path(output_dir) / ".siteseeing" / INDEX_FILENAME
+
+
+class CaptureIndex:
+    """SQLite index of captures with a batched background writer."""
+    
+    def __init__(self, path, batch_size=500, flush_interval=1.0):
+        """
+        Open (or create) the index.
+        
+        Args:
+            path: Database file
+            batch_size: Records inserted per transaction at most
+            flush_interval: Seconds a partial batch may wait before it is written
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        
+        self._queue = queue.Queue()
+        self._option_sets = set()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        
+    def _connect(self):
+        """Open a connection; WAL lets queries run while the writer inserts."""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+        
+    def record(self, url, status, result=None, options=None, error=None):
+        """
+        Queue one record for insertion; never blocks on the database.
+        
+        Args:
+            url: Captured URL
+            status: Outcome such as captured, unchanged, not_modified, failed
+            result: CaptureResult of the capture, if there is one
+            options: Capture options used for the URL
+            error: Failure reason
+        """
+        fingerprint = None
+        if options is not None:
+            fingerprint = options_fingerprint(options)
+            if fingerprint not in self._option_sets:
+                self._option_sets.add(fingerprint)
+                self._queue.put(('options', fingerprint,
+                                 json.dumps(render_options(options), sort_keys=True, default=str)))
+                
+        row = {
+            'url': url,
+            'domain': (urlparse(url).hostname or '').lower(),
+            'captured_at': time.time(),
+            'status': status,
+            'options_fingerprint': fingerprint,
+            'error': error,
+        }
+        if result is not None:
+            row.update({
+                'captured_at': result.captured_at,
+                'location': result.location,
+                'format': result.format,
+                'width': result.width,
+                'height': result.height,
+                'size': result.size,
+                'content_hash': result.content_hash,
+                'diff_score': result.diff_score,
+                'timings': json.dumps(result.timings) if result.timings else None,
+            })
+            
+        self._ensure_writer()
+        self._queue.put(('capture', tuple(row.get(column) for column in COLUMNS)))
+        
+    def flush(self):
+        """Block until every queued record is in the database."""
+        if self._writer is not None:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+            
+    def close(self):
+        """Write outstanding records and stop the writer thread."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join()
+            
+    def _ensure_writer(self):
+        """Start the writer thread on first use."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                                name="CaptureIndexWriter")
+                self._writer.start()
+                
+    def _write_loop(self):
+        """Collect queued records and insert them in batches."""
+        conn = self._connect()
+        options, captures, taken = [], [], 0
+        
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval if taken else None)
+                except queue.Empty:
+                    item = _FLUSH
+                else:
+                    taken += 1
+                    
+                if item is not _FLUSH and item is not _STOP:
+                    if item[0] == 'options':
+                        options.append(item[1:])
+                    else:
+                        captures.append(item[1])
+                    if len(captures) < self.batch_size:
+                        continue
+                        
+                if options or captures:
+                    self._insert(conn, options, captures)
+                    options, captures = [], []
+                for _ in range(taken):
+                    self._queue.task_done()
+                taken = 0
+                
+                if item is _STOP:
+                    break
+        finally:
+            conn.close()
+            
+    def _insert(self, conn, options, captures):
+        """Insert one batch in a single transaction."""
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO option_sets (fingerprint, options) VALUES (?, ?)", options
+                )
+                conn.executemany(
+                    f"INSERT INTO captures ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                    captures
+                )
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to write {len(captures)} index records: {str(e)}")
+            
+    def query(self, url=None, domain=None, status=None, since=None, until=None,
+              limit=100, oldest_first=False):
+        """
+        Find captures matching all given filters.
+        
+        Args:
+            url: Exact URL
+            domain: Host name; subdomains are not included
+            status: Outcome status
+            since: Earliest capture time (Unix timestamp)
+            until: Latest capture time (Unix timestamp)
+            limit: Maximum number of records, None for all
+            oldest_first: Sort ascending instead of newest first
+            
+        Returns:
+            List of record dictionaries with decoded options and timings
+        """
+        clauses, params = [], []
+        for column, value in (('url', url), ('domain', domain and domain.lower()), ('status', status)):
+            if value is not None:
+                clauses.append(f"c.{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("c.captured_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("c.captured_at <= ?")
+            params.append(until)
+            
+        sql = ("SELECT c.*, o.options FROM captures c "
+               "LEFT JOIN option_sets o ON o.fingerprint = c.options_fingerprint")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY c.captured_at {'ASC' if oldest_first else 'DESC'}, c.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+            
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [self._decode(row) for row in rows]
+        
+    def latest(self, url, status=None):
+        """Return the most recent record of a URL, or None."""
+        records = self.query(url=url, status=status, limit=1)
+        return records[0] if records else None
+        
+    def counts(self):
+        """Return the number of records per status."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM captures GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {status: count for status, count in rows}
+        
+    @staticmethod
+    def _decode(row):
+        """Turn a result row into a plain dictionary."""
+        record = dict(row)
+        for key in ('options', 'timings'):
+            record[key] = json.loads(record[key]) if record.get(key) else {}
+        return record
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Asynchronous DNS and connectivity pre-filter for URL lists.
+
+Dead domains otherwise tie up a browser worker until Chrome gives up. This
+stage resolves every distinct host and opens a TCP (and, for https, TLS)
+connection to it concurrently, so only URLs whose host answers are handed
+to the browser. The resolved addresses can be passed to Chrome through
+``--host-resolver-rules`` so it does not resolve them a second time.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlparse
+
+
+# Chrome rejects very long switches; beyond this many hosts no rules are passed
+MAX_RESOLVER_RULES = 1000
+
+
+@dataclass
+class HostCheck:
+    """Reachability of one host/port pair."""
+    
+    host: str
+    port: int
+    reachable: bool
+    addresses: List[str] = field(default_factory=list)
+    reason: Optional[str] = None
+
+
+@dataclass
+class PrefilterResult:
+    """Outcome of pre-filtering a URL list."""
+    
+    reachable: List[str]
+    failures: dict
+    resolved: dict
+
+
+def _target(url):
+    """Return (host, port, use_tls) for a URL."""
+    parsed = urlparse(url)
+    use_tls = parsed.scheme == 'https'
+    return parsed.hostname or '', parsed.port or (443 if use_tls else 80), use_tls
+
+
+def _tls_context():
+    """TLS context that only checks whether a handshake completes."""
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def _check_host(host, port, use_tls, timeout, semaphore):
+    """Resolve a host and try to connect to one of its addresses."""
+    loop = asyncio.get_running_loop()
+    
+    async with semaphore:
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout
+            )
+        except socket.gaierror as e:
+            return HostCheck(host, port, False, reason=f"DNS lookup failed: {e.strerror or e}")
+        except asyncio.TimeoutError:
+            return HostCheck(host, port, False, reason="DNS lookup timed out")
+        except (UnicodeError, ValueError) as e:
+            # IDNA encoding rejects e.g. labels over 63 characters
+            return HostCheck(host, port, False, reason=f"invalid host name: {e}")
+            
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        reason = "no addresses"
+        
+        for address in addresses[:2]:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(
+                        address, port,
+                        ssl=_tls_context() if use_tls else None,
+                        server_hostname=host if use_tls else None
+                    ),
+                    timeout
+                )
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (OSError, ssl.SSLError):
+                    pass
+                return HostCheck(host, port, True, addresses=[address] + [a for a in addresses if a != address])
+            except asyncio.TimeoutError:
+                reason = f"connection to {address} timed out"
+            except ssl.SSLError as e:
+                reason = f"TLS handshake failed: {e.reason or e}"
+            except OSError as e:
+                reason = f"connection failed: {e.strerror or e}"
+                
+        return HostCheck(host, port, False, addresses=addresses, reason=reason)
+
+
+async def check_hosts(urls, concurrency=500, timeout=5.0):
+    """
+    Check every distinct host/port of the URLs concurrently.
+    
+    Args:
+        urls: URLs to check
+        concurrency: Maximum simultaneous lookups and connection attempts
+        timeout: Timeout in seconds for the lookup and for each connection
+        
+    Returns:
+        Dictionary mapping (host, port, use_tls) to HostCheck
+    """
+    loop = asyncio.get_running_loop()
+    # getaddrinfo runs in the default executor; size it for many lookups at once
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, 256)))
+    loop.set_default_executor(executor)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    targets = [target for target in dict.fromkeys(_target(url) for url in urls) if target[0]]
+    checks = await asyncio.gather(*[
+        _check_host(host, port, use_tls, timeout, semaphore) for host, port, use_tls in targets
+    ])
+    return dict(zip(targets, checks))
+
+
+def prefilter_urls(urls, concurrency=500, timeout=5.0):
+    """
+    Split URLs into reachable ones and failures with a reason.
+    
+    Returns:
+        PrefilterResult with the reachable URLs (in input order), a
+        URL -> reason dictionary of failures and a host -> address
+        dictionary of resolved hosts
+    """
+    checks = asyncio.run(check_hosts(urls, concurrency=concurrency, timeout=timeout))
+    
+    reachable, failures, resolved = [], {}, {}
+    for url in urls:
+        check = checks.get(_target(url))
+        if check is None:
+            failures[url] = "no host name"
+        elif check.reachable:
+            reachable.append(url)
+            resolved[check.host] = check.addresses[0]
+        else:
+            failures[url] = check.reason
+            
+    logging.getLogger(__name__).info(
+        f"Pre-filter: {len(reachable)} reachable, {len(failures)} unreachable URLs"
+    )
+    return PrefilterResult(reachable=reachable, failures=failures, resolved=resolved)
+
+
+def host_resolver_rules(resolved):
+    """
+    Build a Chrome ``--host-resolver-rules`` value from resolved addresses.
+    
+    Args:
+        resolved: Dictionary mapping host names to IP addresses
+        
+    Returns:
+        Rules string, or None when there is nothing (or too much) to map
+    """
+    rules = []
+    for host, address in resolved.items():
+        try:
+            ipaddress.ip_address(host)
+            continue  # Already an address, nothing to map
+        except ValueError:
+            pass
+        if ipaddress.ip_address(address).version == 6:
+            rules.append(f"MAP {host} [{address}]")
+        else:
+            rules.append(f"MAP {host} {address}")
+            
+    if not rules or len(rules) > MAX_RESOLVER_RULES:
+        return None
+    return ", ".join(rules)
\ No newline at end of file
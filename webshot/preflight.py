@@ -0,0 +1,141 @@
+"""
+Conditional HTTP pre-flight checks.
+
+Before a URL is handed to the browser, a HEAD request carrying the
+validators from the last successful capture (ETag / Last-Modified) tells us
+whether the page changed at all. A ``304 Not Modified`` answer lets the
+batch skip the capture without spending a browser slot.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import aiohttp
+
+
+@dataclass
+class PreflightResult:
+    """Outcome of a conditional request for one URL."""
+    
+    url: str
+    status: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: Optional[str] = None
+    
+    @property
+    def not_modified(self):
+        """Whether the server confirmed the page is unchanged."""
+        return self.status == 'not_modified'
+
+
+class ValidatorStore:
+    """Persists HTTP validators per URL in a JSON file."""
+    
+    def __init__(self, path):
+        """Load validators from the given file, if it exists."""
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.validators = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.validators = json.load(f)
+            except Exception as e:
+                self.logger.error(f"Failed to load validators: {str(e)}")
+                
+    def get(self, url):
+        """Return the stored validators for a URL (possibly empty)."""
+        return self.validators.get(url, {})
+        
+    def update(self, url, etag=None, last_modified=None):
+        """Remember the validators of a successfully captured URL."""
+        if etag or last_modified:
+            self.validators[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': time.time(),
+            }
+        else:
+            self.validators.pop(url, None)
+            
+    def save(self):
+        """Write validators to disk atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.validators, f)
+        tmp_path.replace(self.path)
+
+
+async def _check_url(session, url, validators, use_validators):
+    """Send one conditional request and classify the answer."""
+    headers = {}
+    if use_validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+            
+    try:
+        async with session.head(url, headers=headers, allow_redirects=True) as response:
+            status, response_headers = response.status, response.headers
+        if status in (405, 501):
+            # Some servers reject HEAD; fall back to a GET and drop the body
+            async with session.get(url, headers=headers, allow_redirects=True) as response:
+                status, response_headers = response.status, response.headers
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return PreflightResult(url=url, status='error', error=str(e) or type(e).__name__)
+        
+    etag = response_headers.get('ETag') or validators.get('etag')
+    last_modified = response_headers.get('Last-Modified') or validators.get('last_modified')
+    
+    if status == 304:
+        return PreflightResult(url=url, status='not_modified', etag=etag, last_modified=last_modified)
+    if status >= 400:
+        return PreflightResult(url=url, status='error', error=f"HTTP {status}")
+    return PreflightResult(url=url, status='modified',
+                           etag=response_headers.get('ETag'),
+                           last_modified=response_headers.get('Last-Modified'))
+
+
+async def check_urls(urls, store, concurrency=50, timeout=10.0, force=False):
+    """
+    Run conditional requests for many URLs over one pooled session.
+    
+    Args:
+        urls: URLs to check
+        store: ValidatorStore with the validators of previous captures
+        concurrency: Maximum simultaneous requests
+        timeout: Total timeout per request in seconds, counted from the
+            moment the request gets one of the ``concurrency`` slots
+        force: Do not send validators (every URL counts as modified), but
+            still collect fresh validators
+            
+    Returns:
+        Dictionary mapping URL to PreflightResult
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    # Requests wait for a slot here rather than for a pooled connection,
+    # where the wait would count against their timeout
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def check(session, url):
+        async with slots:
+            return await _check_url(session, url, store.get(url), not force)
+            
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        results = await asyncio.gather(*[check(session, url) for url in urls])
+        
+    return {result.url: result for result in results}
+
+
+def run_preflight(urls, store, concurrency=50, timeout=10.0, force=False):
+    """Synchronous wrapper around check_urls for use from worker threads."""
+    return asyncio.run(check_urls(urls, store, concurrency=concurrency,
+                                  timeout=timeout, force=force))
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Post-capture quality check for blank frames and error pages.
+
+Captures taken before a page rendered (white frames, lone spinners) and
+browser error pages still produce a valid image. Each capture is reduced
+to the same small grayscale thumbnail the change detector uses, and a few
+vectorized NumPy measures flag it as suspect:
+
+- the share of pixels within one grey level of the dominant one,
+- the Shannon entropy of the grey-level histogram,
+- the perceptual-hash distance to known error-page signatures.
+"""
+
+import io
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from PIL import Image
+from .change_detection import hamming_distance, perceptual_hash, to_thumbnail
+
+
+LEVELS = 64
+
+
+@dataclass
+class QualityReport:
+    """Measures of one capture and the reason it is suspect, if it is."""
+    
+    uniform_ratio: float
+    entropy: float
+    signature: Optional[str] = None
+    error_page: bool = False
+    reason: Optional[str] = None
+    
+    @property
+    def suspect(self):
+        """Whether the capture looks blank or like an error page."""
+        return self.reason is not None
+
+
+def image_measures(image):
+    """
+    Return (uniform_ratio, entropy) of an image.
+    
+    The thumbnail is quantized to 64 grey levels; the uniform ratio counts
+    pixels within one level of the most common one, and the entropy is in
+    bits (0 for a single colour, at most 6).
+    """
+    levels = np.rint(to_thumbnail(image) * (LEVELS - 1)).astype(np.intp)
+    histogram = np.bincount(levels.ravel(), minlength=LEVELS)
+    dominant = int(histogram.argmax())
+    uniform = histogram[max(0, dominant - 1):dominant + 2].sum() / levels.size
+    
+    p = histogram[histogram > 0] / levels.size
+    entropy = float(-(p * np.log2(p)).sum())
+    return float(uniform), entropy
+
+
+class ErrorSignatures:
+    """Perceptual hashes of known error pages, persisted as JSON."""
+    
+    def __init__(self, path, max_distance=6):
+        """
+        Load the signatures.
+        
+        Args:
+            path: JSON file mapping signature names to hex hashes
+            max_distance: Largest hash distance that still counts as a match
+        """
+        self.path = Path(path)
+        self.max_distance = max_distance
+        self.hashes = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.hashes = {name: int(value, 16) for name, value in json.load(f).items()}
+                
+    def add(self, name, image):
+        """Add (or replace) a signature from an example capture and save."""
+        self.hashes[name] = perceptual_hash(image)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({key: f"{value:016x}" for key, value in self.hashes.items()}, f, indent=2)
+            
+    def remove(self, name):
+        """Remove a signature and save; returns whether it existed."""
+        if self.hashes.pop(name, None) is None:
+            return False
+        with open(self.path, 'w') as f:
+            json.dump({key: f"{value:016x}" for key, value in self.hashes.items()}, f, indent=2)
+        return True
+        
+    def match(self, image):
+        """Return the name of the closest signature within range, or None."""
+        if not self.hashes:
+            return None
+        image_hash = perceptual_hash(image)
+        distance, name = min((hamming_distance(image_hash, value), name)
+                             for name, value in self.hashes.items())
+        return name if distance <= self.max_distance else None
+
+
+class QualityChecker:
+    """Flags blank, low-detail and error-page captures."""
+    
+    def __init__(self, signatures=None, max_uniform=0.98, min_entropy=0.25):
+        """
+        Initialize the checker.
+        
+        Args:
+            signatures: ErrorSignatures to compare against, if any
+            max_uniform: Uniform-colour share above which a capture is blank
+            min_entropy: Histogram entropy (bits) below which a capture lacks detail
+        """
+        self.signatures = signatures
+        self.max_uniform = max_uniform
+        self.min_entropy = min_entropy
+        
+    def check(self, data, error_page=False):
+        """
+        Check an encoded capture.
+        
+        Args:
+            data: PNG or JPEG bytes
+            error_page: The browser already reported an error page
+            
+        Returns:
+            QualityReport
+        """
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('L', (image.width // 8, image.height // 8))  # JPEG only: decode at 1/8
+            uniform, entropy = image_measures(image)
+            signature = self.signatures.match(image) if self.signatures else None
+            
+        report = QualityReport(uniform_ratio=uniform, entropy=entropy,
+                               signature=signature, error_page=error_page)
+        if error_page:
+            report.reason = "browser error page"
+        elif signature:
+            report.reason = f"matches error page signature '{signature}'"
+        elif uniform >= self.max_uniform:
+            report.reason = f"blank ({uniform:.0%} one colour)"
+        elif entropy < self.min_entropy:
+            report.reason = f"little detail (entropy {entropy:.2f} bits)"
+        return report
+
+
+def signatures_path(output_dir):
+    """Return the error signature file of an output directory."""
+    return Path(output_dir) / ".siteseeing" / "error_signatures.json"
+
+
+def create_quality_checker(options):
+    """Create the quality checker described by the options, or None when disabled."""
+    if not options.get('quality_check'):
+        return None
+    return QualityChecker(
+        signatures=ErrorSignatures(signatures_path(options['output_dir'])),
+        max_uniform=options.get('quality_max_uniform', 0.98),
+        min_entropy=options.get('quality_min_entropy', 0.25)
+    )
\ No newline at end of file
@@ -1,89 +1,435 @@
 """
 Queue management module for batch processing.
+
+Every submitted URL gets a future that settles with a TaskResult once the
+URL is processed, fails for good or is cancelled. Consumers can wait on
+the futures, iterate results as they finish (``as_completed`` or, from
+asyncio, ``async for ... in results_async()``), register completion
+callbacks or block in ``join()``; nothing needs to poll. Idle workers
+block on the task queue instead of waking up periodically.
 """
 
+import asyncio
 import queue
 import threading
 import logging
-from typing import List, Callable, Any
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass
+from typing import List, Callable, Any, Optional
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one processed URL."""
+    
+    url: str
+    success: bool
+    value: Any = None
+    error: Optional[str] = None
+    exception: Optional[BaseException] = None
+    attempts: int = 1
+    duration: float = 0.0
+    
+    def __iter__(self):
+        """Unpack like the former (success, url, value or error) tuples."""
+        return iter((self.success, self.url, self.value if self.success else self.error))
+
+
+class _Task:
+    """A queued URL with its future and retry count."""
+    
+    __slots__ = ('url', 'future', 'retries')
+    
+    def __init__(self, url):
+        self.url = url
+        self.future = Future()
+        self.retries = 0
+
+
+# Queue markers: _STOP ends a worker, _RETIRE wakes an idle worker to retire
+_STOP = None
+_RETIRE = object()
 
 
 class QueueManager:
     """Manages URL processing queue for batch operations."""
     
-    def __init__(self):
-        """Initialize the queue manager."""
+    def __init__(self, max_retries: int = 0, retry_on: tuple = (),
+                 on_retry: Optional[Callable[[str, Exception, int], None]] = None):
+        """
+        Initialize the queue manager.
+        
+        Args:
+            max_retries: How often a URL is requeued after a retryable error
+            retry_on: Exception types that requeue the URL instead of failing it
+            on_retry: Optional function called with (url, error, attempt) on requeue
+        """
         self.logger = logging.getLogger(__name__)
         self.task_queue = queue.Queue()
         self.results_queue = queue.Queue()
         self.workers = []
         self.running = False
         
-    def add_urls(self, urls: List[str]):
-        """Add URLs to the processing queue."""
-        for url in urls:
-            self.task_queue.put(url)
+        # Runtime resizing and per-task statistics
+        self._lock = threading.Lock()
+        self._worker_func = None
+        self._on_worker_exit = None
+        self._retire_pending = 0
+        self._next_worker_id = 1
+        self._completed = deque(maxlen=2000)
+        
+        # Retry budget per URL for retryable errors
+        self.max_retries = max_retries
+        self.retry_on = tuple(retry_on)
+        self.on_retry = on_retry
+        
+        # Completion tracking
+        self._settled_cond = threading.Condition(self._lock)
+        self._submitted = 0
+        self._settled = 0
+        self._callbacks = []
+        self._async_waiters = []
+        
+    def submit(self, url: str) -> Future:
+        """
+        Queue one URL.
+        
+        Returns:
+            Future that resolves to the URL's TaskResult; failures are
+            results with ``success`` False, not exceptions. Cancelling it
+            before a worker picks the URL up drops the URL.
+        """
+        task = _Task(url)
+        # However it gets cancelled, a cancelled URL is settled
+        task.future.add_done_callback(self._on_future_done)
+        with self._lock:
+            self._submitted += 1
+        self.task_queue.put(task)
+        return task.future
+        
+    def add_urls(self, urls: List[str]) -> List[Future]:
+        """Add URLs to the processing queue and return their futures."""
+        futures = [self.submit(url) for url in urls]
         self.logger.info(f"Added {len(urls)} URLs to queue")
+        return futures
         
-    def start_workers(self, num_workers: int, worker_func: Callable[[str], Any]):
-        """Start worker threads for processing."""
+    def add_done_callback(self, callback: Callable[[TaskResult], None]):
+        """Call a function with every TaskResult as it settles, in the worker thread."""
+        with self._lock:
+            self._callbacks.append(callback)
+            
+    def start_workers(self, num_workers: int, worker_func: Callable[[str], Any],
+                      on_worker_exit: Optional[Callable[[], None]] = None):
+        """
+        Start worker threads for processing.
+        
+        Args:
+            num_workers: Number of threads to start
+            worker_func: Function called with each URL
+            on_worker_exit: Optional function called in each worker thread
+                right before it exits, e.g. to release per-thread resources
+        """
         self.running = True
+        self._worker_func = worker_func
+        self._on_worker_exit = on_worker_exit
         
-        for i in range(num_workers):
+        for _ in range(num_workers):
+            self.add_worker()
+            
+        self.logger.info(f"Started {num_workers} worker threads")
+        
+    def add_worker(self):
+        """Start one more worker thread, or cancel a pending retirement."""
+        with self._lock:
+            if self._retire_pending > 0:
+                self._retire_pending -= 1
+                return
+                
             worker = threading.Thread(
                 target=self._worker,
-                args=(worker_func,),
+                args=(self._worker_func,),
                 daemon=True,
-                name=f"Worker-{i+1}"
+                name=f"Worker-{self._next_worker_id}"
             )
-            worker.start()
+            self._next_worker_id += 1
             self.workers.append(worker)
             
-        self.logger.info(f"Started {num_workers} worker threads")
+        worker.start()
+        
+    def retire_worker(self):
+        """Ask one worker thread to exit after its current task."""
+        with self._lock:
+            if self.worker_count > 1:
+                self._retire_pending += 1
+                self.task_queue.put(_RETIRE)
+                
+    @property
+    def worker_count(self):
+        """Number of workers that will keep running (excluding retiring ones)."""
+        return len(self.workers) - self._retire_pending
         
     def stop_workers(self):
-        """Stop all worker threads."""
+        """Cancel queued URLs and stop all worker threads after their current task."""
         self.running = False
+        self.cancel_pending()
         
         # Add stop signals to queue
         for _ in self.workers:
-            self.task_queue.put(None)
+            self.task_queue.put(_STOP)
             
         # Wait for workers to finish
-        for worker in self.workers:
+        for worker in list(self.workers):
             worker.join(timeout=5)
             
-        self.workers.clear()
+        with self._lock:
+            self.workers.clear()
+            self._retire_pending = 0
         self.logger.info("All workers stopped")
         
+    def cancel_pending(self):
+        """
+        Drop every URL still waiting in the queue.
+        
+        Their futures are cancelled and count as settled; URLs already being
+        processed finish normally.
+        
+        Returns:
+            Number of URLs cancelled
+        """
+        cancelled = 0
+        while True:
+            try:
+                task = self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.task_queue.task_done()
+            if isinstance(task, _Task):
+                if task.future.cancelled():
+                    continue  # cancelled by its consumer and already settled
+                # A requeued task's future is already running and cannot be cancelled
+                if not task.future.cancel():
+                    task.future.set_exception(CancelledError())
+                    self._mark_settled(1)
+                cancelled += 1
+            elif task is _RETIRE:
+                with self._lock:
+                    self._retire_pending = max(0, self._retire_pending - 1)
+                    
+        if cancelled:
+            self.logger.info(f"Cancelled {cancelled} queued URLs")
+        return cancelled
+        
+    def _on_future_done(self, future):
+        """Count a cancelled future as settled."""
+        if future.cancelled():
+            self._mark_settled(1)
+            
+    def _mark_settled(self, count):
+        """Count URLs that settled without a result and wake every waiter."""
+        with self._settled_cond:
+            self._settled += count
+            self._settled_cond.notify_all()
+        self._wake_async_waiters()
+        
     def _worker(self, worker_func: Callable[[str], Any]):
         """Worker thread function."""
         thread_name = threading.current_thread().name
         self.logger.info(f"{thread_name} started")
         
-        while self.running:
-            try:
-                url = self.task_queue.get(timeout=1)
-                
-                if url is None:  # Stop signal
+        try:
+            while self.running:
+                task = self.task_queue.get()
+                try:
+                    if task is _STOP:
+                        break
+                    if task is _RETIRE:
+                        # Already consumed by a worker that finished a task
+                        if self._should_retire():
+                            break
+                        continue
+                    self._process(task, worker_func)
+                finally:
+                    self.task_queue.task_done()
+                    
+                if self._should_retire():
                     break
                     
-                # Process URL
+        finally:
+            with self._lock:
+                if threading.current_thread() in self.workers:
+                    self.workers.remove(threading.current_thread())
+            if self._on_worker_exit:
                 try:
-                    result = worker_func(url)
-                    self.results_queue.put((True, url, result))
+                    self._on_worker_exit()
                 except Exception as e:
-                    self.results_queue.put((False, url, str(e)))
+                    self.logger.error(f"{thread_name} cleanup failed: {str(e)}")
                     
-                self.task_queue.task_done()
+        self.logger.info(f"{thread_name} stopped")
+        
+    def _process(self, task, worker_func):
+        """Run one task and settle it, unless it is requeued."""
+        # A requeued task's future is already running
+        if not task.future.running() and not task.future.set_running_or_notify_cancel():
+            return
+            
+        started = time.monotonic()
+        try:
+            value = worker_func(task.url)
+            result = TaskResult(url=task.url, success=True, value=value)
+        except Exception as e:
+            if self._requeue(task, e):
+                finished = time.monotonic()
+                self._completed.append((finished, finished - started, False))
+                return
+            result = TaskResult(url=task.url, success=False, error=str(e), exception=e)
+            
+        finished = time.monotonic()
+        self._completed.append((finished, finished - started, result.success))
+        result.attempts = task.retries + 1
+        result.duration = finished - started
+        self._settle(task, result)
+        
+    def _settle(self, task, result):
+        """Publish a final result to every kind of consumer."""
+        # Callbacks run first, so they are done by the time join() returns
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                self.logger.error(f"Completion callback failed for {result.url}: {str(e)}")
                 
+        # Queue and count together, so waiters never see one without the other
+        with self._settled_cond:
+            self.results_queue.put(result)
+            self._settled += 1
+            self._settled_cond.notify_all()
+        self._wake_async_waiters()
+        task.future.set_result(result)
+        
+    def _requeue(self, task, error):
+        """Put a task back on the queue if the error is retryable and budget remains."""
+        if not self.running or not isinstance(error, self.retry_on) or task.retries >= self.max_retries:
+            return False
+        task.retries += 1
+        
+        self.logger.warning(f"Requeueing {task.url} after {type(error).__name__} "
+                            f"(retry {task.retries}/{self.max_retries})")
+        if self.on_retry:
+            self.on_retry(task.url, error, task.retries)
+        self.task_queue.put(task)
+        return True
+        
+    def _should_retire(self):
+        """Consume one pending retirement, if any."""
+        with self._lock:
+            if self._retire_pending > 0:
+                self._retire_pending -= 1
+                return True
+        return False
+        
+    @property
+    def unsettled(self):
+        """Number of submitted URLs without a final result yet."""
+        with self._lock:
+            return self._submitted - self._settled
+            
+    def _result_ready(self):
+        """Whether a result can be taken or all are settled (call with the lock held)."""
+        return not self.results_queue.empty() or self._settled >= self._submitted
+        
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every submitted URL has settled.
+        
+        Returns:
+            True if all settled, False if the timeout expired first
+        """
+        with self._settled_cond:
+            return self._settled_cond.wait_for(lambda: self._settled >= self._submitted, timeout)
+            
+    def as_completed(self, timeout: Optional[float] = None):
+        """
+        Yield TaskResults as they finish until every submitted URL has settled.
+        
+        Results are taken from the same queue as ``get_results``, so use one
+        or the other.
+        
+        Args:
+            timeout: Longest wait for the next result, in seconds
+            
+        Raises:
+            TimeoutError: If no result arrives within the timeout
+        """
+        while True:
+            with self._settled_cond:
+                if not self._settled_cond.wait_for(self._result_ready, timeout):
+                    raise TimeoutError(f"No result within {timeout} seconds")
+            try:
+                yield self.results_queue.get_nowait()
             except queue.Empty:
+                if self.unsettled == 0:
+                    return
+                    
+    async def results_async(self):
+        """
+        Asynchronously yield TaskResults as they finish until every URL has settled.
+        
+        Waiting is done on the event loop, without a helper thread. Results
+        are taken from the same queue as ``as_completed`` and ``get_results``.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = None
+            with self._lock:
+                if not self._result_ready():
+                    # Registered under the lock, so no settle can slip past
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if waiter is not None:
+                await waiter
                 continue
-                
-        self.logger.info(f"{thread_name} stopped")
+            try:
+                yield self.results_queue.get_nowait()
+            except queue.Empty:
+                if self.unsettled == 0:
+                    return
+                    
+    def _wake_async_waiters(self):
+        """Resume every coroutine waiting in results_async."""
+        with self._lock:
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda waiter=waiter: waiter.done() or waiter.set_result(None))
+            
+    def get_stats(self, window: float = 30.0):
+        """
+        Summarize tasks finished within the last ``window`` seconds.
+        
+        Returns:
+            Dictionary with completed, throughput (tasks/s), p95_latency (s)
+            and failure_rate
+        """
+        cutoff = time.monotonic() - window
+        recent = [entry for entry in list(self._completed) if entry[0] >= cutoff]
+        if not recent:
+            return {'completed': 0, 'throughput': 0.0, 'p95_latency': None, 'failure_rate': 0.0}
+            
+        durations = sorted(duration for _, duration, _ in recent)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        failures = sum(1 for _, _, success in recent if not success)
+        return {
+            'completed': len(recent),
+            'throughput': len(recent) / window,
+            'p95_latency': p95,
+            'failure_rate': failures / len(recent),
+        }
         
     def get_results(self):
-        """Get all available results."""
+        """Get all available results without waiting."""
         results = []
         
         while True:
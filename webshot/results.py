@@ -0,0 +1,35 @@
+"""
+Result records produced by the capture engine.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class CaptureResult:
+    """Describes a single finished capture."""
+    
+    url: str
+    location: str
+    captured_at: float = field(default_factory=time.time)
+    width: int = 0
+    height: int = 0
+    size: int = 0
+    format: str = 'png'
+    status: str = 'captured'
+    diff_score: Optional[float] = None
+    reference: Optional[str] = None
+    highlight: Optional[str] = None
+    content_hash: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    selector: Optional[str] = None
+    parts: list = field(default_factory=list)
+    diagnostics: Optional[dict] = None
+    suspect_reason: Optional[str] = None
+    alias_of: Optional[str] = None
+    
+    def __str__(self):
+        """Return the output location, so results print like file names."""
+        return self.location
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""
+Recurring capture scheduler.
+
+Keeps a table of recurring capture jobs, each with an interval, a URL list
+and option overrides, and runs them as batches. Start times are spread with
+a deterministic per-job offset inside the interval, so jobs with the same
+interval do not all start on the hour, and a job keeps the same slot across
+restarts. A global cap limits how many jobs run at once, and a job is never
+started again while its previous run is still going; that slot is skipped.
+
+The job table and run history are persisted in a JSON state file. Jobs
+may be added or removed by another process while the scheduler runs; the
+file is merged back in whenever it changed before it is rewritten.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+from .utils import parse_url_list
+
+
+# Fields that describe a job, as opposed to its schedule and run history
+DEFINITION_FIELDS = ('interval', 'urls', 'url_file', 'options', 'jitter', 'enabled')
+
+
+@dataclass
+class ScheduledJob:
+    """One recurring capture job and its run history."""
+    
+    name: str
+    interval: float
+    urls: list = field(default_factory=list)
+    url_file: Optional[str] = None
+    options: dict = field(default_factory=dict)
+    jitter: Optional[float] = None
+    enabled: bool = True
+    next_run: Optional[float] = None
+    last_started: Optional[float] = None
+    last_finished: Optional[float] = None
+    last_failures: Optional[int] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+    skipped: int = 0
+    
+    @property
+    def offset(self):
+        """Deterministic start offset within the interval, derived from the name."""
+        spread = self.interval if self.jitter is None else min(self.jitter, self.interval)
+        fraction = int(hashlib.sha1(self.name.encode()).hexdigest()[:8], 16) / 0x100000000
+        return fraction * spread
+        
+    def next_slot(self, after):
+        """Return the first start time of this job strictly after a point in time."""
+        slot = math.floor((after - self.offset) / self.interval) + 1
+        return slot * self.interval + self.offset
+        
+    def load_urls(self):
+        """Return the job's URLs, including those of its URL file."""
+        text = "\n".join(self.urls)
+        if self.url_file:
+            text += "\n" + Path(self.url_file).read_text()
+        return parse_url_list(text)
+
+
+def batch_job_runner(base_options):
+    """
+    Build a job runner that captures a job's URLs as a batch.
+    
+    Args:
+        base_options: Capture options the job's overrides are applied to
+        
+    Returns:
+        Callable taking a ScheduledJob and returning the number of failures
+    """
+    def run(job):
+        from .batch import BatchRunner
+        
+        logger = logging.getLogger(__name__)
+        
+        def emit(msg_type, data):
+            if msg_type == "log":
+                logger.info(f"[{job.name}] {data}")
+                
+        return BatchRunner({**base_options, **job.options}, emit).run(job.load_urls())
+        
+    return run
+
+
+class Scheduler:
+    """Starts due jobs under a global concurrency cap and persists their state."""
+    
+    def __init__(self, state_file, run_job=None, max_concurrent=2, poll_interval=1.0):
+        """
+        Load the job table.
+        
+        Args:
+            state_file: JSON file holding the jobs and their history
+            run_job: Callable running one ScheduledJob and returning its failure count
+            max_concurrent: Maximum number of jobs running at the same time
+            poll_interval: Seconds between checks for due jobs
+        """
+        self.logger = logging.getLogger(__name__)
+        self.state_file = Path(state_file)
+        self.run_job = run_job
+        self.max_concurrent = max(1, max_concurrent)
+        self.poll_interval = poll_interval
+        
+        self.jobs = {}
+        self._running = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._state_version = None
+        self.load()
+        
+    def load(self):
+        """Read the job table from the state file, if it exists."""
+        jobs = self._read_state()
+        if jobs is not None:
+            with self._lock:
+                self.jobs.update(jobs)
+                
+    def _read_state(self):
+        """Return the jobs in the state file, or None if it is missing or unreadable."""
+        try:
+            version = self._file_version()
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.error(f"Failed to load schedule: {str(e)}")
+            return None
+        self._state_version = version
+        
+        known = {f.name for f in fields(ScheduledJob)}
+        jobs = {}
+        for entry in state.get('jobs', []):
+            job = ScheduledJob(**{key: value for key, value in entry.items() if key in known})
+            jobs[job.name] = job
+        return jobs
+        
+    def _sync(self):
+        """
+        Merge in the state file if another process changed it since it was
+        last read or written here. Caller holds the save lock.
+        
+        The file decides which jobs exist and what they do. Jobs known on
+        both sides keep the schedule and run history recorded here unless
+        their definition changed; running jobs are updated in place.
+        """
+        try:
+            if self._file_version() == self._state_version:
+                return
+        except FileNotFoundError:
+            return
+        jobs = self._read_state()
+        if jobs is None:
+            return
+            
+        with self._lock:
+            for name in set(self.jobs) - set(jobs):
+                self.logger.info(f"Job {name} was removed from the schedule")
+                del self.jobs[name]
+            for name, stored in jobs.items():
+                job = self.jobs.get(name)
+                if job is None:
+                    self.logger.info(f"Job {name} was added to the schedule")
+                    self.jobs[name] = stored
+                elif any(getattr(job, key) != getattr(stored, key) for key in DEFINITION_FIELDS):
+                    for key in DEFINITION_FIELDS + ('next_run',):
+                        setattr(job, key, getattr(stored, key))
+                        
+    def save(self):
+        """Merge in changes made elsewhere, then write the job table atomically."""
+        # The scheduler thread and job threads save concurrently; one at a
+        # time, so the shared temp file is never written twice at once and
+        # the newest snapshot is replaced last
+        with self._save_lock:
+            self._sync()
+            self._write()
+            
+    def _write(self):
+        """Write the job table to the state file. Caller holds the save lock."""
+        with self._lock:
+            state = {'jobs': [asdict(job) for job in self.jobs.values()]}
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        tmp_path.replace(self.state_file)
+        self._state_version = self._file_version()
+        
+    def _file_version(self):
+        """Identify the state file's current contents without reading it."""
+        # Every write replaces the file, so the inode changes even when the
+        # modification time is too coarse to tell two writes apart
+        stat = self.state_file.stat()
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+        
+    def add(self, job):
+        """Add or replace a job; its first run is its next slot."""
+        if job.interval <= 0:
+            raise ValueError("interval must be positive")
+        with self._save_lock:
+            self._sync()
+            with self._lock:
+                previous = self.jobs.get(job.name)
+                if previous is not None:
+                    job.runs, job.skipped = previous.runs, previous.skipped
+                    job.last_started, job.last_finished = previous.last_started, previous.last_finished
+                job.next_run = job.next_slot(time.time())
+                self.jobs[job.name] = job
+            self._write()
+            
+    def remove(self, name):
+        """Remove a job; returns whether it existed."""
+        with self._save_lock:
+            self._sync()
+            with self._lock:
+                removed = self.jobs.pop(name, None) is not None
+            if removed:
+                self._write()
+        return removed
+        
+    def start(self):
+        """Check for due jobs in a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="Scheduler")
+        self._thread.start()
+        self.logger.info(f"Scheduler started with {len(self.jobs)} jobs")
+        
+    def stop(self, wait=True):
+        """Stop starting jobs and, by default, wait for running ones to finish."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if wait:
+            for thread in list(self._running.values()):
+                thread.join()
+        self.save()
+        
+    def running(self):
+        """Return the names of the jobs currently running."""
+        with self._lock:
+            return sorted(self._running)
+            
+    def _loop(self):
+        """Poll for due jobs until stopped."""
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                self.logger.error(f"Scheduler tick failed: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+            
+    def tick(self, now=None):
+        """
+        Start every due job that may run now.
+        
+        A due job whose previous run is still going skips the slot. A due job
+        that finds all concurrency slots taken stays due and starts as soon as
+        one frees up, earliest-due first.
+        
+        Returns:
+            Names of the jobs started
+        """
+        now = time.time() if now is None else now
+        started = []
+        changed = False
+        
+        # Pick up jobs added or removed by another process
+        with self._save_lock:
+            self._sync()
+            
+        with self._lock:
+            due = sorted(
+                (job for job in self.jobs.values() if job.enabled),
+                key=lambda job: job.next_run if job.next_run is not None else now
+            )
+            for job in due:
+                if job.next_run is None:
+                    job.next_run = job.next_slot(now)
+                    changed = True
+                if job.next_run > now:
+                    continue
+                    
+                if job.name in self._running:
+                    job.skipped += 1
+                    job.next_run = job.next_slot(now)
+                    changed = True
+                    self.logger.warning(f"Job {job.name} is still running; skipping this run")
+                    continue
+                    
+                if len(self._running) >= self.max_concurrent:
+                    continue
+                    
+                job.next_run = job.next_slot(now)
+                job.last_started = now
+                thread = threading.Thread(target=self._run, args=(job,), daemon=True,
+                                          name=f"Job-{job.name}")
+                self._running[job.name] = thread
+                thread.start()
+                started.append(job.name)
+                changed = True
+                
+        if changed:
+            self.save()
+        return started
+        
+    def _run(self, job):
+        """Run one job and record the outcome."""
+        self.logger.info(f"Starting job {job.name}")
+        failures, error = None, None
+        try:
+            failures = self.run_job(job)
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"Job {job.name} failed: {error}")
+        finally:
+            with self._lock:
+                job.runs += 1
+                job.last_finished = time.time()
+                job.last_failures = failures
+                job.last_error = error
+                self._running.pop(job.name, None)
+            self.save()
+        self.logger.info(f"Finished job {job.name}")
\ No newline at end of file
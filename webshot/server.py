@@ -0,0 +1,541 @@
+"""
+HTTP capture service.
+
+``siteseeing serve`` keeps a pool of started browser engines and accepts
+capture requests over HTTP:
+
+- ``POST /captures`` with a JSON body ``{"url": ..., "options": {...}}``
+  queues a capture and answers ``202`` with a job description. With
+  ``"wait": <seconds>`` the request blocks and returns the image itself
+  once the capture is done.
+- ``GET /captures/<id>`` returns the job description.
+- ``GET /captures/<id>/image`` returns the image of a finished job;
+  element captures with several selectors expose each element's image as
+  ``/captures/<id>/image/<n>``.
+- ``GET /health`` returns pool and queue counters.
+
+Requests for a page captured within the cache TTL are answered from the
+capture cache without queueing. Identical requests (same URL and render
+options) that arrive while a capture is queued or running are attached to
+that job instead of using another browser slot. The request queue is
+bounded; when it is full new captures are refused with ``503`` and a
+``Retry-After`` header.
+"""
+
+import dataclasses
+import hashlib
+import io
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from PIL import Image
+from .cache import create_cache
+from .errors import BrowserCrashError
+from .index import CaptureIndex, index_path
+from .results import CaptureResult
+from .storage import LooseFileStore
+from .utils import normalize_url, options_fingerprint, validate_url
+
+
+# Options a request may override, with their validators
+REQUEST_OPTIONS = {
+    'type': lambda value: value in ('viewport', 'fullpage', 'element', 'region'),
+    'width': lambda value: isinstance(value, int) and 100 <= value <= 7680,
+    'height': lambda value: isinstance(value, int) and 100 <= value <= 4320,
+    'zoom': lambda value: isinstance(value, (int, float)) and 0.1 <= value <= 5.0,
+    'device_scale_factor': lambda value: isinstance(value, (int, float)) and 0.5 <= value <= 4.0,
+    'mobile': lambda value: isinstance(value, bool),
+    'freeze_animations': lambda value: isinstance(value, bool),
+    'virtual_time_budget': lambda value: isinstance(value, int) and 0 <= value <= 60000,
+    'format': lambda value: value in ('png', 'jpeg'),
+    'quality': lambda value: value is None or (isinstance(value, int) and 1 <= value <= 100),
+    'max_height': lambda value: isinstance(value, int) and value > 0,
+    'stitch_mode': lambda value: value in ('memory', 'stream'),
+    'selectors': lambda value: (isinstance(value, list) and 0 < len(value) <= 20
+                                and all(isinstance(item, str) and item.strip() for item in value)),
+    'clip': lambda value: (isinstance(value, list) and len(value) == 4
+                           and all(isinstance(item, (int, float)) for item in value)
+                           and min(value[:2]) >= 0 and min(value[2:]) > 0),
+}
+
+CONTENT_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg'}
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue cannot take another capture."""
+
+
+@dataclass
+class Job:
+    """One capture, shared by every request that asked for it."""
+    
+    id: str
+    url: str
+    options: dict
+    key: tuple
+    status: str = 'queued'
+    result: Optional[CaptureResult] = None
+    error: Optional[str] = None
+    requests: int = 1
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    
+    def describe(self):
+        """Return the JSON-serialisable job description."""
+        description = {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'requests': self.requests,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.result is not None:
+            description.update({
+                'image': f"/captures/{self.id}/image",
+                'width': self.result.width,
+                'height': self.result.height,
+                'size': self.result.size,
+                'format': self.result.format,
+                'content_hash': self.result.content_hash,
+                'timings': self.result.timings,
+            })
+            if self.result.suspect_reason:
+                description['suspect'] = self.result.suspect_reason
+            if self.result.parts:
+                description['parts'] = [
+                    {'selector': part.selector, 'image': f"/captures/{self.id}/image/{number}",
+                     'width': part.width, 'height': part.height, 'size': part.size}
+                    for number, part in enumerate(self.result.parts)
+                ]
+        if self.error is not None:
+            description['error'] = self.error
+        return description
+
+
+class StubEngine:
+    """
+    Browser-free engine for local testing.
+    
+    Renders a solid image of the viewport size whose colour is derived from
+    the URL, after an optional delay standing in for page load time.
+    """
+    
+    def __init__(self, options, store=None, delay=0.0):
+        """Initialize the stub with capture options and an output store."""
+        self.options = options
+        self.store = store if store is not None else LooseFileStore(options['output_dir'])
+        self.delay = delay
+        self.captures = 0
+        
+    def start(self):
+        """Nothing to start."""
+        
+    def stop(self):
+        """Nothing to stop."""
+        
+    def restart(self):
+        """Nothing to restart."""
+        
+    def configure(self, options):
+        """Switch to different capture options."""
+        self.options = options
+        
+    def capture_screenshot(self, url):
+        """Render and save the stand-in image(s) for a URL."""
+        if self.delay:
+            time.sleep(self.delay)
+        self.captures += 1
+        scale = self.options.get('device_scale_factor') or 1.0
+        
+        if self.options['type'] == 'element':
+            # One fixed-size image per selector, like one output per element
+            parts = [self._render(url, (200, 100), selector=selector)
+                     for selector in self.options['selectors']]
+            return dataclasses.replace(parts[0], parts=parts)
+        if self.options['type'] == 'region':
+            return self._render(url, tuple(round(value * scale) for value in self.options['clip'][2:]))
+        return self._render(url, (round(self.options['width'] * scale), round(self.options['height'] * scale)))
+        
+    def _render(self, url, size, selector=None):
+        """Save a solid image of the given size."""
+        image = Image.new('RGB', size, tuple(hashlib.sha1(url.encode()).digest()[:3]))
+        output = io.BytesIO()
+        if self.options['format'] == 'jpeg':
+            image.save(output, 'JPEG', quality=self.options.get('quality') or 85)
+        else:
+            image.save(output, 'PNG')
+        data = output.getvalue()
+        
+        location = self.store.save(url, data, self.options['format'])
+        return CaptureResult(url=url, location=location, width=size[0], height=size[1],
+                             size=len(data), format=self.options['format'], selector=selector,
+                             content_hash=hashlib.sha256(data).hexdigest())
+
+
+def browser_engine(options, store):
+    """Create a Selenium browser engine; imported lazily so the stub needs no driver."""
+    from .browser import BrowserEngine
+    return BrowserEngine(options, store=store)
+
+
+class CaptureService:
+    """Coalescing job queue in front of a pool of warm engines."""
+    
+    def __init__(self, options, engine_factory=browser_engine, workers=2, queue_size=100,
+                 job_ttl=600.0):
+        """
+        Initialize the service.
+        
+        Args:
+            options: Base capture options; requests may override REQUEST_OPTIONS
+            engine_factory: Callable (options, store) -> engine with start, stop,
+                restart, configure and capture_screenshot
+            workers: Number of engines, each with its own worker thread
+            queue_size: Maximum number of queued (not yet running) captures
+            job_ttl: Seconds finished jobs stay available for polling
+        """
+        self.logger = logging.getLogger(__name__)
+        # Responses are read back from disk, so outputs are always loose files
+        self.options = dict(options, output_mode='files')
+        self.engine_factory = engine_factory
+        self.workers = max(1, workers)
+        self.job_ttl = job_ttl
+        
+        self.store = LooseFileStore(self.options['output_dir'])
+        self.cache = create_cache(self.options)
+        self.index = None
+        if self.options.get('capture_index', True):
+            self.index = CaptureIndex(index_path(self.options['output_dir']))
+            
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._in_flight = {}
+        self._threads = []
+        self._ready = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.running = False
+        
+    def start(self):
+        """Start the worker threads; each starts its engine before taking jobs."""
+        self.running = True
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True, name=f"ServiceWorker-{number + 1}")
+            self._threads.append(thread)
+            thread.start()
+        self.logger.info(f"Capture service started with {self.workers} engines")
+        
+    def stop(self):
+        """Fail queued jobs, stop the workers and close the outputs."""
+        self.running = False
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job, error="service stopped")
+            
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        
+        self.store.close()
+        if self.index is not None:
+            self.index.close()
+        self.logger.info("Capture service stopped")
+        
+    def request_options(self, overrides):
+        """
+        Merge validated per-request overrides into the base options.
+        
+        Raises:
+            ValueError: If an option is unknown or has an invalid value
+        """
+        options = dict(self.options)
+        for key, value in (overrides or {}).items():
+            check = REQUEST_OPTIONS.get(key)
+            if check is None:
+                raise ValueError(f"unsupported option: {key}")
+            if not check(value):
+                raise ValueError(f"invalid value for {key}: {value!r}")
+            options[key] = value
+        if options['format'] == 'jpeg' and options.get('quality') is None:
+            options['quality'] = 85
+        if options['type'] == 'element' and not options.get('selectors'):
+            raise ValueError("element captures need selectors")
+        if options['type'] == 'region' and not options.get('clip'):
+            raise ValueError("region captures need a clip")
+        return options
+        
+    def submit(self, url, overrides=None):
+        """
+        Queue a capture, or attach to an identical one already in flight.
+        
+        Returns:
+            The Job serving the request
+            
+        Raises:
+            ValueError: If the URL or an option is invalid
+            QueueFullError: If the request queue is full
+        """
+        if not self.running:
+            raise QueueFullError("service is not running")
+        if not validate_url(url):
+            raise ValueError(f"invalid URL: {url}")
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+            
+        options = self.request_options(overrides)
+        key = (normalize_url(url), options_fingerprint(options))
+        
+        if self.cache is not None:
+            result = self.cache.lookup(url, options, self.store)
+            if result is not None:
+                job = Job(id=uuid.uuid4().hex, url=url, options=options, key=key)
+                with self._lock:
+                    self._prune()
+                    self._jobs[job.id] = job
+                self._finish(job, result=result)
+                return job
+                
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None:
+                job.requests += 1
+                self.coalesced += 1
+                return job
+                
+            job = Job(id=uuid.uuid4().hex, url=url, options=options, key=key)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFullError("request queue is full")
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            return job
+            
+    def get_job(self, job_id):
+        """Return a job by ID, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+            
+    def stats(self):
+        """Return pool and queue counters."""
+        with self._lock:
+            running = sum(1 for job in self._in_flight.values() if job.status == 'running')
+            stats = {
+                'engines': self.workers,
+                'ready': self._ready,
+                'queued': self._queue.qsize(),
+                'queue_size': self._queue.maxsize,
+                'running': running,
+                'jobs': len(self._jobs),
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+            }
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+        
+    def _prune(self):
+        """Forget finished jobs older than the TTL (lock held)."""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            
+    def _worker(self):
+        """Run jobs on one warm engine until stopped."""
+        engine = None
+        try:
+            engine = self.engine_factory(self.options, self.store)
+            engine.start()
+            with self._lock:
+                self._ready += 1
+        except Exception as e:
+            self.logger.error(f"Failed to start engine: {str(e)}")
+            engine = None
+            
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                if engine is None:
+                    self._finish(job, error="no engine available")
+                    continue
+                    
+                job.status = 'running'
+                try:
+                    engine.configure(job.options)
+                    retries = job.options.get('crash_retries', 2)
+                    for attempt in range(retries + 1):
+                        try:
+                            result = engine.capture_screenshot(job.url)
+                            break
+                        except BrowserCrashError as e:
+                            if self.index is not None:
+                                self.index.record(job.url, 'crashed', options=job.options, error=str(e))
+                            # A fresh browser for the retry and every later job on this worker
+                            engine.restart()
+                            if attempt == retries:
+                                raise
+                            self.logger.warning(f"Browser crashed on {job.url}; retrying ({attempt + 1}/{retries})")
+                    if self.cache is not None:
+                        self.cache.remember(job.url, job.options, result)
+                    self._finish(job, result=result)
+                except Exception as e:
+                    self.logger.error(f"Capture failed for {job.url}: {str(e)}")
+                    self._finish(job, error=str(e))
+        finally:
+            if engine is not None:
+                engine.stop()
+                
+    def _finish(self, job, result=None, error=None):
+        """Complete a job and release every request waiting on it."""
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = 'done' if result is not None else 'failed'
+            job.finished_at = time.time()
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        job.done.set()
+        
+        if self.index is not None:
+            if result is None:
+                self.index.record(job.url, 'failed', options=job.options, error=error)
+            else:
+                for part in result.parts or [result]:
+                    self.index.record(job.url, part.status, result=part, options=job.options,
+                                      error=part.suspect_reason)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Maps the HTTP API onto a CaptureService."""
+    
+    server_version = "Siteseeing"
+    
+    @property
+    def service(self):
+        """The service this handler serves."""
+        return self.server.service
+        
+    def do_GET(self):
+        """Serve job descriptions, images and health counters."""
+        parts = [part for part in self.path.split('?', 1)[0].split('/') if part]
+        
+        if parts == ['health']:
+            self._send_json(200, self.service.stats())
+        elif len(parts) in (2, 3, 4) and parts[0] == 'captures':
+            job = self.service.get_job(parts[1])
+            if job is None:
+                self._send_json(404, {'error': "unknown job"})
+            elif len(parts) == 2:
+                self._send_json(200, job.describe())
+            elif parts[2] == 'image' and len(parts) == 3:
+                self._send_image(job)
+            elif parts[2] == 'image' and parts[3].isdigit():
+                self._send_image(job, int(parts[3]))
+            else:
+                self._send_json(404, {'error': "not found"})
+        else:
+            self._send_json(404, {'error': "not found"})
+            
+    def do_POST(self):
+        """Submit a capture."""
+        if self.path.split('?', 1)[0].rstrip('/') != '/captures':
+            self._send_json(404, {'error': "not found"})
+            return
+            
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > MAX_BODY_BYTES:
+                raise ValueError("request body too large")
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict) or not isinstance(body.get('url'), str):
+                raise ValueError("body must be a JSON object with a url")
+            wait = float(body.get('wait') or 0)
+            job = self.service.submit(body['url'], body.get('options'))
+        except QueueFullError as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': '5'})
+            return
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+            
+        if wait > 0 and job.done.wait(wait):
+            self._send_image(job)
+        else:
+            self._send_json(202, job.describe(), {'Location': f"/captures/{job.id}"})
+            
+    def _send_image(self, job, part=None):
+        """Send the image of a finished job (or one of its parts), or the reason there is none."""
+        if job.status == 'failed':
+            self._send_json(502, job.describe())
+            return
+        if job.result is None:
+            self._send_json(409, job.describe())
+            return
+            
+        result = job.result
+        if part is not None:
+            if part >= len(result.parts):
+                self._send_json(404, {'error': "no such part"})
+                return
+            result = result.parts[part]
+            
+        try:
+            with open(result.location, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            self._send_json(410, {'error': f"image no longer available: {e.strerror or e}"})
+            return
+            
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES.get(result.format, 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('X-Job-Id', job.id)
+        if result.content_hash:
+            self.send_header('ETag', f'"{result.content_hash}"')
+        self.end_headers()
+        self.wfile.write(data)
+        
+    def _send_json(self, status, data, headers=None):
+        """Send a JSON response."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        """Route access logs through logging instead of stderr."""
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+
+def create_server(service, host="127.0.0.1", port=8750):
+    """Create an HTTP server bound to the given address for a service."""
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
\ No newline at end of file
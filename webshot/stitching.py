@@ -0,0 +1,254 @@
+"""
+Stitching sinks for full-page captures.
+
+A full-page capture is produced one viewport at a time. Each sink receives
+those viewport strips in order through ``write`` and decides what to keep in
+memory, so peak memory for the streaming and tiled sinks stays proportional
+to a single viewport (or tile) rather than the whole page.
+"""
+
+import hashlib
+import io
+import json
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from PIL import Image
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class MemorySink:
+    """Stitches strips into one in-memory image (the classic behaviour)."""
+    
+    def __init__(self, width, height):
+        """Allocate the target image."""
+        self.width = width
+        self.height = height
+        self.image = Image.new('RGB', (width, height), (255, 255, 255))
+        self.y_offset = 0
+        
+    def write(self, strip):
+        """Paste the next strip below the previous one."""
+        self.image.paste(strip.convert('RGB'), (0, self.y_offset))
+        self.y_offset += strip.height
+        
+    def close(self):
+        """Return the stitched image encoded as PNG bytes."""
+        output = io.BytesIO()
+        self.image.save(output, format='PNG')
+        self.image = None
+        return output.getvalue()
+        
+    def abort(self):
+        """Drop the partly stitched image."""
+        self.image = None
+
+
+class PNGStreamWriter:
+    """Writes a PNG file row by row without holding the full image."""
+    
+    def __init__(self, path, width, height, compress_level=6, chunk_size=1 << 16):
+        """
+        Open the output file and write the PNG header.
+        
+        Args:
+            path: Destination file path
+            width: Image width in pixels
+            height: Image height in pixels (must be known up front)
+            compress_level: zlib compression level
+            chunk_size: Size of compressed data buffered per IDAT chunk
+        """
+        self.path = Path(path)
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.chunk_size = chunk_size
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+        # Hash of everything written, so callers get a content hash without re-reading
+        self.sha256 = hashlib.sha256(PNG_SIGNATURE)
+        self._file = open(self.path, 'wb')
+        self._file.write(PNG_SIGNATURE)
+        # 8-bit depth, colour type 2 (RGB), default compression/filter/interlace
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        
+    def write(self, strip):
+        """Append the rows of a strip, truncating anything past the declared height."""
+        rows = min(strip.height, self.height - self.rows_written)
+        if rows <= 0:
+            return
+        if strip.height != rows:
+            strip = strip.crop((0, 0, strip.width, rows))
+        if strip.width != self.width:
+            strip = strip.crop((0, 0, self.width, rows))
+        self._write_raw_rows(strip.convert('RGB').tobytes(), rows)
+        
+    def close(self):
+        """Pad any missing rows with white, finish the stream and close the file."""
+        if self._file is None:
+            return self.path
+        missing = self.height - self.rows_written
+        if missing > 0:
+            self._write_raw_rows(b'\xff' * (self.width * 3 * missing), missing)
+        self._pending += self._compressor.flush()
+        self._flush_pending(force=True)
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
+        self._file = None
+        return self.path
+        
+    def abort(self):
+        """Close the file and delete the incomplete PNG."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.path.unlink(missing_ok=True)
+        
+    def _write_raw_rows(self, data, rows):
+        """Compress raw RGB rows, each prefixed with filter type 0."""
+        stride = self.width * 3
+        view = memoryview(data)
+        for i in range(rows):
+            self._pending += self._compressor.compress(b'\x00')
+            self._pending += self._compressor.compress(view[i * stride:(i + 1) * stride])
+        self.rows_written += rows
+        self._flush_pending()
+        
+    def _flush_pending(self, force=False):
+        """Emit buffered compressed data as IDAT chunks."""
+        while len(self._pending) >= self.chunk_size or (force and self._pending):
+            data = bytes(self._pending[:self.chunk_size])
+            del self._pending[:self.chunk_size]
+            self._write_chunk(b'IDAT', data)
+            
+    def _write_chunk(self, chunk_type, data):
+        """Write a single length-prefixed, CRC-terminated PNG chunk."""
+        for part in (struct.pack('>I', len(data)), chunk_type, data,
+                     struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)):
+            self._file.write(part)
+            self.sha256.update(part)
+
+
+class TileWriter:
+    """Cuts a page into fixed-height tiles, optionally with a zoomable pyramid."""
+    
+    def __init__(self, directory, width, height, tile_height=4096, fmt='png',
+                 quality=None, pyramid=False):
+        """
+        Prepare the tile directory.
+        
+        Args:
+            directory: Directory that receives the tiles and ``index.json``
+            width: Page width in pixels
+            height: Page height in pixels
+            tile_height: Height of each full-resolution tile
+            fmt: Tile format ('png' or 'jpeg')
+            quality: JPEG quality, if applicable
+            pyramid: Whether to build downscaled levels after the last tile
+        """
+        self.directory = Path(directory)
+        self.width = width
+        self.height = height
+        self.tile_height = tile_height
+        self.fmt = fmt
+        self.quality = quality
+        self.pyramid = pyramid
+        self.levels = [[]]
+        self.rows_written = 0
+        self._tile = None
+        self._tile_fill = 0
+        (self.directory / '0').mkdir(parents=True, exist_ok=True)
+        
+    def write(self, strip):
+        """Copy a strip into the current tile, flushing tiles as they fill up."""
+        strip = strip.convert('RGB')
+        y = 0
+        while y < strip.height:
+            if self._tile is None:
+                self._tile = Image.new('RGB', (self.width, self.tile_height), (255, 255, 255))
+                self._tile_fill = 0
+            rows = min(strip.height - y, self.tile_height - self._tile_fill)
+            self._tile.paste(strip.crop((0, y, strip.width, y + rows)), (0, self._tile_fill))
+            self._tile_fill += rows
+            y += rows
+            if self._tile_fill == self.tile_height:
+                self._flush_tile()
+        self.rows_written += strip.height
+        
+    def close(self):
+        """Flush the last tile, build the pyramid and write the index file."""
+        if self._tile is not None and self._tile_fill:
+            self._tile = self._tile.crop((0, 0, self.width, self._tile_fill))
+            self._flush_tile()
+        self._tile = None
+        
+        if self.pyramid:
+            self._build_pyramid()
+            
+        index = {
+            'width': self.width,
+            'height': min(self.rows_written, self.height),
+            'tile_height': self.tile_height,
+            'format': self.fmt,
+            'levels': [
+                {'level': level, 'scale': 1 / (2 ** level), 'tiles': tiles}
+                for level, tiles in enumerate(self.levels)
+            ],
+        }
+        with open(self.directory / 'index.json', 'w') as f:
+            json.dump(index, f, indent=2)
+        return self.directory
+        
+    def abort(self):
+        """Drop the current tile and delete the incomplete tile directory."""
+        self._tile = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+        
+    def _tile_path(self, level, number):
+        """Return the relative path of a tile."""
+        ext = 'jpg' if self.fmt == 'jpeg' else 'png'
+        return f"{level}/tile_{number:05d}.{ext}"
+        
+    def _save(self, image, relative_path):
+        """Save a tile image in the configured format."""
+        path = self.directory / relative_path
+        if self.fmt == 'jpeg':
+            image.save(path, 'JPEG', quality=self.quality or 85)
+        else:
+            image.save(path, 'PNG')
+            
+    def _flush_tile(self):
+        """Write the current full-resolution tile to disk."""
+        relative_path = self._tile_path(0, len(self.levels[0]))
+        self._save(self._tile, relative_path)
+        self.levels[0].append(relative_path)
+        self._tile = None
+        self._tile_fill = 0
+        
+    def _build_pyramid(self):
+        """Halve pairs of tiles level by level until a single tile remains."""
+        level = 0
+        while len(self.levels[level]) > 1:
+            level += 1
+            (self.directory / str(level)).mkdir(exist_ok=True)
+            previous = self.levels[level - 1]
+            tiles = []
+            for number in range(0, len(previous), 2):
+                pair = [Image.open(self.directory / p) for p in previous[number:number + 2]]
+                combined = Image.new('RGB', (pair[0].width, sum(img.height for img in pair)))
+                y = 0
+                for img in pair:
+                    combined.paste(img, (0, y))
+                    y += img.height
+                    img.close()
+                half = combined.resize(
+                    (max(1, combined.width // 2), max(1, combined.height // 2)),
+                    Image.LANCZOS
+                )
+                relative_path = self._tile_path(level, len(tiles))
+                self._save(half, relative_path)
+                tiles.append(relative_path)
+            self.levels.append(tiles)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Output storage backends for captured screenshots.
+
+``LooseFileStore`` writes one file per capture with collision-proof names.
+``ArchiveStore`` appends captures to size-bounded tar shards and keeps an
+``index.jsonl`` that maps each URL and capture time to its shard and byte
+offset, so huge batches become sequential appends to a few large files.
+"""
+
+import io
+import json
+import logging
+import re
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+def unique_stem(url: str) -> str:
+    """
+    Build a collision-proof file stem for a capture of the given URL.
+    
+    Args:
+        url: The captured URL
+        
+    Returns:
+        Stem of the form ``domain_YYYYmmdd_HHMMSS_micro_token``
+    """
+    domain = urlparse(url).netloc.replace('www.', '').replace('.', '_')
+    domain = re.sub(r'[^A-Za-z0-9_-]', '_', domain) or 'screenshot'
+    
+    now = time.time()
+    timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(now))
+    micros = int((now % 1) * 1_000_000)
+    return f"{domain}_{timestamp}_{micros:06d}_{uuid.uuid4().hex[:8]}"
+
+
+class LooseFileStore:
+    """Stores every capture as its own file in the output directory."""
+    
+    def __init__(self, output_dir):
+        """Initialize the store."""
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+    def new_path(self, url, ext=None):
+        """Reserve a unique file path, or a directory when ``ext`` is None."""
+        while True:
+            stem = unique_stem(url)
+            try:
+                # Exclusive creation guarantees no other worker gets the same name
+                if ext is None:
+                    path = self.output_dir / stem
+                    path.mkdir()
+                else:
+                    path = self.output_dir / f"{stem}.{ext}"
+                    path.open('xb').close()
+                return path
+            except FileExistsError:
+                continue
+                
+    def save(self, url, data, ext):
+        """Write encoded image bytes and return their location."""
+        while True:
+            path = self.output_dir / f"{unique_stem(url)}.{ext}"
+            try:
+                with open(path, 'xb') as f:
+                    f.write(data)
+                return str(path)
+            except FileExistsError:
+                continue
+                
+    def add_path(self, url, path):
+        """Register an output already written in place."""
+        return str(path)
+        
+    def close(self):
+        """Nothing to flush for loose files."""
+
+
+class ArchiveStore:
+    """Appends captures to tar shards that roll over by size."""
+    
+    def __init__(self, output_dir, shard_max_bytes=1 << 30, prefix="captures"):
+        """
+        Initialize the store.
+        
+        Args:
+            output_dir: Directory that holds the shards and the index
+            shard_max_bytes: Size after which a new shard is started
+            prefix: File name prefix of the shards
+        """
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_dir = self.output_dir / ".staging"
+        self.shard_max_bytes = shard_max_bytes
+        self.prefix = prefix
+        self.index_path = self.output_dir / "index.jsonl"
+        
+        self._lock = threading.Lock()
+        self._tar = None
+        self._shard_file = None
+        self._shard_name = None
+        self._index_file = None
+        
+        # Existing shards are never reopened; numbering continues after them
+        existing = sorted(self.output_dir.glob(f"{prefix}-*.tar"))
+        self._shard_number = int(existing[-1].stem.rsplit('-', 1)[1]) if existing else 0
+        
+    def new_path(self, url, ext=None):
+        """Return a staging path for an output that is written before archiving."""
+        self.staging_dir.mkdir(exist_ok=True)
+        if ext is None:
+            return self.staging_dir / unique_stem(url)
+        return self.staging_dir / f"{unique_stem(url)}.{ext}"
+        
+    def save(self, url, data, ext):
+        """Append encoded image bytes to the current shard."""
+        member = f"{unique_stem(url)}.{ext}"
+        with self._lock:
+            return self._append(url, member, io.BytesIO(data), len(data))
+            
+    def add_path(self, url, path):
+        """Move a staged file, or every file of a staged directory, into the archive."""
+        path = Path(path)
+        with self._lock:
+            if path.is_dir():
+                location = None
+                for item in sorted(p for p in path.rglob('*') if p.is_file()):
+                    member = f"{path.name}/{item.relative_to(path).as_posix()}"
+                    with open(item, 'rb') as f:
+                        item_location = self._append(url, member, f, item.stat().st_size)
+                    if item.name == 'index.json':
+                        location = item_location
+                shutil.rmtree(path)
+                return location or f"{self._shard_name}:{path.name}/"
+                
+            with open(path, 'rb') as f:
+                location = self._append(url, path.name, f, path.stat().st_size)
+            path.unlink()
+            return location
+            
+    def close(self):
+        """Finish the current shard and the index file."""
+        with self._lock:
+            self._close_shard()
+            if self._index_file:
+                self._index_file.close()
+                self._index_file = None
+                
+    def _append(self, url, member, fileobj, size):
+        """Append one member and record it in the index. Caller holds the lock."""
+        rollover = self._tar is not None and 0 < self._tar.offset and \
+            self._tar.offset + size > self.shard_max_bytes
+        if self._tar is None or rollover:
+            self._open_next_shard()
+            
+        info = tarfile.TarInfo(member)
+        info.size = size
+        info.mtime = int(time.time())
+        self._tar.addfile(info, fileobj)
+        self._tar.fileobj.flush()
+        
+        # Data sits right before the 512-byte padding that ends the member
+        data_offset = self._tar.offset - (-(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE)
+        
+        if self._index_file is None:
+            self._index_file = open(self.index_path, 'a')
+        self._index_file.write(json.dumps({
+            'url': url,
+            'captured_at': info.mtime,
+            'shard': self._shard_name,
+            'member': member,
+            'offset': data_offset,
+            'size': size,
+        }) + "\n")
+        self._index_file.flush()
+        
+        return f"{self._shard_name}:{member}"
+        
+    def _open_next_shard(self):
+        """Close the current shard and start the next one."""
+        self._close_shard()
+        # Another store on the same directory (a second job, the GUI next to
+        # the CLI) may take a number first; shards are created exclusively
+        # and never truncated
+        while True:
+            self._shard_number += 1
+            self._shard_name = f"{self.prefix}-{self._shard_number:05d}.tar"
+            try:
+                self._shard_file = open(self.output_dir / self._shard_name, 'xb')
+                break
+            except FileExistsError:
+                continue
+        self._tar = tarfile.open(fileobj=self._shard_file, mode='w', format=tarfile.GNU_FORMAT)
+        self.logger.info(f"Opened archive shard {self._shard_name}")
+        
+    def _close_shard(self):
+        """Close the current shard, if any."""
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        if self._shard_file is not None:
+            self._shard_file.close()
+            self._shard_file = None
+
+
+def create_store(options):
+    """Create the output store selected by the capture options."""
+    if options.get('output_mode') == 'archive':
+        shard_mb = options.get('shard_size_mb') or 1024
+        return ArchiveStore(options['output_dir'], shard_max_bytes=shard_mb * 1024 * 1024)
+    return LooseFileStore(options['output_dir'])
\ No newline at end of file
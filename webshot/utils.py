@@ -3,7 +3,29 @@ Utility functions for the Siteseeing application.
 """
 
 import re
-from urllib.parse import urlparse
+import json
+import hashlib
+from fnmatch import fnmatchcase
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+
+# Options that only affect where or how outputs are stored, not what is rendered
+NON_RENDER_OPTIONS = frozenset({
+    'output_dir', 'output_mode', 'shard_size_mb',
+    'change_detection', 'change_threshold', 'change_phash', 'change_highlight',
+    'preflight', 'preflight_concurrency', 'preflight_timeout', 'force_capture',
+    'prefilter', 'prefilter_concurrency', 'prefilter_timeout', 'host_resolver_rules',
+    'threads', 'autoscale', 'min_workers', 'max_workers', 'crash_retries', 'capture_index',
+    'cache', 'cache_ttl', 'cache_max_mb', 'diagnostics', 'trace_threshold',
+    'quality_check', 'quality_retries', 'quality_retry_wait', 'quality_max_uniform',
+    'quality_min_entropy', 'dedup_pages', 'strip_params',
+})
+
+# Query parameters that only track the visit; shell-style patterns
+TRACKING_PARAMS = (
+    'utm_*', 'gclid', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid', '_hsenc', '_hsmi', 'mkt_tok',
+)
 
 
 def validate_url(url: str) -> bool:
@@ -69,6 +91,26 @@ def format_bytes(size: int) -> str:
     return f"{size:.1f} TB"
 
 
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration in seconds into a short human-readable string.
+    
+    Args:
+        seconds: Duration in seconds
+        
+    Returns:
+        Formatted string such as "45s", "12m 05s" or "3h 20m"
+    """
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
 def parse_url_list(text: str) -> list:
     """
     Parse a text containing URLs into a list.
@@ -95,4 +137,127 @@ def parse_url_list(text: str) -> list:
         if validate_url(line):
             urls.append(line)
             
-    return urls
\ No newline at end of file
+    return urls
+
+
+def parse_interval(text: str) -> float:
+    """
+    Parse an interval such as ``90``, ``90s``, ``15m``, ``2h`` or ``1d``.
+    
+    Args:
+        text: Number with an optional unit suffix (seconds by default)
+        
+    Returns:
+        Interval in seconds
+        
+    Raises:
+        ValueError: If the text is not a positive interval
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', text.lower())
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"invalid interval: {text}")
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+
+
+def parse_selectors(text: str) -> list:
+    """
+    Split a semicolon-separated list of CSS selectors.
+    
+    Semicolons never occur in selectors, unlike commas, which group them.
+    
+    Args:
+        text: Selectors such as ``#pricing; .hero``
+        
+    Returns:
+        List of non-empty selectors
+    """
+    return [selector.strip() for selector in text.split(';') if selector.strip()]
+
+
+def parse_clip(text: str) -> list:
+    """
+    Parse a clip rectangle given as ``x, y, width, height`` in CSS pixels.
+    
+    Args:
+        text: Four comma- or space-separated numbers
+        
+    Returns:
+        List [x, y, width, height]
+        
+    Raises:
+        ValueError: If the text is not four numbers with a positive size
+    """
+    values = [float(value) for value in re.split(r'[\s,]+', text.strip()) if value]
+    if len(values) != 4:
+        raise ValueError("clip must be x, y, width, height")
+    if values[0] < 0 or values[1] < 0 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError("clip must start inside the page and have a positive size")
+    return values
+
+
+def normalize_url(url: str, strip_params=(), keep_fragment=False) -> str:
+    """
+    Normalize a URL so equivalent spellings compare equal.
+    
+    The scheme and host are lower-cased, default ports and fragments are
+    dropped, an empty path becomes ``/`` and query parameters are sorted.
+    The result is meant for comparing URLs, not for loading them: the
+    query is re-encoded, so it may not reach the server byte for byte.
+    
+    Args:
+        url: URL with a scheme
+        strip_params: Patterns such as ``utm_*`` of query parameters to
+            drop, matched case-insensitively
+        keep_fragment: Keep the fragment, which tells hash-routed pages apart
+        
+    Returns:
+        Normalized URL
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if ':' in host:
+        host = f"[{host}]"
+    if parsed.port and parsed.port != {'http': 80, 'https': 443}.get(scheme):
+        host = f"{host}:{parsed.port}"
+    if parsed.username:
+        userinfo = parsed.username + (f":{parsed.password}" if parsed.password else '')
+        host = f"{userinfo}@{host}"
+        
+    params = parse_qsl(parsed.query, keep_blank_values=True)
+    if strip_params:
+        params = [(key, value) for key, value in params
+                  if not any(fnmatchcase(key.lower(), pattern.lower()) for pattern in strip_params)]
+    query = urlencode(sorted(params))
+    fragment = parsed.fragment if keep_fragment else ''
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, query, fragment))
+
+
+def render_options(options: dict) -> dict:
+    """
+    Select the options that affect what a capture looks like.
+    
+    Args:
+        options: Capture options dictionary
+        
+    Returns:
+        Dictionary without storage, scheduling and private options
+    """
+    return {
+        key: value for key, value in options.items()
+        if key not in NON_RENDER_OPTIONS and not key.startswith('_')
+    }
+
+
+def options_fingerprint(options: dict) -> str:
+    """
+    Compute a stable fingerprint of the options that affect rendering.
+    
+    Args:
+        options: Capture options dictionary
+        
+    Returns:
+        Hex digest identifying the rendering options
+    """
+    encoded = json.dumps(render_options(options), sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
\ No newline at end of file